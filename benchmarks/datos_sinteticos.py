@@ -0,0 +1,104 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+# Añadir src al path (nombres de las series de la API)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+import descargar_blockchain
+
+# Generador de datos sintéticos con la misma forma que los reales: un CSV por
+# serie como los de Blockchain.com (datos/raw_api), la exportación de la EIA y
+# el archivo manual de eficiencia (datos/raw_manual). No necesita red.
+
+FIN = pd.Timestamp('2026-01-04')  # Último dato; la historia se genera hacia atrás
+DIAS_HISTORIA = 6211  # Días de la historia real (2009-01-03 -> 2026-01-04)
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+CABECERA_EIA = [
+    "Average retail price of electricity monthly;",
+    "Datos sintéticos para benchmarks;",
+    "Data source: U.S. Energy Information Administration;",
+]
+
+
+def nombres_series(n_series):
+    # Las series reales primero (las usa el dashboard); el resto, numeradas
+    reales = list(descargar_blockchain.charts_a_descargar)
+    return reales[:n_series] + [f"serie_{i:03d}" for i in range(len(reales), n_series)]
+
+
+def marcas_tiempo(escala, frecuencia):
+    # escala = múltiplos de la historia real en número de muestras por serie
+    n = int(DIAS_HISTORIA * escala)
+    inicio_minimo = pd.Timestamp.min.ceil('D')
+    try:
+        indice = pd.date_range(end=FIN, periods=n, freq=frecuencia)
+    except (OverflowError, pd.errors.OutOfBoundsDatetime):
+        indice = None
+    if indice is None or indice[0] < inicio_minimo:
+        raise ValueError(f"{n} muestras con frecuencia '{frecuencia}' no caben en datetime64[ns]; "
+                         f"usa una frecuencia más fina.")
+    return indice
+
+
+def paseo_aleatorio(rng, n, inicio, volatilidad=0.02):
+    # Serie positiva tipo precio (paseo aleatorio geométrico): vale para ejes log
+    return inicio * np.exp(np.cumsum(rng.normal(0, volatilidad, n)))
+
+
+def escribir_csv_api(path, indice, valores):
+    texto = pd.Series(valores, index=indice.strftime(FORMATO_FECHA))
+    texto.to_csv(path, header=False)
+
+
+def escribir_eia(path, indice, n_series, rng):
+    # Exportación en formato 'una fila por mes' con separador ';'
+    meses = pd.date_range(indice[0].to_period('M').to_timestamp(), indice[-1], freq='MS')
+    columnas = {'industrial cents per kilowatthour': paseo_aleatorio(rng, len(meses), 7.0, 0.01)}
+    for i in range(1, max(1, n_series // 14)):
+        columnas[f"sector {i} cents per kilowatthour"] = paseo_aleatorio(rng, len(meses), 10.0, 0.01)
+    df = pd.DataFrame(columnas)
+    df.insert(0, 'Month', meses.strftime('%b %Y'))
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('\n'.join(CABECERA_EIA) + '\n')
+        df.to_csv(f, sep=';', index=False, float_format='%.2f')
+
+
+def escribir_eficiencia(path, indice):
+    # Pocas filas (lanzamientos de hardware); procesar_datos interpola a diario
+    fechas = pd.date_range(indice[0].normalize(), indice[-1], periods=12).normalize()
+    eficiencia = np.geomspace(800000.0, 15.0, len(fechas))
+    pd.DataFrame({'date': fechas.strftime('%Y-%m-%d'), 'efficiency_j_th': eficiencia}).to_csv(path, index=False)
+
+
+def generar(carpeta, escala=1, frecuencia='D', n_series=14, semilla=0):
+    # Crea carpeta/datos/raw_api y carpeta/datos/raw_manual. Devuelve el número
+    # de filas por serie.
+    rng = np.random.default_rng(semilla)
+    indice = marcas_tiempo(escala, frecuencia)
+    carpeta_api = os.path.join(carpeta, 'datos', 'raw_api')
+    carpeta_manual = os.path.join(carpeta, 'datos', 'raw_manual')
+    os.makedirs(carpeta_api, exist_ok=True)
+    os.makedirs(carpeta_manual, exist_ok=True)
+
+    for nombre in nombres_series(n_series):
+        inicio = 10 ** rng.uniform(0, 6)
+        escribir_csv_api(os.path.join(carpeta_api, f"{nombre}.csv"), indice, paseo_aleatorio(rng, len(indice), inicio))
+
+    escribir_eia(os.path.join(carpeta_manual, 'Average_retail_price_of_electricity_monthly.csv'), indice,
+                 n_series, rng)
+    escribir_eficiencia(os.path.join(carpeta_manual, 'efficiency_manual.csv'), indice)
+    return len(indice)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Genera datos crudos sintéticos para los benchmarks")
+    parser.add_argument('carpeta')
+    parser.add_argument('--escala', type=float, default=1, help="Múltiplo de la historia real (muestras por serie)")
+    parser.add_argument('--frecuencia', default='D', help="Alias de pandas: 'D', 'h', 'min'...")
+    parser.add_argument('--series', type=int, default=14)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+    filas = generar(args.carpeta, args.escala, args.frecuencia, args.series, args.semilla)
+    print(f"Generadas {args.series} series de {filas} filas en {args.carpeta}")
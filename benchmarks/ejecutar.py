@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import argparse
+import subprocess
+import contextlib
+from datetime import datetime
+
+try:
+    import resource  # Solo Unix: pico de memoria del proceso
+except ImportError:
+    resource = None
+
+DIR_BENCH = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(DIR_BENCH)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+sys.path.append(DIR_BENCH)
+
+# --- CONFIGURACIÓN ---
+CARPETA_RESULTADOS = os.path.join(DIR_BENCH, "resultados")
+FILE_BASE = os.path.join(CARPETA_RESULTADOS, "base.json")
+# Una etapa es una regresión si tarda (o usa memoria) más que la base en esta
+# proporción y, además, en más de estos mínimos absolutos (ruido de medida)
+TOLERANCIA = 0.20
+MIN_SEGUNDOS = 0.05
+MIN_MEMORIA_MB = 10
+
+# Escenarios: 'escala' = múltiplos de la historia real (muestras por serie),
+# 'frecuencia' = resolución de los crudos, 'rejilla' = procesar_datos.RESOLUCION.
+# La historia 100x diaria no cabe en datetime64[ns] (1.700 años): se genera horaria.
+ESCENARIOS = {
+    'diario_1x': {'escala': 1, 'frecuencia': 'D', 'series': 14, 'rejilla': 'D'},
+    'diario_10x': {'escala': 10, 'frecuencia': 'D', 'series': 14, 'rejilla': 'D'},
+    'horario_100x': {'escala': 100, 'frecuencia': 'h', 'series': 14, 'rejilla': 'h'},
+    'diario_1x_100_series': {'escala': 1, 'frecuencia': 'D', 'series': 100, 'rejilla': 'D'},
+    'diario_1x_500_series': {'escala': 1, 'frecuencia': 'D', 'series': 500, 'rejilla': 'D'},
+    'minuto_30d': {'escala': 30 * 1440 / 6211, 'frecuencia': 'min', 'series': 14, 'rejilla': 'min'},
+    'minuto_1x': {'escala': 1440, 'frecuencia': 'min', 'series': 14, 'rejilla': 'D'},
+}
+SUITES = {
+    'rapida': ['diario_1x', 'minuto_30d'],
+    'estandar': ['diario_1x', 'diario_10x', 'diario_1x_100_series', 'minuto_30d'],
+    'completa': ['diario_1x', 'diario_10x', 'horario_100x', 'diario_1x_100_series', 'diario_1x_500_series',
+                 'minuto_30d', 'minuto_1x'],
+}
+
+# Etapas medidas, en orden (cada una usa las salidas de las anteriores).
+# 'salidas' = rutas relativas a la carpeta del escenario cuyo tamaño se mide.
+ETAPAS = {
+    'limpiar_eia': {'salidas': ['datos/processed/eia_limpio']},
+    'cargar_blockchain': {'salidas': []},
+    'procesar_datos': {'salidas': ['datos/processed/dataset_final_btc', 'datos/processed/piramide',
+                                   'datos/processed/estadisticas_moviles', 'datos/processed/correlaciones_moviles']},
+    'escenarios': {'salidas': ['datos/processed/escenarios_ataque']},
+    'generar_web': {'salidas': ['index.html', 'assets']},
+}
+
+
+def preparar_modulos(carpeta, rejilla):
+    # Todas las rutas de los módulos apuntan al escenario; sin cachés, para
+    # medir siempre el trabajo completo. Los datos, con config antes de
+    # importar las etapas; la web, a mano (cuelga de la raíz del proyecto).
+    import config
+    config.configurar(os.path.join(carpeta, 'datos'))
+    import procesar_datos
+    import generar_web
+    import metricas
+
+    os.chdir(carpeta)
+    procesar_datos.RESOLUCION = rejilla
+    metricas.CARPETA_CACHE = None
+    generar_web.OUTPUT_FILE = os.path.join(carpeta, 'index.html')
+    generar_web.ASSETS_DIR = os.path.join(carpeta, 'assets')
+    generar_web.FILE_DATOS_COMPLETOS = os.path.join(generar_web.ASSETS_DIR, 'datos_completos.json')
+    generar_web.CARPETA_FRAGMENTOS = os.path.join(generar_web.ASSETS_DIR, 'fragmentos')
+    generar_web.CARPETA_ESTATICOS = os.path.join(generar_web.ASSETS_DIR, 'static')
+    generar_web.FILE_CABECERAS = os.path.join(carpeta, '_headers')
+    generar_web.CARPETA_CACHE_WEB = None
+
+
+def funcion_etapa(nombre):
+    import limpiar_eia
+    import procesar_datos
+    import escenarios
+    import generar_web
+    return {
+        'limpiar_eia': limpiar_eia.main,
+        'cargar_blockchain': procesar_datos.load_blockchain_files,
+        'procesar_datos': lambda: procesar_datos.main(incremental=False),
+        'escenarios': escenarios.main,
+        'generar_web': generar_web.main,
+    }[nombre]
+
+
+def pico_memoria_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux da KB; macOS, bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def tiempo_cpu():
+    cpu = time.process_time()
+    if resource is not None:
+        # Incluye los procesos hijos (parseo en paralelo de procesar_datos)
+        hijos = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += hijos.ru_utime + hijos.ru_stime
+    return cpu
+
+
+def tamano(rutas):
+    # Admite archivos, carpetas y tablas del almacén (ruta sin extensión)
+    import manifest
+    return sum(os.path.getsize(path) for path in manifest.expandir_rutas(rutas))
+
+
+def medir_etapa(nombre, carpeta, rejilla, archivo_resultado):
+    # Se ejecuta en un proceso hijo: el pico de memoria es solo de esta etapa
+    preparar_modulos(carpeta, rejilla)
+    funcion = funcion_etapa(nombre)
+    memoria_inicial = pico_memoria_mb()
+    inicio, inicio_cpu = time.perf_counter(), tiempo_cpu()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        funcion()
+    resultado = {
+        'segundos': time.perf_counter() - inicio,
+        'cpu_segundos': tiempo_cpu() - inicio_cpu,
+        'memoria_pico_mb': pico_memoria_mb(),
+        'memoria_inicial_mb': memoria_inicial,
+        'bytes_salida': tamano([os.path.join(carpeta, p) for p in ETAPAS[nombre]['salidas']]),
+    }
+    with open(archivo_resultado, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f)
+
+
+def ejecutar_escenario(nombre, parametros, repeticiones):
+    import datos_sinteticos
+    carpeta = tempfile.mkdtemp(prefix=f"bench_{nombre}_")
+    try:
+        inicio = time.perf_counter()
+        filas = datos_sinteticos.generar(carpeta, parametros['escala'], parametros['frecuencia'],
+                                         parametros['series'])
+        print(f"  -> {parametros['series']} series x {filas} filas generadas en "
+              f"{time.perf_counter() - inicio:.1f}s ({tamano([os.path.join(carpeta, 'datos')]) / 1e6:.1f} MB)")
+
+        etapas = {}
+        for etapa in ETAPAS:
+            # De varias repeticiones se guarda la más rápida (la menos ruidosa)
+            medidas = []
+            for _ in range(repeticiones):
+                archivo_resultado = os.path.join(carpeta, f".{etapa}.json")
+                proceso = subprocess.run([sys.executable, os.path.abspath(__file__), '--medir', etapa, carpeta,
+                                          parametros['rejilla'], archivo_resultado],
+                                         capture_output=True, text=True)
+                if proceso.returncode != 0:
+                    print(f"  -> {etapa}: ERROR\n{proceso.stderr[-2000:]}")
+                    medidas = None
+                    break
+                with open(archivo_resultado, encoding='utf-8') as f:
+                    medidas.append(json.load(f))
+            if medidas is None:
+                etapas[etapa] = {'error': True}
+                continue
+            etapas[etapa] = min(medidas, key=lambda m: m['segundos'])
+            m = etapas[etapa]
+            memoria = f"{m['memoria_pico_mb']:.0f} MB" if m['memoria_pico_mb'] is not None else "n/d"
+            print(f"  -> {etapa:<18} {m['segundos']:8.2f}s  cpu {m['cpu_segundos']:7.2f}s  "
+                  f"pico {memoria:>8}  salida {m['bytes_salida'] / 1e6:8.2f} MB")
+        return {'parametros': dict(parametros, filas=filas), 'etapas': etapas}
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+def comparar(resultados, base):
+    # Lista de regresiones (escenario, etapa, métrica, base, actual)
+    regresiones = []
+    for escenario, datos in resultados['escenarios'].items():
+        datos_base = base.get('escenarios', {}).get(escenario)
+        if datos_base is None or datos_base['parametros'] != datos['parametros']:
+            continue
+        for etapa, m in datos['etapas'].items():
+            mb = datos_base['etapas'].get(etapa)
+            if not mb or 'error' in mb or 'error' in m:
+                continue
+            for metrica, minimo in [('segundos', MIN_SEGUNDOS), ('memoria_pico_mb', MIN_MEMORIA_MB)]:
+                if m.get(metrica) is None or mb.get(metrica) is None:
+                    continue
+                if m[metrica] > mb[metrica] * (1 + TOLERANCIA) and m[metrica] - mb[metrica] > minimo:
+                    regresiones.append((escenario, etapa, metrica, mb[metrica], m[metrica]))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline con datos sintéticos (sin red)")
+    parser.add_argument('--suite', choices=list(SUITES), default='rapida')
+    parser.add_argument('--escenario', action='append', choices=list(ESCENARIOS),
+                        help="Escenario concreto (se puede repetir); sustituye a --suite")
+    parser.add_argument('--repeticiones', type=int, default=1)
+    parser.add_argument('--base', default=FILE_BASE, help="Resultados de referencia con los que comparar")
+    parser.add_argument('--guardar-base', action='store_true', help="Guarda estos resultados como referencia")
+    parser.add_argument('--medir', nargs=4, metavar=('ETAPA', 'CARPETA', 'REJILLA', 'RESULTADO'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        medir_etapa(*args.medir)
+        return 0
+
+    escenarios = args.escenario or SUITES[args.suite]
+    resultados = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'escenarios': {},
+    }
+    for nombre in escenarios:
+        print(f"--- Escenario {nombre} ---")
+        resultados['escenarios'][nombre] = ejecutar_escenario(nombre, ESCENARIOS[nombre], args.repeticiones)
+
+    os.makedirs(CARPETA_RESULTADOS, exist_ok=True)
+    path = os.path.join(CARPETA_RESULTADOS, f"resultados_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2)
+    print(f"\nResultados guardados en: {os.path.relpath(path)}")
+
+    if args.guardar_base:
+        shutil.copyfile(path, args.base)
+        print(f"Referencia actualizada: {os.path.relpath(args.base)}")
+        return 0
+    if not os.path.exists(args.base):
+        print("Sin referencia con la que comparar (usa --guardar-base).")
+        return 0
+
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    regresiones = comparar(resultados, base)
+    if not regresiones:
+        print(f"Sin regresiones respecto a {os.path.relpath(args.base)} (tolerancia {TOLERANCIA:.0%}).")
+        return 0
+    print(f"REGRESIONES respecto a {os.path.relpath(args.base)}:")
+    for escenario, etapa, metrica, valor_base, valor in regresiones:
+        print(f"  {escenario} / {etapa}: {metrica} {valor_base:.2f} -> {valor:.2f} "
+              f"({valor / valor_base - 1:+.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
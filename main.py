@@ -1,49 +1,201 @@
 import sys
 import os
 import time
+import argparse
 
 # Añadir src al path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-# Importar módulos
-try:
+# Solo módulos ligeros (sin pandas/plotly/requests): cada etapa importa su
+# módulo al construirse, así que 'python main.py download' no carga pandas
+# ni plotly y 'process' no carga plotly ni requests.
+import config
+import manifest
+import pipeline
+import instrumentacion
+
+
+# Grafo de etapas: las dependencias se deducen de entradas/salidas, así que la
+# descarga y la limpieza EIA (independientes) se ejecutan a la vez. El código
+# fuente de cada etapa cuenta como entrada: si se modifica, se vuelve a ejecutar.
+def fuentes(*nombres):
+    # Código fuente en src/, con rutas absolutas como las de config
+    return [os.path.join(config.RAIZ, 'src', nombre) for nombre in nombres]
+
+
+def etapa_descarga():
     import descargar_blockchain
+    return {
+        'nombre': 'descargar_blockchain',
+        'descripcion': "Descarga de datos",
+        'funcion': descargar_blockchain.main,
+        'entradas': [],
+        'salidas': [descargar_blockchain.output_folder],
+        'siempre': True,  # La red es la entrada; la descarga ya es incremental
+    }
+
+
+def etapa_limpieza_eia():
     import limpiar_eia
+    return {
+        'nombre': 'limpiar_eia',
+        'descripcion': "Limpieza de datos EIA",
+        'funcion': limpiar_eia.main,
+        'entradas': [limpiar_eia.INPUT_FILE] + fuentes('limpiar_eia.py', 'almacen.py'),
+        'salidas': [limpiar_eia.OUTPUT_TABLE],
+    }
+
+
+def etapa_procesado():
     import procesar_datos
+    return {
+        'nombre': 'procesar_datos',
+        'descripcion': "Procesamiento y Fusión",
+        'funcion': procesar_datos.main,
+        'entradas': [procesar_datos.FOLDER_API, procesar_datos.FILE_EFFICIENCY, procesar_datos.FILE_EIA_CLEAN]
+                    + fuentes('procesar_datos.py', 'almacen.py', 'series_crudas.py', 'piramides.py', 'flota.py',
+                              'estadisticas.py'),
+        'salidas': [procesar_datos.OUTPUT_TABLE, procesar_datos.piramides.CARPETA,
+                    procesar_datos.estadisticas.OUTPUT_ESTADISTICAS, procesar_datos.estadisticas.OUTPUT_CORRELACIONES],
+    }
+
+
+def etapa_escenarios():
+    import escenarios
+    return {
+        'nombre': 'escenarios',
+        'descripcion': "Escenarios de coste de un ataque",
+        'funcion': escenarios.main,
+        'entradas': [escenarios.INPUT_TABLE] + fuentes('escenarios.py'),
+        'salidas': [escenarios.OUTPUT_TABLE],
+    }
+
+
+def etapa_web():
     import generar_web
-except ImportError as e:
-    print(f"Error importando módulos: {e}")
-    sys.exit(1)
+    return {
+        'nombre': 'generar_web',
+        'descripcion': "Generación de Web",
+        'funcion': generar_web.main,
+        'entradas': [generar_web.INPUT_TABLE] + generar_web.TABLAS_ADICIONALES
+                    + fuentes('generar_web.py', 'metricas.py', 'submuestreo.py', os.path.join('web', 'dashboard.js')),
+        'salidas': [generar_web.OUTPUT_FILE, generar_web.ASSETS_DIR],
+    }
+
 
-def ejecutar_pipeline():
+# Subcomando -> etapa ('all' = todas, en el orden del grafo)
+COMANDOS = {
+    'download': etapa_descarga,
+    'clean-eia': etapa_limpieza_eia,
+    'process': etapa_procesado,
+    'scenarios': etapa_escenarios,
+    'render': etapa_web,
+}
+
+
+def etapas(comandos=None):
+    return [COMANDOS[comando]() for comando in (comandos or COMANDOS)]
+
+
+def ejecutar_pipeline(force=False, lista_etapas=None):
     print("===================================================")
     print("INICIANDO PIPELINE DE DATOS BITCOIN SECURITY")
     print("===================================================")
 
-    # PASO 1: Descarga
-    print("\n[1/4] EJECUTANDO: Descarga de datos...")
-    descargar_blockchain.main()
-
-    # PASO 2: Limpieza EIA
-    print("\n[2/4] EJECUTANDO: Limpieza de datos EIA...")
-    limpiar_eia.main()
-
-    # PASO 3: Procesado
-    print("\n[3/4] EJECUTANDO: Procesamiento y Fusión...")
-    procesar_datos.main()
-
-    # PASO 4: Web
-    print("\n[4/4] EJECUTANDO: Generación de Web...")
-    # Asegúrate de que generar_web.py también tenga un def main() o usa generar_pagina() si así lo llamaste
-    if hasattr(generar_web, 'main'):
-        generar_web.main()
-    elif hasattr(generar_web, 'generar_pagina'):
-        generar_web.generar_pagina()
+    lista_etapas = lista_etapas or etapas()
+    inicio = time.perf_counter()
+    # Tiempos, memoria y volumen de datos por etapa y archivo (informe JSON + tabla)
+    informe = instrumentacion.iniciar_informe()
+    try:
+        pipeline.ejecutar(lista_etapas, force=force)
+    except pipeline.ErrorEtapa as e:
+        print(f"\nPIPELINE DETENIDO: {e}")
+        instrumentacion.terminar_informe(informe, correcto=False)
+        return False
+
+    instrumentacion.terminar_informe(informe)
+    if any(etapa['nombre'] == 'generar_web' for etapa in lista_etapas):
+        print(f"\nTODO LISTO en {time.perf_counter() - inicio:.1f}s. Abre 'index.html' para ver el resultado.")
     else:
-        # Si generar_web está suelto, lo ejecutamos recargando el módulo o asumiendo que ya corrió al importar
-        print("Advertencia: generar_web no tiene función main(), verifica su ejecución.")
+        print(f"\nTODO LISTO en {time.perf_counter() - inicio:.1f}s.")
+    return True
+
+
+def crear_parser():
+    # Carpetas de datos: las comparten las etapas y 'serve'
+    rutas = argparse.ArgumentParser(add_help=False)
+    rutas.add_argument('--datos', default=None,
+                       help=f"Carpeta raíz de los datos (por defecto '{config.DATOS_DIR}')")
+    for nombre, variable in config.VARIABLES.items():
+        rutas.add_argument(f"--{nombre.replace('_', '-')}", dest=nombre, default=None,
+                           help=f"Carpeta '{nombre}' (por defecto <datos>/{nombre}; también {variable})")
+
+    comunes = argparse.ArgumentParser(add_help=False, parents=[rutas])
+    comunes.add_argument('--force', action='store_true',
+                         help="Ejecuta las etapas aunque sus entradas no hayan cambiado")
+    comunes.add_argument('--perfil', choices=['cprofile', 'pyinstrument'],
+                         help="Guarda un perfil de cada etapa junto al informe de la ejecución")
+    comunes.add_argument('--tracemalloc', action='store_true',
+                         help="Mide también el pico de memoria de Python con tracemalloc (más lento)")
+
+    parser = argparse.ArgumentParser(description="Pipeline de datos Bitcoin Security. Sin subcomando se "
+                                                 "ejecuta 'all'.")
+    subparsers = parser.add_subparsers(dest='comando')
+    descripciones = {
+        'download': "Descarga incremental de los charts de Blockchain.com",
+        'clean-eia': "Limpieza del precio de la electricidad (EIA)",
+        'process': "Fusión de las series y pirámides de agregación",
+        'scenarios': "Bandas de percentiles del coste de un ataque (barrido de escenarios)",
+        'render': "Generación del dashboard (index.html)",
+    }
+    for comando, descripcion in descripciones.items():
+        sub = subparsers.add_parser(comando, parents=[comunes], help=descripcion, description=descripcion)
+        if comando == 'download':
+            sub.add_argument('--url-api', default=None,
+                             help="URL base de los charts (por defecto Blockchain.com; útil con un servidor de pruebas)")
+    todo = subparsers.add_parser('all', parents=[comunes], help="Todas las etapas (por defecto)",
+                                 description="Todas las etapas; las que están al día se omiten")
+    todo.add_argument('--demonio', action='store_true',
+                      help="Se queda en marcha y refresca los datos y la web cada --intervalo segundos")
+    todo.add_argument('--intervalo', type=float, default=None,
+                      help="Segundos entre refrescos en modo demonio")
+    todo.add_argument('--url-api', default=None,
+                      help="URL base de los charts (por defecto Blockchain.com; útil con un servidor de pruebas)")
+    servir = subparsers.add_parser('serve', parents=[rutas], help="Servidor local del dashboard con API de series",
+                                   description="Sirve index.html y assets/ con la API de series por rango "
+                                               "(src/servidor.py); no ejecuta ninguna etapa")
+    servir.add_argument('--host', default=None, help="Interfaz de escucha (por defecto 127.0.0.1)")
+    servir.add_argument('--puerto', type=int, default=None, help="Puerto (por defecto 8000; 0 = uno libre)")
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Compatibilidad: 'python main.py --force' equivale a 'python main.py all --force'
+    if not argv or (argv[0] not in list(COMANDOS) + ['all', 'serve'] and argv[0] not in ('-h', '--help')):
+        argv = ['all'] + argv
+    args = crear_parser().parse_args(argv)
+
+    # Las rutas se fijan antes de importar las etapas (se leen al importarse)
+    config.configurar(args.datos, **{nombre: getattr(args, nombre) for nombre in config.VARIABLES})
+    if args.comando == 'serve':
+        import servidor
+        return servidor.main(args.host or servidor.HOST, servidor.PUERTO if args.puerto is None else args.puerto)
+    instrumentacion.PERFILADOR = args.perfil
+    instrumentacion.TRACEMALLOC = args.tracemalloc
+    instrumentacion.CARPETA_INFORMES = config.ruta("informes")
+    manifest.MANIFEST_FILE = config.ruta(".manifest.json")
+
+    lista_etapas = etapas(None if args.comando == 'all' else [args.comando])
+    if getattr(args, 'url_api', None):
+        import descargar_blockchain
+        descargar_blockchain.base_url = args.url_api.rstrip('/') + '/'
+    if getattr(args, 'demonio', False):
+        import demonio
+        demonio.ejecutar(lista_etapas, intervalo=args.intervalo or demonio.INTERVALO)
+        return 0
+    return 0 if ejecutar_pipeline(force=args.force, lista_etapas=lista_etapas) else 1
 
-    print("\nTODO LISTO. Abre 'index.html' para ver el resultado.")
 
 if __name__ == "__main__":
-    ejecutar_pipeline()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import shutil
+import instrumentacion
+
+# --- CONFIGURACIÓN ---
+# Formato de la capa 'processed':
+#   'parquet' -> columnar comprimido (requiere pyarrow)
+#   'npy'     -> carpeta '<tabla>.npyd' con un .npy por columna, leída con memory-map
+#   'auto'    -> parquet si pyarrow está instalado, si no npy
+#   'csv'     -> texto, como antes
+# Las tablas se nombran sin extensión ('datos/processed/dataset_final_btc'); al
+# leer se busca el primer formato disponible en este orden.
+FORMATO = 'auto'
+ORDEN_LECTURA = ['parquet', 'npy', 'csv']
+EXTENSIONES = {'parquet': '.parquet', 'npy': '.npyd', 'csv': '.csv'}
+INDICE = 'date'
+
+try:
+    import pyarrow  # noqa: F401
+    import pyarrow.parquet as pq
+    HAY_PYARROW = True
+except ImportError:
+    HAY_PYARROW = False
+
+
+def formato_efectivo(formato=None):
+    formato = formato or FORMATO
+    if formato == 'auto':
+        return 'parquet' if HAY_PYARROW else 'npy'
+    if formato == 'parquet' and not HAY_PYARROW:
+        print("  -> pyarrow no está instalado; se usa el formato 'npy'.")
+        return 'npy'
+    if formato not in EXTENSIONES:
+        raise ValueError(f"Formato de almacenamiento desconocido: {formato}")
+    return formato
+
+
+def ruta_formato(ruta_base, formato):
+    return ruta_base + EXTENSIONES[formato]
+
+
+def formato_guardado(ruta_base):
+    for formato in ORDEN_LECTURA:
+        if os.path.exists(ruta_formato(ruta_base, formato)):
+            return formato
+    return None
+
+
+def existe_tabla(ruta_base):
+    return formato_guardado(ruta_base) is not None
+
+
+# --- ESCRITURA ---
+def _reemplazar(tmp_path, destino):
+    # Sustitución atómica también para carpetas (.npyd)
+    if os.path.isdir(destino):
+        viejo = destino + '.old'
+        shutil.rmtree(viejo, ignore_errors=True)
+        os.replace(destino, viejo)
+        os.replace(tmp_path, destino)
+        shutil.rmtree(viejo, ignore_errors=True)
+    else:
+        os.replace(tmp_path, destino)
+
+
+def _tamano(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(raiz, n)) for raiz, _, nombres in os.walk(path) for n in nombres)
+
+
+def _guardar_npy(df, carpeta):
+    os.makedirs(carpeta)
+    esquema = {'version': 1, 'indice': INDICE, 'filas': len(df), 'columnas': []}
+    np.save(os.path.join(carpeta, 'indice.npy'), df.index.to_numpy(dtype='datetime64[ns]'))
+    for i, col in enumerate(df.columns):
+        archivo = f"c{i:04d}.npy"
+        valores = df[col].to_numpy()
+        np.save(os.path.join(carpeta, archivo), valores)
+        esquema['columnas'].append({'nombre': col, 'dtype': str(valores.dtype), 'archivo': archivo})
+    with open(os.path.join(carpeta, 'esquema.json'), 'w', encoding='utf-8') as f:
+        json.dump(esquema, f, indent=2)
+
+
+def guardar_tabla(df, ruta_base, formato=None, exportar_csv=False):
+    # Escribe la tabla (índice = fechas) en el formato binario elegido y,
+    # opcionalmente, una copia CSV. Devuelve las rutas escritas.
+    formato = formato_efectivo(formato)
+    carpeta = os.path.dirname(ruta_base)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+
+    df = df.copy(deep=False)
+    df.index.name = INDICE
+    formatos = [formato] + (['csv'] if exportar_csv and formato != 'csv' else [])
+
+    escritas = []
+    for fmt in formatos:
+        destino = ruta_formato(ruta_base, fmt)
+        tmp_path = destino + '.tmp'
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+        if fmt == 'parquet':
+            df.to_parquet(tmp_path, engine='pyarrow')
+        elif fmt == 'npy':
+            _guardar_npy(df, tmp_path)
+        else:
+            df.to_csv(tmp_path)
+        _reemplazar(tmp_path, destino)
+        escritas.append(destino)
+        instrumentacion.contar('filas_escritas', len(df), archivo=destino)
+        instrumentacion.contar('bytes_emitidos', _tamano(destino), archivo=destino)
+
+    # Las copias binarias en otros formatos quedarían obsoletas y se leerían antes
+    for fmt in ('parquet', 'npy'):
+        obsoleta = ruta_formato(ruta_base, fmt)
+        if fmt not in formatos and os.path.exists(obsoleta):
+            shutil.rmtree(obsoleta) if os.path.isdir(obsoleta) else os.remove(obsoleta)
+
+    return escritas
+
+
+# --- LECTURA ---
+def leer_esquema(ruta_base):
+    # Columnas y tipos sin cargar los datos
+    formato = formato_guardado(ruta_base)
+    if formato is None:
+        raise FileNotFoundError(f"No existe la tabla '{ruta_base}'.")
+    path = ruta_formato(ruta_base, formato)
+    if formato == 'parquet':
+        esquema = pq.read_schema(path)
+        columnas = {campo.name: str(campo.type) for campo in esquema if campo.name != INDICE}
+    elif formato == 'npy':
+        with open(os.path.join(path, 'esquema.json'), encoding='utf-8') as f:
+            columnas = {c['nombre']: c['dtype'] for c in json.load(f)['columnas']}
+    else:
+        cabecera = pd.read_csv(path, nrows=0, index_col=INDICE)
+        columnas = {col: 'float64' for col in cabecera.columns}
+    return {'formato': formato, 'columnas': columnas}
+
+
+def cargar_tabla(ruta_base, columnas=None):
+    # Solo se leen las columnas pedidas (proyección); None = todas
+    formato = formato_guardado(ruta_base)
+    if formato is None:
+        raise FileNotFoundError(f"No existe la tabla '{ruta_base}'.")
+    path = ruta_formato(ruta_base, formato)
+
+    if formato == 'parquet':
+        df = pd.read_parquet(path, engine='pyarrow', columns=columnas)
+    elif formato == 'npy':
+        with open(os.path.join(path, 'esquema.json'), encoding='utf-8') as f:
+            esquema = json.load(f)
+        archivos = {c['nombre']: c['archivo'] for c in esquema['columnas']}
+        nombres = list(archivos) if columnas is None else columnas
+        faltan = [col for col in nombres if col not in archivos]
+        if faltan:
+            raise KeyError(f"Columnas inexistentes en '{ruta_base}': {faltan}")
+        indice = pd.DatetimeIndex(np.load(os.path.join(path, 'indice.npy')), name=INDICE)
+        datos = {col: np.load(os.path.join(path, archivos[col]), mmap_mode='r') for col in nombres}
+        df = pd.DataFrame(datos, index=indice, columns=nombres, copy=False)
+    else:
+        usecols = None if columnas is None else [INDICE] + list(columnas)
+        df = pd.read_csv(path, parse_dates=[INDICE], index_col=INDICE, usecols=usecols)
+        df = df.apply(pd.to_numeric, errors='coerce')
+
+    df.index.name = INDICE
+    instrumentacion.contar('filas_leidas', len(df), archivo=path)
+    return df
@@ -0,0 +1,41 @@
+import os
+
+# Carpetas de datos del pipeline. Por defecto 'datos/' en la raíz del
+# proyecto. Se cambian con variables de entorno o con 'python main.py --datos
+# CARPETA' (antes de importar las etapas: los módulos leen sus rutas al
+# importarse). Todas las rutas que se devuelven son absolutas (las relativas
+# que se pasen, respecto al directorio actual), así que no dependen del
+# directorio desde el que se ejecute cada módulo.
+#   BTC_DATOS_DIR       -> raíz de los datos (manifest, informes y subcarpetas)
+#   BTC_RAW_API_DIR     -> CSV descargados de Blockchain.com
+#   BTC_RAW_MANUAL_DIR  -> archivos manuales (EIA, eficiencia)
+#   BTC_PROCESSED_DIR   -> tablas procesadas, pirámides y cachés
+# Sin dependencias: main.py lo importa antes de decidir qué etapas cargar.
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATOS_DIR = os.path.abspath(os.environ.get('BTC_DATOS_DIR') or os.path.join(RAIZ, 'datos'))
+VARIABLES = {
+    'raw_api': 'BTC_RAW_API_DIR',
+    'raw_manual': 'BTC_RAW_MANUAL_DIR',
+    'processed': 'BTC_PROCESSED_DIR',
+}
+
+
+def configurar(datos_dir=None, **carpetas):
+    # carpetas: raw_api=..., raw_manual=..., processed=... (None = sin cambio)
+    global DATOS_DIR
+    if datos_dir:
+        DATOS_DIR = os.path.abspath(datos_dir)
+    for nombre, path in carpetas.items():
+        if path:
+            os.environ[VARIABLES[nombre]] = os.path.abspath(path)
+
+
+def ruta(*partes):
+    # Ruta dentro de la raíz de los datos
+    return os.path.join(DATOS_DIR, *partes)
+
+
+def carpeta(nombre, *partes):
+    # Ruta dentro de una de las subcarpetas de datos (ver VARIABLES)
+    return os.path.join(os.path.abspath(os.environ.get(VARIABLES[nombre]) or ruta(nombre)), *partes)
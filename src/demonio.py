@@ -0,0 +1,147 @@
+import os
+import gc
+import time
+import signal
+import threading
+import almacen
+import metricas
+import pipeline
+import descargar_blockchain
+import limpiar_eia
+import procesar_datos
+import escenarios
+import generar_web
+
+# Modo demonio: un proceso que se queda en marcha y refresca el dashboard cada
+# INTERVALO segundos. La primera vuelta ejecuta el pipeline completo (con el
+# manifest, como main.py); las siguientes son "en caliente": descarga
+# incremental, fusión de las filas nuevas sobre el dataset maestro que ya está
+# en memoria, bandas de escenarios y regeneración de la web (las figuras sin
+# cambios salen de su caché). Sin imports ni relecturas de CSV, un refresco
+# cuesta lo que el delta. Si cambian los datos manuales se vuelve a ejecutar el
+# pipeline completo.
+
+# --- CONFIGURACIÓN ---
+INTERVALO = 600  # Segundos entre consultas a Blockchain.com
+MAX_MEMORIA_MB = 1024  # Por encima, se libera el estado en memoria (se relee del disco)
+# Entradas manuales: si cambian, la vuelta siguiente es completa
+ENTRADAS_MANUALES = [limpiar_eia.INPUT_FILE, procesar_datos.FILE_EFFICIENCY]
+
+_parar = threading.Event()
+
+
+def memoria_actual_mb():
+    # RSS actual (no el pico); solo Linux, en otro sistema no se limita
+    try:
+        with open('/proc/self/statm') as f:
+            paginas = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return paginas * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def firma_manuales():
+    return {path: (os.stat(path).st_size, os.stat(path).st_mtime_ns) if os.path.exists(path) else None
+            for path in ENTRADAS_MANUALES}
+
+
+def vuelta_completa(etapas, estado):
+    # Pipeline con el manifest: solo se ejecuta lo que esté desactualizado
+    pipeline.ejecutar(etapas)
+    estado['manuales'] = firma_manuales()
+    estado['maestro'] = None  # Se carga en la primera vuelta en caliente
+
+
+def vuelta_caliente(estado, sesion):
+    # Devuelve los milisegundos de cada paso; sin 'fusion' si no había nada nuevo
+    tiempos = {}
+    inicio = time.perf_counter()
+    descargar_blockchain.main(session=sesion)
+    tiempos['descarga'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    if estado['maestro'] is None and almacen.existe_tabla(procesar_datos.OUTPUT_TABLE):
+        estado['maestro'] = almacen.cargar_tabla(procesar_datos.OUTPUT_TABLE)
+    maestro = procesar_datos.main(maestro=estado['maestro'])
+    if maestro is None:
+        return tiempos
+    estado['maestro'] = maestro
+    tiempos['fusion'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    escenarios.main(maestro=maestro)
+    tiempos['escenarios'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    generar_web.main(maestro=maestro)
+    tiempos['web'] = (time.perf_counter() - inicio) * 1000
+    return tiempos
+
+
+def liberar_memoria(estado):
+    memoria = memoria_actual_mb()
+    if memoria is None or memoria <= MAX_MEMORIA_MB:
+        return
+    print(f"  -> {memoria:.0f} MB en uso (máximo {MAX_MEMORIA_MB}): se libera el estado en memoria.")
+    estado['maestro'] = None
+    metricas._cache.clear()
+    gc.collect()
+
+
+def parar(*_):
+    # SIGINT / SIGTERM: se termina la vuelta en curso y se sale
+    _parar.set()
+
+
+def ejecutar(etapas, intervalo=INTERVALO, reloj=time.monotonic, esperar=None, max_vueltas=None):
+    # 'reloj' y 'esperar(segundos)' se pueden sustituir (p. ej. un reloj falso
+    # en pruebas); esperar devuelve True si hay que parar. Las vueltas van a
+    # ritmo fijo: si una se alarga, se saltan los huecos perdidos.
+    esperar = esperar or _parar.wait
+    _parar.clear()
+    anteriores = {}
+    if threading.current_thread() is threading.main_thread():
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            anteriores[senal] = signal.signal(senal, parar)
+
+    estado = {'maestro': None, 'manuales': None}
+    vueltas = 0
+    proxima = reloj()
+    try:
+        with descargar_blockchain.crear_sesion() as sesion:
+            while not _parar.is_set() and (max_vueltas is None or vueltas < max_vueltas):
+                inicio = time.perf_counter()
+                try:
+                    if estado['manuales'] != firma_manuales():
+                        print("\n--- Vuelta completa del pipeline ---")
+                        vuelta_completa(etapas, estado)
+                        print(f"--- Vuelta completa en {time.perf_counter() - inicio:.1f}s ---")
+                    else:
+                        tiempos = vuelta_caliente(estado, sesion)
+                        total = (time.perf_counter() - inicio) * 1000
+                        detalle = ", ".join(f"{paso} {ms:.0f} ms" for paso, ms in tiempos.items())
+                        resultado = "actualizado" if 'fusion' in tiempos else "sin cambios"
+                        print(f"--- Vuelta {vueltas + 1}: {resultado} en {total:.0f} ms ({detalle}) ---")
+                except pipeline.ErrorEtapa as e:
+                    print(f"  -> Vuelta fallida: {e}. Se reintenta en la próxima.")
+                    estado['manuales'] = None
+                except Exception as e:
+                    print(f"  -> Vuelta fallida: {type(e).__name__}: {e}. Se reintenta en la próxima.")
+                    estado['maestro'] = None
+                liberar_memoria(estado)
+                vueltas += 1
+
+                if max_vueltas is not None and vueltas >= max_vueltas:
+                    break
+                ahora = reloj()
+                proxima += intervalo
+                if proxima <= ahora:
+                    proxima = ahora + intervalo - (ahora - proxima) % intervalo
+                if esperar(proxima - ahora):
+                    break
+    finally:
+        for senal, anterior in anteriores.items():
+            signal.signal(senal, anterior)
+    print(f"Demonio detenido tras {vueltas} vueltas.")
+    return vueltas
+
@@ -1,10 +1,36 @@
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import sys
+import json
+import random
+import tempfile
+import contextlib
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import config
+import series_crudas
+import instrumentacion
 
 # --- 1. CONFIGURACIÓN ---
 base_url = "https://api.blockchain.info/charts/"
 parametros = "?timespan=all&format=csv&sampled=false"
-output_folder = 'datos/raw_api'
+# Modo incremental: solo se pide la ventana desde el último día guardado
+parametros_delta = "?start={start}&timespan={dias}days&format=csv&sampled=false"
+output_folder = config.carpeta('raw_api')
+# ETag / Last-Modified de la última respuesta de cada chart (peticiones condicionales)
+ESTADO_HTTP = os.path.join(output_folder, '.estado_http.json')
+
+# Descarga concurrente: todas las peticiones comparten una sesión keep-alive y,
+# como mucho, MAX_WORKERS conexiones abiertas a la vez.
+MAX_WORKERS = 6
+MAX_REINTENTOS = 4  # Intentos por chart antes de darlo por fallido
+BACKOFF_BASE = 0.5  # Segundos; se dobla en cada reintento (con jitter completo)
+BACKOFF_MAX = 8.0
+TIMEOUT = (5, 60)  # (conexión, lectura) en segundos
+CHUNK_BYTES = 64 * 1024
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
 
 # Diccionario mapeando: nombre_archivo -> endpoint_api
 charts_a_descargar = {
@@ -31,31 +57,200 @@ charts_a_descargar = {
     'cost_per_tx': 'cost-per-transaction'  # Coste por transacción minada
 }
 
-def main():
+
+def crear_sesion():
+    # Un único pool de conexiones reutilizado por todos los hilos
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def espera_backoff(intento):
+    # Backoff exponencial con jitter completo para no sincronizar los reintentos
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (intento - 1)))
+
+
+def escribir_atomico(response, destino):
+    # Volcamos el cuerpo por trozos a un temporal de la misma carpeta y lo
+    # renombramos al final: nunca queda un CSV a medio escribir.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(destino) or '.',
+                                    prefix=f".{os.path.basename(destino)}.", suffix='.tmp')
+    n_bytes = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_BYTES):
+                if chunk:
+                    f.write(chunk)
+                    n_bytes += len(chunk)
+        os.replace(tmp_path, destino)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return n_bytes
+
+
+def fusionar_delta(file_path, cuerpo):
+    # Añade las filas nuevas al CSV existente: las filas con timestamp repetido
+    # se sustituyen por la versión recién descargada (la del último día suele
+    # ser parcial). Devuelve el primer timestamp reescrito, o None si el archivo
+    # ya contenía exactamente eso.
+    filas = {}
+    for linea in cuerpo.splitlines():
+        marca = linea.split(b',', 1)[0].strip()
+        if marca:
+            filas[marca] = linea.strip()
+    if not filas:
+        return None
+
+    nuevas = b'\n'.join(filas[m] for m in sorted(filas)) + b'\n'
+    desde = min(filas).decode('ascii')
+    corte = series_crudas.offset_desde(file_path, desde)
+    with open(file_path, 'rb') as f:
+        f.seek(corte)
+        if f.read().strip() == nuevas.strip():
+            return None
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.',
+                                    prefix=f".{os.path.basename(file_path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out, open(file_path, 'rb') as f:
+            pendiente = corte
+            ultimo = b'\n'
+            while pendiente > 0:
+                chunk = f.read(min(CHUNK_BYTES, pendiente))
+                if not chunk:
+                    break
+                out.write(chunk)
+                pendiente -= len(chunk)
+                ultimo = chunk[-1:]
+            if ultimo != b'\n':
+                out.write(b'\n')
+            out.write(nuevas)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return desde
+
+
+def cargar_estado_http():
+    if not os.path.exists(ESTADO_HTTP):
+        return {}
+    try:
+        with open(ESTADO_HTTP, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_estado_http(estado):
+    tmp_path = ESTADO_HTTP + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, ESTADO_HTTP)
+
+
+def descargar_chart(session, nombre_archivo, chart_name, previo=None, incremental=True):
+    # Devuelve (bytes_descargados, estado, error, cabeceras_http, primer_timestamp_modificado)
+    file_path = os.path.join(output_folder, f"{nombre_archivo}.csv")
+    marca = series_crudas.ultima_marca(file_path) if incremental else None
+
+    if marca:
+        ultimo_dia = datetime.strptime(marca[:10], '%Y-%m-%d').date()
+        dias = (datetime.now(timezone.utc).date() - ultimo_dia).days + 2
+        url_completa = f"{base_url}{chart_name}{parametros_delta.format(start=marca[:10], dias=dias)}"
+    else:
+        url_completa = f"{base_url}{chart_name}{parametros}"
+
+    # Peticion condicional solo si repetimos exactamente la misma URL
+    headers = {}
+    previo = previo or {}
+    if previo.get('url') == url_completa:
+        if previo.get('etag'):
+            headers['If-None-Match'] = previo['etag']
+        if previo.get('last_modified'):
+            headers['If-Modified-Since'] = previo['last_modified']
+
+    error = None
+    for intento in range(1, MAX_REINTENTOS + 1):
+        try:
+            with session.get(url_completa, headers=headers, stream=True, timeout=TIMEOUT) as response:
+                if response.status_code == 304:
+                    return 0, 'sin cambios', None, previo, None
+                if response.status_code == 200:
+                    cabeceras = {'url': url_completa,
+                                 'etag': response.headers.get('ETag'),
+                                 'last_modified': response.headers.get('Last-Modified')}
+                    if marca:
+                        cuerpo = response.content
+                        desde = fusionar_delta(file_path, cuerpo)
+                        return len(cuerpo), 'actualizado' if desde else 'sin cambios', None, cabeceras, desde
+                    n_bytes = escribir_atomico(response, file_path)
+                    return n_bytes, 'completo', None, cabeceras, series_crudas.TODO
+                error = f"ERROR {response.status_code}"
+                if response.status_code not in CODIGOS_REINTENTABLES:
+                    break
+        except requests.RequestException as e:
+            error = f"ERROR EXCEPCIÓN: {e}"
+
+        if intento < MAX_REINTENTOS:
+            time.sleep(espera_backoff(intento))
+
+    return 0, None, error, previo, None
+
+
+def main(incremental=True, session=None):
+    # 'session' permite reutilizar las conexiones entre ejecuciones (demonio)
     # --- 2. CREAR CARPETAS ---
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
         print(f"Carpeta '{output_folder}' creada/verificada.")
 
-    print(f"Iniciando descarga de {len(charts_a_descargar)} datasets de Blockchain.com...")
+    modo = "incremental" if incremental else "completa"
+    print(f"Iniciando descarga {modo} de {len(charts_a_descargar)} datasets de Blockchain.com...")
 
-    # --- 3. BUCLE DE DESCARGA ---
-    for nombre_archivo, chart_name in charts_a_descargar.items():
-        url_completa = f"{base_url}{chart_name}{parametros}"
-        print(f"Descargando: {nombre_archivo} ({chart_name})...")
+    # --- 3. DESCARGA CONCURRENTE ---
+    estado_http = cargar_estado_http()
+    cambios = {}
+    resultados = {}
+    inicio = time.perf_counter()
+    sesion = crear_sesion() if session is None else contextlib.nullcontext(session)
+    with sesion as session, ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futuros = {}
+        for nombre_archivo, chart_name in charts_a_descargar.items():
+            print(f"Descargando: {nombre_archivo} ({chart_name})...")
+            tarea = instrumentacion.en_contexto(descargar_chart, nombre_archivo)
+            futuro = pool.submit(tarea, session, nombre_archivo, chart_name,
+                                 estado_http.get(nombre_archivo), incremental)
+            futuros[futuro] = nombre_archivo
 
-        try:
-            response = requests.get(url_completa)
-            if response.status_code == 200:
-                file_path = os.path.join(output_folder, f"{nombre_archivo}.csv")
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(response.text)
+        for futuro in as_completed(futuros):
+            nombre_archivo = futuros[futuro]
+            n_bytes, estado, error, cabeceras, desde = futuro.result()
+            resultados[nombre_archivo] = (n_bytes, estado, error)
+            instrumentacion.contar('bytes_descargados', n_bytes, archivo=nombre_archivo)
+            if cabeceras:
+                estado_http[nombre_archivo] = cabeceras
+            if desde:
+                cambios[nombre_archivo] = desde
+            if error:
+                print(f"  {error} en {charts_a_descargar[nombre_archivo]}")
             else:
-                print(f"  ERROR {response.status_code} en {chart_name}")
-        except Exception as e:
-            print(f"  ERROR EXCEPCIÓN en {chart_name}: {e}")
+                print(f"  OK {nombre_archivo}: {estado} ({n_bytes / 1024:.1f} KB)")
+
+    guardar_estado_http(estado_http)
+    # procesar_datos solo recalcula desde el primer día modificado
+    series_crudas.registrar_cambios(output_folder, cambios)
+
+    fallidos = sum(1 for _, _, error in resultados.values() if error)
+    print(f"\n--- Descarga masiva completada en {time.perf_counter() - inicio:.1f}s "
+          f"({len(resultados) - fallidos} OK, {fallidos} errores). ---")
+    return resultados
 
-    print("\n--- Descarga masiva completada. ---")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(incremental='--completa' not in sys.argv)
@@ -0,0 +1,145 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+from statistics import NormalDist
+from concurrent.futures import ThreadPoolExecutor
+import config
+import almacen
+
+# Barrido de escenarios del coste de un ataque. El dashboard calcula un único
+# coste (attack_hourly_cost_usd: la eficiencia del dataset y el precio
+# industrial de EE. UU.); aquí se evalúa, para cada día del
+# dataset, una rejilla de escenarios (producto cartesiano de los ejes de abajo)
+# y se guardan los percentiles del coste entre escenarios, que la pestaña de
+# seguridad pinta como bandas.
+#
+# Coste de un escenario s el día d (USD):
+#   potencia atacante (W) = hashrate_d * cuota/(1 - cuota) * eficiencia_d * factor_eficiencia
+#   coste = potencia/1000 * precio_d * multiplicador * duración  +  potencia * capex
+# Con cuota = 0.5 el atacante iguala a la red actual (el supuesto de
+# attack_hourly_cost_usd, que es el escenario p50 / x1 / 0.5 / 1 h / sin capex).
+# hashrate_d * eficiencia_d es común a todos los escenarios del día y positivo,
+# así que sale fuera de los percentiles: por escenario solo queda
+# precio_d * a_s + b_s, evaluado por bloques con broadcasting.
+
+# --- CONFIGURACIÓN ---
+INPUT_TABLE = config.carpeta('processed', "dataset_final_btc")
+OUTPUT_TABLE = config.carpeta('processed', "escenarios_ataque")
+
+# Ejes de la rejilla
+# Percentiles de la eficiencia del hardware del atacante: la eficiencia del
+# dataset (procesar_datos.MODELO_EFICIENCIA) se toma como mediana y el
+# hardware se supone log-normal a su alrededor
+PERCENTILES_EFICIENCIA = tuple(range(5, 100, 5))
+DISPERSION_EFICIENCIA = 0.35  # Desviación típica del log de la eficiencia (J/TH)
+# Precio de la electricidad: series del dataset (regiones/sectores extraídos
+# por limpiar_eia.SERIES_EIA, p. ej. 'elec_cost_kwh_tx') x multiplicadores.
+# Todas las columnas que empiezan por PREFIJO_PRECIO entran en el barrido.
+PREFIJO_PRECIO = 'elec_cost_kwh'
+MULTIPLICADORES_PRECIO = tuple(np.round(np.linspace(0.5, 2.0, 16), 2))
+CUOTAS_ATACANTE = (0.3, 0.4, 0.5, 0.51, 0.6, 0.67)  # Fracción del hashrate total tras sumarse el atacante
+DURACIONES_H = (1, 6, 24, 72, 168)  # Horas de ataque
+CAPEX_USD_W = (0.0, 0.25, 0.5, 1.0)  # Hardware comprado, USD por vatio de ASIC (0 = ya lo tiene)
+
+# Bandas de salida: columnas attack_cost_p05, attack_cost_p25...
+PERCENTILES = (5, 25, 50, 75, 95)
+PREFIJO_SALIDA = 'attack_cost_p'
+
+# Ejecución: bloques de días (memoria acotada: días x escenarios float64 por
+# hilo) repartidos entre hilos (NumPy suelta el GIL en las operaciones grandes)
+MAX_ELEMENTOS_BLOQUE = 2_000_000  # ~16 MB por hilo
+MAX_HILOS = os.cpu_count() or 1
+
+
+def columna(percentil):
+    return f"{PREFIJO_SALIDA}{percentil:02d}"
+
+
+def series_precio(df):
+    return [c for c in df.columns if c.startswith(PREFIJO_PRECIO) and df[c].notna().any()]
+
+
+def rejilla(columnas_precio):
+    # Escenarios como arrays planos (uno por eje), en el orden del producto cartesiano
+    normal = NormalDist()
+    factores = [np.exp(DISPERSION_EFICIENCIA * normal.inv_cdf(p / 100)) for p in PERCENTILES_EFICIENCIA]
+    ejes = [np.asarray(factores), np.arange(len(columnas_precio)), np.asarray(MULTIPLICADORES_PRECIO, dtype='float64'),
+            np.asarray(CUOTAS_ATACANTE, dtype='float64'), np.asarray(DURACIONES_H, dtype='float64'),
+            np.asarray(CAPEX_USD_W, dtype='float64')]
+    mallas = [m.ravel() for m in np.meshgrid(*ejes, indexing='ij')]
+    return dict(zip(['eficiencia', 'serie_precio', 'multiplicador', 'cuota', 'duracion_h', 'capex_usd_w'], mallas))
+
+
+def coeficientes(escenarios):
+    # coste / (hashrate * eficiencia) = precio[serie] * a + b
+    potencia = escenarios['cuota'] / (1 - escenarios['cuota']) * escenarios['eficiencia']
+    a = potencia / 1000 * escenarios['multiplicador'] * escenarios['duracion_h']
+    b = potencia * escenarios['capex_usd_w']
+    return a, b
+
+
+def _bloque(precios, serie, a, b, percentiles, salida, inicio, fin):
+    # Percentiles de precio[serie] * a + b para las filas [inicio, fin) de
+    # 'precios' (escribe en 'salida')
+    relativo = precios[inicio:fin][:, serie] * a + b
+    if np.isnan(relativo).any():
+        bandas = np.nanpercentile(relativo, percentiles, axis=1)
+    else:
+        bandas = np.percentile(relativo, percentiles, axis=1)
+    salida[inicio:fin] = bandas.T
+
+
+def barrido(df, escenarios=None, percentiles=PERCENTILES, max_hilos=MAX_HILOS):
+    # DataFrame (mismo índice que df) con las bandas de percentiles del coste
+    columnas_precio = series_precio(df)
+    if not columnas_precio:
+        raise KeyError(f"No hay columnas de precio '{PREFIJO_PRECIO}*' en el dataset.")
+    escenarios = escenarios or rejilla(columnas_precio)
+    a, b = coeficientes(escenarios)
+    serie = escenarios['serie_precio']
+
+    # El día solo entra en los percentiles a través de sus precios, que son
+    # mensuales (EIA) y se repiten durante semanas: se calculan una vez por
+    # combinación distinta de precios y se reparten a los días
+    precios, inverso = np.unique(df[columnas_precio].to_numpy(dtype='float64'), axis=0, return_inverse=True)
+    relativo = np.full((len(precios), len(percentiles)), np.nan)
+
+    filas_bloque = max(1, MAX_ELEMENTOS_BLOQUE // len(a))
+    bloques = [(inicio, min(inicio + filas_bloque, len(precios))) for inicio in range(0, len(precios), filas_bloque)]
+    if max_hilos > 1 and len(bloques) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_hilos, len(bloques))) as pool:
+            for futuro in [pool.submit(_bloque, precios, serie, a, b, percentiles, relativo, *bloque)
+                           for bloque in bloques]:
+                futuro.result()
+    else:
+        for bloque in bloques:
+            _bloque(precios, serie, a, b, percentiles, relativo, *bloque)
+
+    base = df['hashrate'].to_numpy(dtype='float64') * df['efficiency_j_th'].to_numpy(dtype='float64')
+    salida = relativo[inverso.reshape(-1)] * base[:, None]
+    return pd.DataFrame(salida, index=df.index, columns=[columna(p) for p in percentiles])
+
+
+def main(maestro=None):
+    # 'maestro' = el dataset ya en memoria (demonio); si no, se lee del almacén
+    print("Calculando escenarios de ataque...")
+    if maestro is None:
+        if not almacen.existe_tabla(INPUT_TABLE):
+            print(f"Error: No se encuentra '{INPUT_TABLE}'.")
+            return
+        maestro = almacen.cargar_tabla(INPUT_TABLE)
+    df = maestro.sort_index()
+
+    inicio = time.perf_counter()
+    escenarios = rejilla(series_precio(df))
+    bandas = barrido(df, escenarios)
+    print(f"  -> {len(escenarios['cuota']):,} escenarios x {len(df):,} días en {time.perf_counter() - inicio:.1f}s")
+
+    rutas = almacen.guardar_tabla(bandas, OUTPUT_TABLE)
+    print(f"Bandas guardadas en: {', '.join(rutas)}")
+    return bandas
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import pandas as pd
+import numpy as np
+import time
+from itertools import combinations
+import config
+import almacen
+import piramides
+
+# Estadísticas móviles del dataset maestro, precalculadas en la fusión:
+#   - por serie y ventana: media, volatilidad anualizada de los rendimientos
+#     logarítmicos y z-score del nivel
+#   - por par de series y ventana: correlación de los rendimientos logarítmicos
+# Todo sale de sumas móviles (n, Σx, Σx², Σxy) obtenidas como diferencias de
+# una suma acumulada: O(filas) por columna, sin bucles por par ni por ventana.
+# La suma acumulada se calcula una vez para todas las ventanas y se reinicia
+# cada BLOQUE_SUMAS filas, así que las diferencias solo restan sumas de dos
+# bloques (el error de redondeo no crece con la longitud de la serie).
+
+# --- CONFIGURACIÓN ---
+OUTPUT_ESTADISTICAS = config.carpeta('processed', "estadisticas_moviles")
+OUTPUT_CORRELACIONES = config.carpeta('processed', "correlaciones_moviles")
+
+VENTANAS_DIAS = (30, 90, 365)
+# Series que no entran (prefijos): las manuales son casi constantes por tramos
+EXCLUIDAS = ('efficiency_j_th', 'elec_cost_kwh')
+# Una ventana con menos de esta fracción de datos válidos da NaN
+MIN_FRACCION_VENTANA = 0.8
+BLOQUE_SUMAS = 4096  # Filas por bloque de la suma acumulada (como mínimo, la ventana más larga)
+MAX_ELEMENTOS_BLOQUE = 8_000_000  # Filas x columnas por pasada (~64 MB por array)
+# Varianzas por debajo de esto (relativo a media²) son ruido de redondeo de
+# una ventana constante (p. ej. el relleno inicial): cuentan como 0
+TOLERANCIA_VARIANZA = 1e-12
+
+
+def nombre_estadistico(columna, estadistico, dias):
+    # estadistico: 'media', 'vol' o 'z'
+    return f"{columna}__{estadistico}_{dias}d"
+
+
+def nombre_correlacion(a, b, dias):
+    return f"corr_{dias}d__{a}__{b}"
+
+
+def buscar_correlacion(columnas, a, b, dias):
+    # Nombre de la columna del par (a, b) en 'columnas', en cualquier orden; None si no está
+    for nombre in (nombre_correlacion(a, b, dias), nombre_correlacion(b, a, dias)):
+        if nombre in columnas:
+            return nombre
+    return None
+
+
+def columnas_estadisticas(df):
+    return [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c]) and not c.startswith(EXCLUIDAS)]
+
+
+def filas_ventana(dias, resolucion):
+    return max(2, int(round(pd.Timedelta(days=dias) / piramides.paso_rejilla(resolucion))))
+
+
+# --- SUMAS MÓVILES ---
+def acumular(valores, bloque):
+    # Suma acumulada de cada columna reiniciada cada 'bloque' filas, y el total
+    # de cada bloque
+    n, k = valores.shape
+    n_pad = -(-n // bloque) * bloque
+    acumulado = np.zeros((n_pad, k))
+    acumulado[:n] = valores
+    acumulado = acumulado.reshape(-1, bloque, k).cumsum(axis=1)
+    totales = acumulado[:, -1].copy()
+    return acumulado.reshape(n_pad, k)[:n], totales
+
+
+def suma_movil(acumulado, totales, filas, bloque):
+    # Suma de las últimas 'filas' filas (incluida la actual). Como filas <=
+    # bloque, la fila que sale de la ventana está en el mismo bloque (se resta)
+    # o en el anterior (se suma el resto de ese bloque).
+    n = len(acumulado)
+    t = np.arange(n)
+    previa = t - filas
+    resultado = acumulado.copy()
+    dentro = previa >= 0
+    resultado[dentro] -= acumulado[previa[dentro]]
+    otro_bloque = dentro & (np.maximum(previa, 0) // bloque < t // bloque)
+    resultado[otro_bloque] += totales[t[otro_bloque] // bloque - 1]
+    return resultado
+
+
+def rendimientos_log(valores):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        logaritmos = np.log(np.where(valores > 0, valores, np.nan))
+    return np.diff(logaritmos, axis=0, prepend=np.nan)
+
+
+def _momentos(x, validos, filas_ventanas, bloque):
+    # Por ventana: (n, media, varianza muestral) de cada columna de x (NaN
+    # donde no hay datos suficientes)
+    ceros = np.where(validos, x, 0.0)
+    acumulado, totales = acumular(np.hstack([validos.astype('float64'), ceros, ceros * ceros]), bloque)
+    k = x.shape[1]
+    resultado = {}
+    for dias, filas in filas_ventanas.items():
+        sumas = suma_movil(acumulado, totales, filas, bloque)
+        n, s, s2 = sumas[:, :k], sumas[:, k:2 * k], sumas[:, 2 * k:]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = s / n
+            varianza = np.maximum(s2 - s * media, 0.0) / (n - 1)
+        varianza[varianza <= TOLERANCIA_VARIANZA * media * media] = 0.0
+        insuficientes = n < max(2, MIN_FRACCION_VENTANA * filas)
+        media[insuficientes] = np.nan
+        varianza[insuficientes] = np.nan
+        resultado[dias] = (media, varianza)
+    return resultado
+
+
+def estadisticos(df, columnas, resolucion):
+    filas_ventanas = {dias: filas_ventana(dias, resolucion) for dias in VENTANAS_DIAS}
+    bloque = max(BLOQUE_SUMAS, max(filas_ventanas.values()))
+    anual = np.sqrt(pd.Timedelta(days=365) / piramides.paso_rejilla(resolucion))
+    niveles = df[columnas].to_numpy(dtype='float64')
+    rendimientos = rendimientos_log(niveles)
+
+    datos = {}
+    momentos_nivel = _momentos(niveles, ~np.isnan(niveles), filas_ventanas, bloque)
+    momentos_rend = _momentos(rendimientos, np.isfinite(rendimientos), filas_ventanas, bloque)
+    for dias in VENTANAS_DIAS:
+        media, varianza = momentos_nivel[dias]
+        _, varianza_rend = momentos_rend[dias]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = (niveles - media) / np.sqrt(varianza)
+        z[~np.isfinite(z)] = np.nan
+        for j, col in enumerate(columnas):
+            datos[nombre_estadistico(col, 'media', dias)] = media[:, j]
+            datos[nombre_estadistico(col, 'vol', dias)] = np.sqrt(varianza_rend[:, j]) * anual
+            datos[nombre_estadistico(col, 'z', dias)] = z[:, j]
+    return pd.DataFrame(datos, index=df.index)
+
+
+def correlaciones(df, columnas, resolucion):
+    # Correlación móvil de los rendimientos logarítmicos de todos los pares,
+    # por grupos de pares (memoria acotada). Cada par usa solo las filas en
+    # que las dos series tienen dato.
+    filas_ventanas = {dias: filas_ventana(dias, resolucion) for dias in VENTANAS_DIAS}
+    bloque = max(BLOQUE_SUMAS, max(filas_ventanas.values()))
+    rendimientos = rendimientos_log(df[columnas].to_numpy(dtype='float64'))
+    validos = np.isfinite(rendimientos)
+    rendimientos = np.where(validos, rendimientos, 0.0)
+    pares = list(combinations(range(len(columnas)), 2))
+    pares_pasada = max(1, MAX_ELEMENTOS_BLOQUE // (6 * max(len(df), 1)))
+
+    datos = {}
+    for inicio in range(0, len(pares), pares_pasada):
+        grupo = np.array(pares[inicio:inicio + pares_pasada])
+        i, j = grupo[:, 0], grupo[:, 1]
+        ambos = (validos[:, i] & validos[:, j]).astype('float64')
+        x, y = rendimientos[:, i] * ambos, rendimientos[:, j] * ambos
+        acumulado, totales = acumular(np.hstack([ambos, x, y, x * x, y * y, x * y]), bloque)
+        k = len(grupo)
+        for dias, filas in filas_ventanas.items():
+            n, sx, sy, sxx, syy, sxy = np.split(suma_movil(acumulado, totales, filas, bloque), 6, axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                covarianza = sxy - sx * sy / n
+                varianzas = np.maximum(sxx - sx * sx / n, 0.0) * np.maximum(syy - sy * sy / n, 0.0)
+                corr = np.clip(covarianza / np.sqrt(varianzas), -1.0, 1.0)
+            corr[(n < max(2, MIN_FRACCION_VENTANA * filas)) | ~np.isfinite(corr)] = np.nan
+            for c in range(k):
+                datos[nombre_correlacion(columnas[i[c]], columnas[j[c]], dias)] = corr[:, c]
+    return pd.DataFrame(datos, index=df.index)
+
+
+def actualizar(df, resolucion):
+    # Recalcula y guarda las dos tablas (es O(filas x columnas): barato aun
+    # en la fusión incremental)
+    inicio = time.perf_counter()
+    df = df.sort_index()
+    columnas = columnas_estadisticas(df)
+    tabla_estadisticas = estadisticos(df, columnas, resolucion)
+    tabla_correlaciones = correlaciones(df, columnas, resolucion)
+    almacen.guardar_tabla(tabla_estadisticas, OUTPUT_ESTADISTICAS)
+    almacen.guardar_tabla(tabla_correlaciones, OUTPUT_CORRELACIONES)
+    print(f"  -> Estadísticas móviles: {len(columnas)} series, {len(columnas) * (len(columnas) - 1) // 2} pares, "
+          f"ventanas {', '.join(f'{d}d' for d in VENTANAS_DIAS)} en {time.perf_counter() - inicio:.2f}s")
@@ -0,0 +1,105 @@
+import pandas as pd
+import numpy as np
+import os
+
+# Eficiencia del parque minero por cohortes de hardware. efficiency_manual.csv
+# lista lanzamientos de hardware (fecha, J/TH); interpolarlo supone que toda la
+# red funciona siempre con el ASIC más nuevo. Aquí cada lanzamiento es una
+# cohorte: el crecimiento del hashrate (y la reposición de lo que se retira)
+# se compra con el hardware más eficiente disponible ese día, entra en servicio
+# según una curva de despliegue y se retira según una curva de supervivencia.
+# La eficiencia de la red es la media de las cohortes en servicio ponderada por
+# su hashrate:
+#   en_servicio = compras (*) K        K = despliegue (*) supervivencia
+#   potencia    = (compras * eficiencia_compra) (*) K
+#   eficiencia  = potencia / en_servicio
+# ((*) = convolución causal, por FFT). El coste no depende del número de
+# cohortes (solo fijan la eficiencia de compra de cada día).
+
+# --- CONFIGURACIÓN ---
+DESPLIEGUE_DIAS = 90  # El hardware comprado un día entra en servicio repartido en los días siguientes
+VIDA_UTIL_DIAS = 4 * 365  # Escala de la curva de retirada (Weibull)
+FORMA_RETIRADA = 3.0  # > 1: las retiradas se concentran alrededor de la vida útil
+UMBRAL_SUPERVIVENCIA = 1e-6  # La curva se corta cuando sobrevive menos de esta fracción
+# Media móvil (hacia atrás) del hashrate antes de repartir su crecimiento: la
+# estimación diaria es ruidosa y cada subida espuria sería una compra
+SUAVIZADO_HASHRATE_DIAS = 30
+# Reposición: lo que se retira se vuelve a comprar (punto fijo, una
+# convolución por iteración)
+MAX_ITERACIONES_REPOSICION = 50
+TOLERANCIA_REPOSICION = 1e-9
+# Convolución por bloques (overlap-add): el hashrate abarca ~17 órdenes de
+# magnitud y una FFT de toda la serie dejaría los primeros años en el ruido de
+# redondeo de los últimos; por bloques, cada tramo lleva su propio error.
+BLOQUE_FFT = 512
+
+
+def leer_cohortes(path):
+    # (días desde epoch, J/TH) de cada lanzamiento, por fecha; None si no hay archivo
+    if not os.path.exists(path):
+        return None
+    df = pd.read_csv(path, parse_dates=['date']).dropna().sort_values('date')
+    return df['date'].to_numpy(dtype='datetime64[D]').view('int64'), df['efficiency_j_th'].to_numpy(dtype='float64')
+
+
+def eficiencia_compra(dias, cohortes):
+    # J/TH del hardware más eficiente lanzado hasta cada día (antes del primer
+    # lanzamiento, el primero)
+    fechas, eficiencias = cohortes
+    disponibles = np.minimum.accumulate(eficiencias)
+    return disponibles[np.maximum(np.searchsorted(fechas, dias, side='right') - 1, 0)]
+
+
+def curvas():
+    # (K, retirada): fracción de una compra en servicio y fracción que se
+    # retira, por días desde la compra
+    edades = np.arange(1, int(VIDA_UTIL_DIAS * 10) + 1)
+    supervivencia = np.exp(-(edades / VIDA_UTIL_DIAS) ** FORMA_RETIRADA)
+    supervivencia = np.concatenate(([1.0], supervivencia[supervivencia >= UMBRAL_SUPERVIVENCIA]))
+    despliegue = np.full(DESPLIEGUE_DIAS, 1 / DESPLIEGUE_DIAS) if DESPLIEGUE_DIAS > 1 else np.ones(1)
+    en_servicio = np.convolve(despliegue, supervivencia)
+    retirada = np.convolve(despliegue, -np.diff(supervivencia, append=0.0))
+    return en_servicio, retirada
+
+
+def convolucion(x, kernel):
+    # Convolución causal (primeros len(x) valores) por bloques con FFT
+    n_fft = 1 << int(np.ceil(np.log2(BLOQUE_FFT + len(kernel) - 1)))
+    n_bloques = -(-len(x) // BLOQUE_FFT)
+    bloques = np.zeros((n_bloques, BLOQUE_FFT))
+    bloques.ravel()[:len(x)] = x
+    parciales = np.fft.irfft(np.fft.rfft(bloques, n_fft, axis=1) * np.fft.rfft(kernel, n_fft), n_fft, axis=1)
+
+    salida = np.zeros(n_bloques * BLOQUE_FFT + n_fft)
+    for i in range(n_bloques):
+        salida[i * BLOQUE_FFT:i * BLOQUE_FFT + n_fft] += parciales[i]
+    return salida[:len(x)]
+
+
+def compras(hashrate, retirada):
+    # Hashrate comprado cada día: el crecimiento (el primer día, todo el
+    # hashrate) más la reposición de lo retirado. Las bajadas no se compran.
+    crecimiento = np.maximum(np.diff(hashrate, prepend=0.0), 0.0)
+    resultado = crecimiento
+    for _ in range(MAX_ITERACIONES_REPOSICION):
+        siguiente = crecimiento + np.maximum(convolucion(resultado, retirada), 0.0)
+        if np.allclose(siguiente, resultado, rtol=TOLERANCIA_REPOSICION, atol=0.0):
+            return siguiente
+        resultado = siguiente
+    return resultado
+
+
+def eficiencia_red(hashrate, cohortes):
+    # hashrate: Series diaria (TH/s). Devuelve la eficiencia del parque (J/TH)
+    # con el mismo índice.
+    suavizado = hashrate.ffill().bfill().rolling(SUAVIZADO_HASHRATE_DIAS, min_periods=1).mean()
+    valores = suavizado.to_numpy(dtype='float64')
+    dias = hashrate.index.to_numpy(dtype='datetime64[D]').view('int64')
+
+    en_servicio, retirada = curvas()
+    comprado = compras(valores, retirada)
+    capacidad = convolucion(comprado, en_servicio)
+    potencia = convolucion(comprado * eficiencia_compra(dias, cohortes), en_servicio)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        eficiencia = np.where(capacidad > 0, potencia / capacidad, np.nan)
+    return pd.Series(eficiencia, index=hashrate.index, name='efficiency_j_th').ffill().bfill()
@@ -1,36 +1,446 @@
 import pandas as pd
+import plotly
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import os
+import json
+import base64
+import gzip
+import hashlib
+import inspect
+import re
+import numpy as np
+import config
+import almacen
+import metricas
+import escenarios
+import estadisticas
+import submuestreo
+import instrumentacion
+
+# Compresión brotli de los fragmentos (opcional; gzip siempre)
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # --- CONFIGURACIÓN DE RUTAS ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-BASE_DIR = os.path.dirname(SCRIPT_DIR)
-INPUT_FILE = os.path.join(BASE_DIR, "datos", "processed", "dataset_final_btc.csv")
+BASE_DIR = config.RAIZ
+INPUT_TABLE = config.carpeta('processed', "dataset_final_btc")
+# Bandas del barrido de escenarios de ataque (escenarios.py) y estadísticas
+# móviles (estadisticas.py); opcionales: sin ellas no se pintan sus figuras
+INPUT_ESCENARIOS = config.carpeta('processed', "escenarios_ataque")
+INPUT_ESTADISTICAS = config.carpeta('processed', "estadisticas_moviles")
+INPUT_CORRELACIONES = config.carpeta('processed', "correlaciones_moviles")
+TABLAS_ADICIONALES = [INPUT_ESCENARIOS, INPUT_ESTADISTICAS, INPUT_CORRELACIONES]
 OUTPUT_FILE = os.path.join(BASE_DIR, "index.html")
+# Datos a resolución completa, que la página pide solo al hacer zoom
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+FILE_DATOS_COMPLETOS = os.path.join(ASSETS_DIR, "datos_completos.json")
 
+# Columnas del dataset maestro que usa el dashboard (solo se leen estas)
+COLUMNAS = ['precio_btc', 'trade_volume_exchange', 'n_unique_addresses', 'transacciones_dia',
+            'hashrate', 'dificultad', 'mempool_size', 'avg_block_size',
+            'miners_revenue_usd', 'fees_total_btc', 'cost_per_tx']
+# Métricas derivadas (ver metricas.py); sus entradas se cargan automáticamente
+METRICAS = ['network_power_gw', 'attack_hourly_cost_usd']
+# Pestaña de relaciones entre métricas: pares cuya correlación móvil se pinta
+# y series de las que se pintan la volatilidad y el z-score
+PARES_CORRELACION = [('precio_btc', 'hashrate'), ('precio_btc', 'transacciones_dia'),
+                     ('precio_btc', 'fees_total_btc'), ('hashrate', 'miners_revenue_usd')]
+SERIE_MEDIAS = 'precio_btc'  # Se pinta con sus medias móviles
+SERIES_VOLATILIDAD = ['precio_btc', 'hashrate', 'fees_total_btc']
+VENTANA_VOLATILIDAD = 90  # Días (una de estadisticas.VENTANAS_DIAS)
+VENTANA_ZSCORE = 365
+ETIQUETAS = {'precio_btc': "Precio", 'hashrate': "Hashrate", 'transacciones_dia': "Transacciones",
+             'fees_total_btc': "Fees", 'miners_revenue_usd': "Ingresos mineros"}
+COLORES_VENTANAS = ['#17a2b8', '#6f42c1', '#343a40']  # Una por ventana, de la más corta a la más larga
+COLORES_SERIES = ['#F7931A', '#4D4D4D', 'orange']
 
-def main():
-    print("Generando dashboard...")
+# Nivel de detalle: puntos máximos por traza en la vista inicial. Con zoom,
+# si la ventana visible cabe en ZOOM_MAX_PUNTOS se muestra a resolución completa.
+PUNTOS_POR_TRAZA = 1000
+METODO_SUBMUESTREO = 'lttb'  # 'lttb', 'minmax' o None (sin reducir)
+ZOOM_MAX_PUNTOS = 5000
+# API de series por rango (servidor.py). Si la página se sirve por HTTP y la API
+# responde, el zoom pide solo la ventana visible; si no, usa los datos completos.
+# None = no usar la API.
+URL_API = "api/series"
+
+# Motor de dibujo de las trazas: 'auto' usa WebGL (Scattergl) en las series con
+# más de UMBRAL_WEBGL puntos y SVG en el resto; 'svg' / 'webgl' lo fuerzan.
+# Las trazas con opciones que WebGL no dibuja igual (relleno de área) siguen en SVG.
+MOTOR_GRAFICOS = 'auto'
+UMBRAL_WEBGL = 20_000
+OPCIONES_SOLO_SVG = {'fill': 'none'}  # opción -> valor con el que no se usa
+
+# Codificación de los datos en la página: un único eje de fechas compartido y
+# cada columna como array binario en base64 ('f4' = float32, 'f8' = float64).
+# float32 guarda ~7 cifras significativas, suficiente para pintar casi todo.
+PRECISION_DEFECTO = 'f4'
+PRECISION_COLUMNAS = {
+    'precio_btc': 'f8',
+}
+# Salida de los datos de las figuras:
+#   'inline'     -> dentro de index.html (la página funciona abierta como archivo)
+#   'fragmentos' -> un fragmento por pestaña en assets/fragmentos, precomprimido
+#                   (.gz y .br), que se descarga la primera vez que se abre la
+#                   pestaña. Necesita servir la carpeta por HTTP.
+# En los dos modos cada figura se pinta solo cuando su pestaña se muestra.
+MODO_SALIDA = 'inline'
+# En modo 'inline' los datos a resolución completa (zoom) también van dentro
+# de index.html, en un bloque JSON que la página solo decodifica al primer
+# zoom: abierta como archivo (file://) no puede descargar assets/. Por encima
+# de este tamaño se dejan solo en assets/datos_completos.json.
+MAX_MB_COMPLETOS_EN_PAGINA = 20
+CARPETA_FRAGMENTOS = os.path.join(ASSETS_DIR, "fragmentos")
+
+# Caché de fragmentos: la especificación y los datos codificados de cada figura
+# se reutilizan mientras no cambien sus columnas de entrada, su función
+# constructora y sus parámetros (etiquetas, colores... ver parametros_figuras)
+# ni la configuración de codificación. None = sin caché.
+CARPETA_CACHE_WEB = config.carpeta('processed', ".cache_web")
+
+# Runtime de la página (decodifica los datos y pinta las figuras)
+RUNTIME_JS = os.path.join(SCRIPT_DIR, "web", "dashboard.js")
+
+# Librerías de la página (Plotly, Bootstrap), cada una se carga una sola vez:
+#   'cdn'     -> desde sus CDN públicos
+#   'offline' -> copias locales en assets/static con el hash del contenido en el
+#                nombre (caché de larga duración), minificadas y precomprimidas.
+#                La página no hace ninguna petición externa.
+RECURSOS = 'cdn'
+PLOTLY_CDN = "https://cdn.plot.ly/plotly-{version}.min.js"
+BOOTSTRAP_CSS_CDN = "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css"
+BOOTSTRAP_JS_CDN = "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"
+# Plotly.js viene con el paquete de Python; Bootstrap se descarga aquí una sola
+# vez (para un entorno sin red, copiar esta carpeta desde una máquina con red)
+VENDOR_DIR = os.path.join(SCRIPT_DIR, "web", "vendor")
+CARPETA_ESTATICOS = os.path.join(ASSETS_DIR, "static")
+# Cabeceras de caché para el servidor estático (formato _headers de Netlify / Cloudflare Pages)
+FILE_CABECERAS = os.path.join(os.path.dirname(OUTPUT_FILE), "_headers")
+CACHE_ESTATICOS = "public, max-age=31536000, immutable"
+
+
+def motor_traza(n_puntos, kwargs):
+    # 'webgl' si la serie es densa y la traza no usa nada que solo tenga SVG
+    if MOTOR_GRAFICOS == 'svg':
+        return 'svg'
+    solo_svg = [opcion for opcion, inactivo in OPCIONES_SOLO_SVG.items() if kwargs.get(opcion, inactivo) != inactivo]
+    if solo_svg:
+        return 'svg'
+    if MOTOR_GRAFICOS == 'webgl' or n_puntos > UMBRAL_WEBGL:
+        return 'webgl'
+    return 'svg'
+
+
+def serie(df, columna, **kwargs):
+    # Traza sin datos: 'meta' guarda la columna y la página la rellena con los
+    # datos compartidos (ver series_vista)
+    if motor_traza(int(df[columna].count()), kwargs) == 'webgl':
+        return go.Scattergl(meta=columna, **kwargs)
+    return go.Scatter(meta=columna, **kwargs)
+
+
+def a_base64(valores, tipo):
+    return base64.b64encode(np.ascontiguousarray(valores, dtype='<' + tipo).tobytes()).decode('ascii')
+
+
+def codificar_eje(indice):
+    # Eje regular -> inicio + paso; si no, deltas en ms (uint32) desde el inicio
+    marcas = indice.to_numpy(dtype='datetime64[ms]').view('int64')
+    eje = {'n': len(marcas), 'inicio': int(marcas[0]) if len(marcas) else 0}
+    pasos = np.diff(marcas)
+    if len(pasos) == 0 or (pasos == pasos[0]).all():
+        eje['paso'] = int(pasos[0]) if len(pasos) else 0
+    elif pasos.min() >= 0 and pasos.max() < 2 ** 32:
+        eje['deltas'] = a_base64(pasos, 'u4')
+    else:
+        eje['x'] = a_base64(marcas, 'f8')
+    return eje
+
+
+def codificar_columna(valores, columna, indices=None):
+    tipo = PRECISION_COLUMNAS.get(columna, PRECISION_DEFECTO)
+    if indices is None:
+        return {'y': a_base64(valores, tipo), 'tipo': tipo}
+    # Índices de los puntos conservados sobre el eje compartido, como deltas
+    deltas = np.diff(indices, prepend=0)
+    tipo_i = 'u2' if deltas.max(initial=0) < 2 ** 16 else 'u4'
+    return {'y': a_base64(valores[indices], tipo), 'tipo': tipo,
+            'i': a_base64(deltas, tipo_i), 'tipo_i': tipo_i}
+
+
+def escala_log(spec, traza):
+    # La reducción se evalúa sobre la escala con que se verá el eje Y
+    eje = 'yaxis' + (traza.get('yaxis') or 'y')[1:]
+    return spec['layout'].get(eje, {}).get('type') == 'log'
+
+
+def series_vista(df, spec):
+    # Vista inicial: cada columna reducida a como mucho PUNTOS_POR_TRAZA puntos
+    # (los picos se conservan). Una columna usada en varias trazas se guarda una vez.
+    marcas = df.index.to_numpy(dtype='datetime64[ns]').view('int64')
+    series = {}
+    for traza in spec['data']:
+        if traza['meta'] in series:
+            continue
+        valores = df[traza['meta']].to_numpy(dtype='float64')
+        idx = submuestreo.reducir(marcas, valores, PUNTOS_POR_TRAZA, METODO_SUBMUESTREO, escala_log(spec, traza))
+        series[traza['meta']] = codificar_columna(valores, traza['meta'], idx)
+    return series
+
+
+def escribir_comprimido(path, contenido):
+    # Escritura atómica del archivo y de sus copias precomprimidas (.gz y, si
+    # está brotli, .br) para servirlas tal cual, sin comprimir en cada petición.
+    # Si el archivo ya tiene ese contenido no se reescribe nada.
+    if os.path.exists(path) and os.path.exists(path + '.gz') and (brotli is None) == (not os.path.exists(path + '.br')):
+        with open(path, 'rb') as f:
+            if f.read() == contenido:
+                return os.path.getsize(path + '.gz')
+    versiones = {path: contenido, path + '.gz': gzip.compress(contenido, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        versiones[path + '.br'] = brotli.compress(contenido, quality=11)
+    elif os.path.exists(path + '.br'):
+        os.remove(path + '.br')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for destino, datos_destino in versiones.items():
+        tmp_path = destino + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(datos_destino)
+        os.replace(tmp_path, destino)
+        instrumentacion.contar('bytes_emitidos', len(datos_destino), archivo=destino)
+    return os.path.getsize(path + '.gz')
+
+
+def escribir_json(path, datos):
+    contenido = json.dumps(datos, cls=plotly.utils.PlotlyJSONEncoder, separators=(',', ':')).encode('utf-8')
+    return escribir_comprimido(path, contenido)
 
-    if not os.path.exists(INPUT_FILE):
-        print(f"Error: No se encuentra '{INPUT_FILE}'.")
+
+def datos_completos(df, columnas):
+    # Mismo formato que la vista inicial, sin reducir (se pide solo con zoom)
+    return {
+        't': codificar_eje(df.index),
+        'series': {col: codificar_columna(df[col].to_numpy(dtype='float64'), col) for col in sorted(columnas)},
+    }
+
+
+def huella(*partes):
+    h = hashlib.blake2b(digest_size=16)
+    for parte in partes:
+        h.update(parte if isinstance(parte, bytes) else str(parte).encode('utf-8'))
+        h.update(b'|')
+    return h.hexdigest()
+
+
+def huella_columnas(df, columnas):
+    return huella(df.index.to_numpy(dtype='datetime64[ns]').tobytes(),
+                  *(np.ascontiguousarray(df[col].to_numpy(dtype='float64')).tobytes() for col in columnas))
+
+
+def version_codificacion():
+    # Todo lo que, además de los datos, determina un fragmento: código de la
+    # codificación y del submuestreo, configuración y versión de Plotly
+    funciones = [serie, motor_traza, a_base64, codificar_eje, codificar_columna, escala_log,
+                 series_vista, especificacion, submuestreo]
+    configuracion = [PUNTOS_POR_TRAZA, METODO_SUBMUESTREO, PRECISION_DEFECTO, sorted(PRECISION_COLUMNAS.items()),
+                     MOTOR_GRAFICOS, UMBRAL_WEBGL, sorted(OPCIONES_SOLO_SVG.items()), plotly.__version__]
+    return huella(*(inspect.getsource(f) for f in funciones), *configuracion)
+
+
+def huella_figura(constructor, parametros, version):
+    # Código del constructor + sus parámetros (JSON con claves ordenadas: la
+    # misma huella en cualquier proceso). Lo que un constructor lee fuera de su
+    # código tiene que llegarle en 'parametros' (ver parametros_figuras).
+    return huella(version, inspect.getsource(constructor),
+                  json.dumps(parametros, sort_keys=True, separators=(',', ':')))
+
+
+def cargar_indice_cache():
+    # id de la figura -> versión del constructor y columnas que usó la última vez
+    path = os.path.join(CARPETA_CACHE_WEB, 'indice.json') if CARPETA_CACHE_WEB else None
+    if path and os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def guardar_indice_cache(indice, claves_usadas):
+    # Solo se conservan los fragmentos de esta ejecución
+    if not CARPETA_CACHE_WEB:
         return
+    os.makedirs(CARPETA_CACHE_WEB, exist_ok=True)
+    for nombre in os.listdir(CARPETA_CACHE_WEB):
+        if nombre != 'indice.json' and nombre[:-len('.json')] not in claves_usadas:
+            os.remove(os.path.join(CARPETA_CACHE_WEB, nombre))
+    tmp_path = os.path.join(CARPETA_CACHE_WEB, 'indice.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(indice, f, indent=1)
+    os.replace(tmp_path, os.path.join(CARPETA_CACHE_WEB, 'indice.json'))
 
-    # 1. CARGA DE DATOS
-    df = pd.read_csv(INPUT_FILE, parse_dates=['date'], index_col='date')
-    df.sort_index(inplace=True)
-    df = df.apply(pd.to_numeric, errors='coerce')
 
-    # 2. CÁLCULOS DERIVADOS
-    df['network_power_gw'] = (df['hashrate'] * df['efficiency_j_th']) / 1e9
-    df['attack_hourly_cost_usd'] = (df['hashrate'] * df['efficiency_j_th'] / 1000) * df['elec_cost_kwh']
+_especificaciones = {}  # id de la figura -> (clave, especificación), en memoria
+
+
+def fragmento_figura(df, id_div, constructor, parametros, indice, version):
+    # Especificación + series reducidas de una figura, reutilizando la caché si
+    # la versión del constructor (código y parámetros) y los datos de sus
+    # columnas no han cambiado. Devuelve (clave, fragmento, reutilizado).
+    version_figura = huella_figura(constructor, parametros, version)
+    registro = indice.get(id_div)
+    if CARPETA_CACHE_WEB and registro and registro['version'] == version_figura \
+            and all(col in df.columns for col in registro['columnas']):
+        clave = huella(version_figura, huella_columnas(df, registro['columnas']))
+        path = os.path.join(CARPETA_CACHE_WEB, clave + '.json')
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    return clave, json.load(f), True
+            except (OSError, ValueError):
+                pass
+
+    # La especificación solo depende de los datos a través del motor de cada
+    # traza (SVG/WebGL): en un proceso que sigue vivo (demonio) se reutiliza
+    # mientras no cambien el constructor ni esos motores
+    clave_spec = None
+    if registro and registro['version'] == version_figura and all(col in df.columns for col in registro['columnas']):
+        clave_spec = huella(version_figura, *(int(df[col].count()) > UMBRAL_WEBGL for col in registro['columnas']))
+    previa = _especificaciones.get(id_div)
+    if clave_spec is not None and previa is not None and previa[0] == clave_spec:
+        spec = previa[1]
+    else:
+        fig = constructor(df, parametros)
+        # Las trazas llevan el eje X como ms desde epoch: el eje debe declararse de fechas
+        fig.update_xaxes(type='date')
+        spec = especificacion(fig)
+    fragmento = {'figura': spec, 'series': series_vista(df, spec)}
+    columnas = list(fragmento['series'])
+    clave = huella(version_figura, huella_columnas(df, columnas))
+    indice[id_div] = {'version': version_figura, 'columnas': columnas}
+    _especificaciones[id_div] = (huella(version_figura, *(int(df[col].count()) > UMBRAL_WEBGL for col in columnas)),
+                                 spec)
+    if CARPETA_CACHE_WEB:
+        os.makedirs(CARPETA_CACHE_WEB, exist_ok=True)
+        path = os.path.join(CARPETA_CACHE_WEB, clave + '.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(fragmento, f, cls=plotly.utils.PlotlyJSONEncoder, separators=(',', ':'))
+        os.replace(path + '.tmp', path)
+    return clave, fragmento, False
+
+
+def url_relativa(path):
+    return os.path.relpath(path, os.path.dirname(OUTPUT_FILE)).replace(os.sep, '/')
+
+
+def minificar_js(texto):
+    # Minificación conservadora para el runtime propio: quita comentarios de
+    # línea completa, sangrías y líneas vacías (no toca el código)
+    lineas = (linea.strip() for linea in texto.splitlines())
+    return '\n'.join(linea for linea in lineas if linea and not linea.startswith('//')) + '\n'
+
+
+def copia_vendor(url):
+    # Copia local de una librería externa; solo se descarga si no existe.
+    # None si no hay copia y no se puede descargar.
+    path = os.path.join(VENDOR_DIR, url.rsplit('/', 1)[-1])
+    if not os.path.exists(path):
+        import requests  # Solo hace falta la primera vez en modo 'offline'
+        print(f"  -> Descargando {url} en {os.path.relpath(path, BASE_DIR)}")
+        try:
+            response = requests.get(url, timeout=30)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"  -> No se pudo descargar ({e.__class__.__name__}); copia el archivo a mano en "
+                  f"{os.path.relpath(VENDOR_DIR, BASE_DIR)}. Mientras tanto se enlaza el CDN.")
+            return None
+        os.makedirs(VENDOR_DIR, exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(response.content)
+        os.replace(path + '.tmp', path)
+    with open(path, 'rb') as f:
+        return f.read()
+
 
-    # --- GENERACIÓN DE GRÁFICOS ---
+def publicar_estatico(nombre, contenido):
+    # nombre.ext -> assets/static/nombre.<hash>.ext: si el contenido no cambia,
+    # la URL tampoco, y el navegador puede guardarlo en caché indefinidamente
+    base, ext = nombre.split('.', 1)
+    huella = hashlib.sha256(contenido).hexdigest()[:12]
+    path = os.path.join(CARPETA_ESTATICOS, f"{base}.{huella}.{ext}")
+    if not os.path.exists(path):
+        escribir_comprimido(path, contenido)
+    return path
 
-    # ---------------------------------------------------------
-    # PESTAÑA 2: MERCADO Y ADOPCIÓN (4 Variables)
-    # ---------------------------------------------------------
+
+def preparar_recursos():
+    # URLs (relativas a index.html en modo offline) de las librerías y del runtime
+    with open(RUNTIME_JS, encoding='utf-8') as f:
+        runtime_js = f.read()
+    if RECURSOS != 'offline':
+        return {
+            'plotly_js': PLOTLY_CDN.format(version=plotly.offline.get_plotlyjs_version()),
+            'bootstrap_css': BOOTSTRAP_CSS_CDN,
+            'bootstrap_js': BOOTSTRAP_JS_CDN,
+            'runtime_js': None,
+            'runtime_inline': runtime_js,
+        }
+
+    archivos = {
+        'plotly_js': ('plotly.min.js', plotly.offline.get_plotlyjs().encode('utf-8')),
+        'runtime_js': ('dashboard.min.js', minificar_js(runtime_js).encode('utf-8')),
+    }
+    externos = {}
+    # Los mapas de código fuente no se publican: se quita la referencia
+    sin_mapa = re.compile(rb'\n?/[*/]# sourceMappingURL=[^\n]*')
+    for clave, url in [('bootstrap_css', BOOTSTRAP_CSS_CDN), ('bootstrap_js', BOOTSTRAP_JS_CDN)]:
+        contenido = copia_vendor(url)
+        if contenido is None:
+            externos[clave] = url
+        else:
+            archivos[clave] = (url.rsplit('/', 1)[-1], sin_mapa.sub(b'', contenido))
+    recursos = {clave: publicar_estatico(nombre, contenido) for clave, (nombre, contenido) in archivos.items()}
+
+    # Versiones anteriores (otro hash) ya no se referencian
+    vigentes = {os.path.basename(path) for path in recursos.values()}
+    for nombre in os.listdir(CARPETA_ESTATICOS):
+        if re.sub(r'\.(gz|br)$', '', nombre) not in vigentes:
+            os.remove(os.path.join(CARPETA_ESTATICOS, nombre))
+
+    estaticos = '/' + url_relativa(CARPETA_ESTATICOS) + '/*'
+    with open(FILE_CABECERAS, 'w', encoding='utf-8') as f:
+        f.write(f"{estaticos}\n  Cache-Control: {CACHE_ESTATICOS}\n")
+        # La página y sus datos cambian en cada ejecución: siempre se revalidan
+        for ruta in ['/', '/' + os.path.basename(OUTPUT_FILE), '/' + url_relativa(ASSETS_DIR) + '/*.json']:
+            f.write(f"{ruta}\n  Cache-Control: no-cache\n")
+    recursos = {clave: url_relativa(path) for clave, path in recursos.items()}
+    recursos.update(externos)
+    recursos['runtime_inline'] = None
+    return recursos
+
+
+def especificacion(fig):
+    # Layout y estilo de las trazas (sin x/y) para Plotly.newPlot
+    spec = fig.to_plotly_json()
+    spec['config'] = {'responsive': True}
+    return spec
+
+
+def json_en_html(datos):
+    # JSON dentro de <script type="application/json">: '</' no puede cerrar la etiqueta
+    texto = json.dumps(datos, cls=plotly.utils.PlotlyJSONEncoder, separators=(',', ':'))
+    return texto.replace('</', '<\\/')
+
+
+# ---------------------------------------------------------
+# PESTAÑA 2: MERCADO Y ADOPCIÓN (4 Variables)
+# ---------------------------------------------------------
+def figura_mercado(df, parametros):
     fig_market = make_subplots(
         rows=2, cols=2,
         shared_xaxes=True, vertical_spacing=0.1, horizontal_spacing=0.08,
@@ -39,20 +449,20 @@ def main():
     )
     # 1. Precio
     fig_market.add_trace(
-        go.Scatter(x=df.index, y=df['precio_btc'], name="Precio de mercado (USD)", line=dict(color='#F7931A')),
+        serie(df, 'precio_btc', name="Precio de mercado (USD)", line=dict(color='#F7931A')),
         row=1, col=1)
     # 2. Volumen
     fig_market.add_trace(
-        go.Scatter(x=df.index, y=df['trade_volume_exchange'], name="Volumen de exchange (USD)",
+        serie(df, 'trade_volume_exchange', name="Volumen de exchange (USD)",
                    line=dict(color='#6c757d')), row=1, col=2)
     # 3. Direcciones
     fig_market.add_trace(
-        go.Scatter(x=df.index, y=df['n_unique_addresses'], name="Direcciones usadas diarias",
+        serie(df, 'n_unique_addresses', name="Direcciones usadas diarias",
                    line=dict(color='#007bff')), row=2,
         col=1)
     # 4. Transacciones
     fig_market.add_trace(
-        go.Scatter(x=df.index, y=df['transacciones_dia'], name="Transacciones diarias", line=dict(color='#28a745'),
+        serie(df, 'transacciones_dia', name="Transacciones diarias", line=dict(color='#28a745'),
                    opacity=0.5), row=2, col=2)
 
     # Ejes Y (Verticales): Personalizados según la métrica
@@ -67,31 +477,34 @@ def main():
 
     # Height: 600px | Margin top (t): 30px
     fig_market.update_layout(height=600, template="plotly_white", margin=dict(l=20, r=20, t=30, b=20), showlegend=False)
+    return fig_market
+
 
-    # ---------------------------------------------------------
-    # PESTAÑA 3: INFRAESTRUCTURA (4 Variables)
-    # ---------------------------------------------------------
+# ---------------------------------------------------------
+# PESTAÑA 3: INFRAESTRUCTURA (4 Variables)
+# ---------------------------------------------------------
+def figura_infraestructura(df, parametros):
     fig_infra = make_subplots(
         rows=2, cols=2,
         shared_xaxes=True, vertical_spacing=0.1, horizontal_spacing=0.08,
         subplot_titles=("Hashrate", "Dificultad de bloque", "Tamaño de la mempool", "Tamaño promedio de bloque")
     )
     # 1. Hashrate
-    fig_infra.add_trace(go.Scatter(x=df.index, y=df['hashrate'], name="Hashrate", line=dict(color='#4D4D4D')), row=1,
+    fig_infra.add_trace(serie(df, 'hashrate', name="Hashrate", line=dict(color='#4D4D4D')), row=1,
                         col=1)
     fig_infra.update_yaxes(type="log", row=1, col=1)
     # 2. Dificultad
     fig_infra.add_trace(
-        go.Scatter(x=df.index, y=df['dificultad'], name="Dificultad de bloque", line=dict(color='#dc3545', dash='dot')),
+        serie(df, 'dificultad', name="Dificultad de bloque", line=dict(color='#dc3545', dash='dot')),
         row=1,
         col=2)
     # 3. Mempool
     fig_infra.add_trace(
-        go.Scatter(x=df.index, y=df['mempool_size'], name="Tamaño de la mempool", line=dict(color='#6f42c1')), row=2,
+        serie(df, 'mempool_size', name="Tamaño de la mempool", line=dict(color='#6f42c1')), row=2,
         col=1)
     # 4. Tamaño Bloque
     fig_infra.add_trace(
-        go.Scatter(x=df.index, y=df['avg_block_size'], name="Tamaño promedio de bloque", line=dict(color='#17a2b8')),
+        serie(df, 'avg_block_size', name="Tamaño promedio de bloque", line=dict(color='#17a2b8')),
         row=2, col=2)
 
     # Ejes Y (Verticales): Personalizados según la métrica
@@ -106,10 +519,13 @@ def main():
 
     fig_infra.update_layout(height=600, template="plotly_white", margin=dict(l=20, r=20, t=30, b=20), showlegend=False,
                             autosize=True, width=None)
+    return fig_infra
+
 
-    # ---------------------------------------------------------
-    # PESTAÑA 4: ECONOMÍA DE LA SEGURIDAD (4 Variables)
-    # ---------------------------------------------------------
+# ---------------------------------------------------------
+# PESTAÑA 4: ECONOMÍA DE LA SEGURIDAD (4 Variables)
+# ---------------------------------------------------------
+def figura_seguridad(df, parametros):
     fig_security = make_subplots(
         rows=2, cols=2, shared_xaxes=True, vertical_spacing=0.1, horizontal_spacing=0.08,
         subplot_titles=("Coste de un ataque del 51%", "Ingresos de los mineros", "Total fees recaudados",
@@ -117,23 +533,23 @@ def main():
     )
     # 1. Coste Ataque
     fig_security.add_trace(
-        go.Scatter(x=df.index, y=df['attack_hourly_cost_usd'], name="Coste de un ataque del 51%",
+        serie(df, 'attack_hourly_cost_usd', name="Coste de un ataque del 51%",
                    line=dict(color='red')), row=1,
         col=1)
     fig_security.update_yaxes(type="log", row=1, col=1)
     # 2. Ingresos Mineros
     fig_security.add_trace(
-        go.Scatter(x=df.index, y=df['miners_revenue_usd'], name="Ingresos de los mineros", fill='tozeroy',
+        serie(df, 'miners_revenue_usd', name="Ingresos de los mineros", fill='tozeroy',
                    line=dict(color='#28a745')),
         row=1, col=2)
     # 3. Fees Totales
     fig_security.add_trace(
-        go.Scatter(x=df.index, y=df['fees_total_btc'], name="Total fees recaudados",
+        serie(df, 'fees_total_btc', name="Total fees recaudados",
                    line=dict(color='orange', dash='dash')),
         row=2, col=1)
     # 4. Coste por Tx
     fig_security.add_trace(
-        go.Scatter(x=df.index, y=df['cost_per_tx'], name="Coste por transacción", line=dict(color='#20c997')),
+        serie(df, 'cost_per_tx', name="Coste por transacción", line=dict(color='#20c997')),
         row=2, col=2)
 
     # Ejes Y (Verticales): Personalizados según la métrica
@@ -149,14 +565,226 @@ def main():
     # Height: 600px | Margin top (t): 30px
     fig_security.update_layout(height=600, template="plotly_white", margin=dict(l=20, r=20, t=30, b=20),
                                showlegend=False)
+    return fig_security
+
+# Bandas del barrido de escenarios (escenarios.py), debajo de la figura de seguridad
+def figura_escenarios(df, parametros):
+    fig_escenarios = go.Figure()
+    percentiles = parametros['percentiles']
+    # Bandas de fuera a dentro: borde superior sin relleno y borde inferior
+    # rellenando hasta él; la banda central es la más opaca. Las dos trazas de
+    # una banda llevan 'fill' (None en la superior) para ir las dos en SVG.
+    for i in range(len(percentiles) // 2):
+        opacidad = 0.12 * (i + 1)
+        for percentil, relleno in [(percentiles[-1 - i], None), (percentiles[i], 'tonexty')]:
+            fig_escenarios.add_trace(serie(df, parametros['columnas'][str(percentil)], name=f"Percentil {percentil}",
+                                           fill=relleno, fillcolor=f'rgba(220,53,69,{opacidad:.2f})',
+                                           line=dict(color='rgba(220,53,69,0.4)', width=0.5)))
+    if len(percentiles) % 2:
+        fig_escenarios.add_trace(serie(df, parametros['columnas'][str(percentiles[len(percentiles) // 2])],
+                                       name=f"Percentil {percentiles[len(percentiles) // 2]}",
+                                       line=dict(color='#dc3545')))
+
+    fig_escenarios.update_yaxes(type="log", title_text="USD por ataque")
+    fig_escenarios.update_xaxes(title_text="Fecha")
+    fig_escenarios.update_layout(height=400, template="plotly_white", margin=dict(l=20, r=20, t=40, b=20),
+                                 showlegend=False, title=dict(text="Coste de un ataque: bandas de escenarios",
+                                                              font=dict(size=14)))
+    return fig_escenarios
+
+
+# ---------------------------------------------------------
+# PESTAÑA 5: RELACIONES ENTRE MÉTRICAS (estadísticas móviles)
+# ---------------------------------------------------------
+def columnas_estadisticas_web():
+    # Columnas de las tablas de estadísticas que pinta la pestaña:
+    # (columnas de estadisticas_moviles, columnas de correlaciones_moviles)
+    por_serie = [estadisticas.nombre_estadistico(SERIE_MEDIAS, 'media', dias) for dias in estadisticas.VENTANAS_DIAS]
+    por_serie += [estadisticas.nombre_estadistico(col, 'vol', VENTANA_VOLATILIDAD) for col in SERIES_VOLATILIDAD]
+    por_serie += [estadisticas.nombre_estadistico(col, 'z', VENTANA_ZSCORE) for col in SERIES_VOLATILIDAD]
+    disponibles = almacen.leer_esquema(INPUT_CORRELACIONES)['columnas']
+    pares = [estadisticas.buscar_correlacion(disponibles, a, b, dias)
+             for a, b in PARES_CORRELACION for dias in estadisticas.VENTANAS_DIAS]
+    disponibles_serie = almacen.leer_esquema(INPUT_ESTADISTICAS)['columnas']
+    return [c for c in por_serie if c in disponibles_serie], [c for c in pares if c]
+
+
+def figura_correlaciones(df, parametros):
+    etiquetas = parametros['etiquetas']
+    fig_corr = make_subplots(
+        rows=2, cols=2, shared_xaxes=True, vertical_spacing=0.1, horizontal_spacing=0.08,
+        subplot_titles=[f"{etiquetas.get(a, a)} / {etiquetas.get(b, b)}" for a, b in parametros['pares']]
+    )
+    for n, (a, b) in enumerate(parametros['pares']):
+        fila, columna = n // 2 + 1, n % 2 + 1
+        for dias, color in zip(parametros['ventanas'], parametros['colores']):
+            nombre = estadisticas.buscar_correlacion(df.columns, a, b, dias)
+            if nombre is None:
+                continue
+            fig_corr.add_trace(serie(df, nombre, name=f"{dias} días", legendgroup=str(dias), showlegend=n == 0,
+                                     line=dict(color=color, width=1)), row=fila, col=columna)
+        fig_corr.update_yaxes(range=[-1, 1], title_text="Correlación" if columna == 1 else None, row=fila, col=columna)
+
+    fig_corr.update_xaxes(title_text="Fecha", row=2, col=1)
+    fig_corr.update_xaxes(title_text="Fecha", row=2, col=2)
+    fig_corr.update_layout(height=600, template="plotly_white", margin=dict(l=20, r=20, t=30, b=20),
+                           legend=dict(orientation='h', y=1.08, x=1, xanchor='right'))
+    return fig_corr
+
+
+def figura_estadisticas(df, parametros):
+    etiquetas = parametros['etiquetas']
+    medias = parametros['serie_medias']
+    fig_estad = make_subplots(
+        rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+        subplot_titles=(f"{etiquetas.get(medias, medias)} y medias móviles",
+                        f"Volatilidad anualizada ({parametros['ventana_volatilidad']} días)",
+                        f"Z-score ({parametros['ventana_zscore']} días)")
+    )
+    # 1. Nivel y medias móviles
+    fig_estad.add_trace(serie(df, medias, name=etiquetas.get(medias, medias),
+                              line=dict(color='#F7931A', width=1)), row=1, col=1)
+    for dias, color in zip(parametros['ventanas'], parametros['colores_ventanas']):
+        nombre = estadisticas.nombre_estadistico(medias, 'media', dias)
+        if nombre in df.columns:
+            fig_estad.add_trace(serie(df, nombre, name=f"Media {dias} días", line=dict(color=color, width=1)),
+                                row=1, col=1)
+    fig_estad.update_yaxes(type="log", title_text="USD", row=1, col=1)
+    # 2. Volatilidad y 3. z-score de cada serie
+    for fila, estadistico, ventana in [(2, 'vol', parametros['ventana_volatilidad']),
+                                       (3, 'z', parametros['ventana_zscore'])]:
+        for col, color in zip(parametros['series'], parametros['colores_series']):
+            nombre = estadisticas.nombre_estadistico(col, estadistico, ventana)
+            if nombre in df.columns:
+                fig_estad.add_trace(serie(df, nombre, name=etiquetas.get(col, col), legendgroup=col,
+                                          showlegend=False, line=dict(color=color, width=1)), row=fila, col=1)
+    fig_estad.update_yaxes(title_text="Volatilidad", tickformat='.0%', row=2, col=1)
+    fig_estad.update_yaxes(title_text="Desviaciones", row=3, col=1)
+
+    fig_estad.update_xaxes(title_text="Fecha", row=3, col=1)
+    fig_estad.update_layout(height=800, template="plotly_white", margin=dict(l=20, r=20, t=30, b=20),
+                            legend=dict(orientation='h', y=1.05, x=1, xanchor='right'))
+    return fig_estad
+
+
+def parametros_figuras():
+    # Configuración que recibe cada constructor (id del div -> dict), leída al
+    # generar (no al importar). Forma parte de la clave de la caché de
+    # fragmentos: un constructor no debe leer nada de fuera que no esté aquí.
+    # Las figuras con todo escrito en su código no tienen parámetros.
+    percentiles = sorted(escenarios.PERCENTILES)
+    return {
+        'fig-market': {},
+        'fig-infra': {},
+        'fig-security': {},
+        'fig-attack-scenarios': {'percentiles': percentiles,
+                                 'columnas': {str(p): escenarios.columna(p) for p in percentiles}},
+        'fig-correlations': {'pares': PARES_CORRELACION[:4], 'ventanas': list(estadisticas.VENTANAS_DIAS),
+                             'etiquetas': ETIQUETAS, 'colores': COLORES_VENTANAS},
+        'fig-rolling-stats': {'serie_medias': SERIE_MEDIAS, 'series': SERIES_VOLATILIDAD,
+                              'ventanas': list(estadisticas.VENTANAS_DIAS),
+                              'ventana_volatilidad': VENTANA_VOLATILIDAD, 'ventana_zscore': VENTANA_ZSCORE,
+                              'etiquetas': ETIQUETAS, 'colores_ventanas': COLORES_VENTANAS,
+                              'colores_series': COLORES_SERIES},
+    }
+
+
+def main(maestro=None):
+    # 'maestro' = el dataset ya en memoria (demonio); si no, se lee del almacén
+    print("Generando dashboard...")
+
+    if maestro is None and not almacen.existe_tabla(INPUT_TABLE):
+        print(f"Error: No se encuentra '{INPUT_TABLE}'.")
+        return
+
+    # 1. CARGA DE DATOS (columnas tipadas; solo las necesarias)
+    columnas = COLUMNAS + [c for c in metricas.columnas_necesarias(METRICAS) if c not in COLUMNAS]
+    if maestro is None:
+        df = almacen.cargar_tabla(INPUT_TABLE, columnas=columnas)
+    else:
+        df = maestro[columnas].copy()
+    df.sort_index(inplace=True)
+
+    # 2. CÁLCULOS DERIVADOS (motor de métricas con caché)
+    df = df.join(metricas.calcular(df, METRICAS))
+    # Bandas de escenarios de ataque, si se han calculado (etapa 'scenarios')
+    hay_escenarios = almacen.existe_tabla(INPUT_ESCENARIOS)
+    if hay_escenarios:
+        df = df.join(almacen.cargar_tabla(INPUT_ESCENARIOS), how='left')
+    else:
+        print(f"  -> No se encuentra '{INPUT_ESCENARIOS}': la pestaña de seguridad se genera sin bandas.")
+    # Estadísticas móviles (se calculan en la fusión): solo las columnas que se pintan
+    hay_estadisticas = almacen.existe_tabla(INPUT_ESTADISTICAS) and almacen.existe_tabla(INPUT_CORRELACIONES)
+    if hay_estadisticas:
+        por_serie, pares = columnas_estadisticas_web()
+        df = df.join(almacen.cargar_tabla(INPUT_ESTADISTICAS, columnas=por_serie), how='left')
+        df = df.join(almacen.cargar_tabla(INPUT_CORRELACIONES, columnas=pares), how='left')
+    else:
+        print("  -> No hay estadísticas móviles (ejecuta 'process'): la pestaña de relaciones queda vacía.")
 
     # --- HTML STRING GENERATION ---
-    plot_market_html = fig_market.to_html(full_html=False, include_plotlyjs='cdn', default_width='100%',
-                                          config={'responsive': True})
-    plot_infra_html = fig_infra.to_html(full_html=False, include_plotlyjs='cdn', default_width='100%',
-                                        config={'responsive': True})
-    plot_security_html = fig_security.to_html(full_html=False, include_plotlyjs='cdn', default_width='100%',
-                                              config={'responsive': True})
+    # Figuras de cada pestaña (selector de la pestaña -> id del div -> constructor)
+    pestanas = {
+        '#tab2': {'fig-market': figura_mercado},
+        '#tab3': {'fig-infra': figura_infraestructura},
+        '#tab4': {'fig-security': figura_seguridad},
+    }
+    if hay_escenarios:
+        pestanas['#tab4']['fig-attack-scenarios'] = figura_escenarios
+    if hay_estadisticas:
+        pestanas['#tab5'] = {'fig-correlations': figura_correlaciones, 'fig-rolling-stats': figura_estadisticas}
+    parametros = parametros_figuras()
+    indice = cargar_indice_cache()
+    version = version_codificacion()
+    eje = codificar_eje(df.index)
+    claves_usadas = set()
+    columnas_pagina = set()
+    pagina = {
+        'pestanas': {},
+        'opciones': {'urlCompletos': url_relativa(FILE_DATOS_COMPLETOS), 'zoomMaxPuntos': ZOOM_MAX_PUNTOS,
+                     'urlApi': URL_API},
+    }
+    for selector, figuras in pestanas.items():
+        contenido = {'datos': {'t': eje, 'series': {}}, 'figuras': {}}
+        for id_div, constructor in figuras.items():
+            clave, fragmento, reutilizado = fragmento_figura(df, id_div, constructor, parametros[id_div],
+                                                             indice, version)
+            print(f"  -> {id_div}: {'reutilizada de la caché' if reutilizado else 'generada'}")
+            claves_usadas.add(clave)
+            contenido['datos']['series'].update(fragmento['series'])
+            contenido['figuras'][id_div] = fragmento['figura']
+        columnas_pagina.update(contenido['datos']['series'])
+        if MODO_SALIDA == 'fragmentos':
+            path = os.path.join(CARPETA_FRAGMENTOS, selector.lstrip('#') + '.json')
+            n_bytes = escribir_json(path, contenido)
+            print(f"  -> Fragmento {selector}: {url_relativa(path)} ({n_bytes / 1024:.0f} KB con gzip)")
+            pagina['pestanas'][selector] = {'fragmento': url_relativa(path)}
+        else:
+            pagina['pestanas'][selector] = contenido
+
+    # Datos completos para el zoom: solo se reescriben si cambian sus columnas
+    clave_completos = huella(version, 'completos', huella_columnas(df, sorted(columnas_pagina)))
+    completos = None
+    if indice.get('datos_completos') != clave_completos or not os.path.exists(FILE_DATOS_COMPLETOS):
+        completos = datos_completos(df, columnas_pagina)
+        escribir_json(FILE_DATOS_COMPLETOS, completos)
+        indice['datos_completos'] = clave_completos
+    guardar_indice_cache(indice, claves_usadas)
+
+    completos_json = ''
+    if MODO_SALIDA == 'inline' and os.path.getsize(FILE_DATOS_COMPLETOS) <= MAX_MB_COMPLETOS_EN_PAGINA * 1024 * 1024:
+        completos_json = json_en_html(completos or datos_completos(df, columnas_pagina))
+        pagina['opciones']['idCompletos'] = 'datos-completos'
+    elif MODO_SALIDA == 'inline':
+        print(f"  -> Datos completos > {MAX_MB_COMPLETOS_EN_PAGINA} MB: el zoom a resolución completa "
+              f"necesita servir la página por HTTP.")
+
+    datos_pagina_json = json_en_html(pagina)
+    recursos = preparar_recursos()
+    if recursos['runtime_js']:
+        script_runtime = f'<script src="{recursos["runtime_js"]}"></script>'
+    else:
+        script_runtime = f"<script>\n{recursos['runtime_inline']}</script>"
 
     # --- TEMPLATE HTML COMPLETO ---
     html_template = f"""
@@ -165,7 +793,7 @@ def main():
     <head>
         <meta charset="UTF-8">
         <title>Bitcoin Security Analysis</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
+        <link href="{recursos['bootstrap_css']}" rel="stylesheet">
         <style>
             body {{ background-color: #f4f7f6; font-family: 'Segoe UI', sans-serif; }}
             .nav-pills .nav-link.active {{ background-color: #F7931A; }}
@@ -212,6 +840,7 @@ def main():
                 <li class="nav-item"><button class="nav-link" data-bs-toggle="tab" data-bs-target="#tab2" type="button">Precio y uso de la red</button></li>
                 <li class="nav-item"><button class="nav-link" data-bs-toggle="tab" data-bs-target="#tab3" type="button">Infraestructura de Bitcoin</button></li>
                 <li class="nav-item"><button class="nav-link" data-bs-toggle="tab" data-bs-target="#tab4" type="button">Seguridad y coste de un ataque</button></li>
+                <li class="nav-item"><button class="nav-link" data-bs-toggle="tab" data-bs-target="#tab5" type="button">Relaciones entre métricas</button></li>
             </ul>
 
             <div class="tab-content">
@@ -313,7 +942,7 @@ def main():
                 <div class="tab-pane fade" id="tab2">
                     <div class="row">
                         <div class="col-lg-9">
-                            <div class="card p-1">{plot_market_html}</div>
+                            <div class="card p-1"><div id="fig-market"></div></div>
                         </div>
                         <div class="col-lg-3">
                             <div class="card p-3 h-100 info-text" style="background-color: #ffffff;">
@@ -334,7 +963,7 @@ def main():
                 <div class="tab-pane fade" id="tab3">
                     <div class="row">
                         <div class="col-lg-9">
-                            <div class="card p-1">{plot_infra_html}</div>
+                            <div class="card p-1"><div id="fig-infra"></div></div>
                         </div>
                         <div class="col-lg-3">
                             <div class="card p-3 h-100 info-text" style="background-color: #ffffff;">
@@ -355,19 +984,44 @@ def main():
                 <div class="tab-pane fade" id="tab4">
                     <div class="row">
                         <div class="col-lg-9">
-                            <div class="card p-1">{plot_security_html}</div>
+                            <div class="card p-1"><div id="fig-security"></div></div>
+                            <div class="card p-1"><div id="fig-attack-scenarios"></div></div>
                         </div>
                         <div class="col-lg-3">
                             <div class="card p-3 h-100 info-text" style="background-color: #ffffff;">
                                 <h3 class="mb-4 border-bottom pb-2">Seguridad y coste de un ataque</h3>
                                 <h5>1. Coste de un ataque de 51%</h5>
-                                <p>Cuánto costaría en electricidad atacar la red por 1 hora, suponiendo la maxima eficiencia de los mineros y no incluyendo los costes de obtencion de los mineros, unicamente el coste energetico. Si esto sube, BTC es más seguro.</p>
+                                <p>Cuánto costaría en electricidad atacar la red por 1 hora, con la eficiencia media del parque de mineros (cohortes de hardware en servicio) y no incluyendo los costes de obtencion de los mineros, unicamente el coste energetico. Si esto sube, BTC es más seguro.</p>
                                 <h5>2. Ingresos de los mineros</h5>
                                 <p>Dinero total que ganan los mineros en un día. Es la suma del subsidio de bloque + comisiones. Es el presupuesto de seguridad de la red.</p>
                                 <h5>3. Total fees recaudados</h5>
                                 <p>Cantidad total de Bitcoin pagado en comisiones por los usuarios. Fundamental para la sostenibilidad a largo plazo.</p>
                                 <h5>4. Coste por transacción</h5>
                                 <p>Ingreso de los mineros entre numero de transacciones diarias. Promedio diario en dolares por transaccion. Tiene en cuenta tambien la creacion de nuevo Bitcoin, por lo que no es el precio promedio que paga el usuario por transaccion.</p>
+                                <h5>5. Escenarios de ataque</h5>
+                                <p>Coste total de un ataque evaluado en miles de escenarios: eficiencia del hardware del atacante, precio de la electricidad, porcentaje del hashrate, duración del ataque y compra del hardware. La banda clara va del percentil 5 al 95, la oscura del 25 al 75 y la línea es la mediana.</p>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+
+                <div class="tab-pane fade" id="tab5">
+                    <div class="row">
+                        <div class="col-lg-9">
+                            <div class="card p-1"><div id="fig-correlations"></div></div>
+                            <div class="card p-1"><div id="fig-rolling-stats"></div></div>
+                        </div>
+                        <div class="col-lg-3">
+                            <div class="card p-3 h-100 info-text" style="background-color: #ffffff;">
+                                <h3 class="mb-4 border-bottom pb-2">Relaciones entre métricas</h3>
+                                <h5>1. Correlaciones móviles</h5>
+                                <p>Correlación entre las variaciones diarias (rendimientos logarítmicos) de dos métricas, calculada sobre ventanas de 30, 90 y 365 días. Cerca de 1 se mueven juntas, cerca de -1 en sentido contrario y cerca de 0 no tienen relación en ese periodo.</p>
+                                <h5>2. Medias móviles</h5>
+                                <p>Precio de Bitcoin junto a sus medias de 30, 90 y 365 días. Cuando el precio cruza la media larga suele indicar un cambio de tendencia.</p>
+                                <h5>3. Volatilidad</h5>
+                                <p>Desviación típica anualizada de las variaciones diarias en los últimos {VENTANA_VOLATILIDAD} días. Mide cuánto se mueve cada métrica, independientemente de su escala.</p>
+                                <h5>4. Z-score</h5>
+                                <p>Distancia del valor actual a su media de {VENTANA_ZSCORE} días, en desviaciones típicas. Valores por encima de 2 o por debajo de -2 son niveles poco habituales respecto al último año.</p>
                             </div>
                         </div>
                     </div>
@@ -378,13 +1032,19 @@ def main():
             <footer class="text-center py-3 text-muted">UOC - Master en Visualización de Datos | 2025</footer>
         </div>
 
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
+        <script src="{recursos['bootstrap_js']}"></script>
+        <script src="{recursos['plotly_js']}" charset="utf-8"></script>
+        <script id="datos-dashboard" type="application/json">{datos_pagina_json}</script>
+        <script id="datos-completos" type="application/json">{completos_json}</script>
+        {script_runtime}
+        <script>Dashboard.iniciar(JSON.parse(document.getElementById('datos-dashboard').textContent));</script>
     </body>
     </html>
     """
 
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
         f.write(html_template)
+    instrumentacion.contar('bytes_emitidos', os.path.getsize(OUTPUT_FILE), archivo=OUTPUT_FILE)
 
     print(f"Dashboard generado exitosamente en: {OUTPUT_FILE}")
 
@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextvars
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+import config
+
+try:
+    import resource  # Solo Unix: pico de memoria y CPU de los procesos hijos
+except ImportError:
+    resource = None
+
+# Instrumentación del pipeline: tiempos, memoria y volumen de datos por etapa
+# y por archivo. La medición activa viaja en una ContextVar, así que los
+# módulos solo llaman a contar()/archivo() sin recibir nada; fuera del
+# pipeline (scripts sueltos) esas llamadas no hacen nada. Los hilos que lanza
+# una etapa deben ejecutarse con contextvars.copy_context() (ver en_contexto).
+
+# --- CONFIGURACIÓN ---
+CARPETA_INFORMES = config.ruta("informes")  # Un informe JSON por ejecución
+TRACEMALLOC = False  # Pico de memoria de Python (más preciso que el RSS, pero ralentiza)
+PERFILADOR = None  # None, 'cprofile' o 'pyinstrument' (opcional): un perfil por etapa
+MAX_ARCHIVOS_RESUMEN = 5  # Archivos más lentos que se muestran en la tabla resumen
+
+CONTADORES = ('filas_leidas', 'filas_escritas', 'bytes_descargados', 'bytes_emitidos')
+
+_informe = contextvars.ContextVar('informe', default=None)
+_medicion = contextvars.ContextVar('medicion', default=None)
+
+
+def en_contexto(funcion, nombre_archivo=None):
+    # Para pool.submit(en_contexto(f), ...): la tarea se ejecuta en una copia
+    # del contexto de quien la lanza y ve su medición (una copia por tarea:
+    # un mismo contexto no puede estar activo en dos hilos a la vez). Con
+    # nombre_archivo, además, se mide su tiempo como el de ese archivo.
+    contexto = contextvars.copy_context()
+
+    def tarea(*args, **kwargs):
+        if nombre_archivo is None:
+            return funcion(*args, **kwargs)
+        with archivo(nombre_archivo):
+            return funcion(*args, **kwargs)
+    return functools.partial(contexto.run, tarea)
+
+
+def pico_rss_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux da KB; macOS, bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def cpu_hijos():
+    if resource is None:
+        return 0.0
+    hijos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return hijos.ru_utime + hijos.ru_stime
+
+
+def _nuevo_registro():
+    registro = {'segundos': 0.0, 'cpu_segundos': 0.0}
+    registro.update(dict.fromkeys(CONTADORES, 0))
+    return registro
+
+
+def contar(contador, cantidad, archivo=None):
+    # Suma 'cantidad' al contador de la etapa activa (y del archivo, si se indica)
+    medicion = _medicion.get()
+    if medicion is None:
+        return
+    with medicion['_lock']:
+        medicion[contador] += int(cantidad)
+        if archivo is not None:
+            medicion['archivos'].setdefault(str(archivo), _nuevo_registro())[contador] += int(cantidad)
+
+
+@contextmanager
+def archivo(nombre):
+    # Tiempo real y de CPU dedicado a un archivo dentro de la etapa activa
+    medicion = _medicion.get()
+    if medicion is None:
+        yield
+        return
+    inicio, inicio_cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        segundos, cpu = time.perf_counter() - inicio, time.thread_time() - inicio_cpu
+        with medicion['_lock']:
+            registro = medicion['archivos'].setdefault(str(nombre), _nuevo_registro())
+            registro['segundos'] += segundos
+            registro['cpu_segundos'] += cpu
+            # La CPU de otros hilos no la ve thread_time() del hilo de la etapa
+            if threading.get_ident() != medicion['_hilo']:
+                medicion['_cpu_otros_hilos'] += cpu
+
+
+def _iniciar_perfil():
+    if PERFILADOR == 'cprofile':
+        import cProfile
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Python 3.12+: un solo perfilador activo a la vez (etapas en paralelo)
+            print("  -> Ya hay otro perfil activo; esta etapa se ejecuta sin perfil.")
+            return None
+        return perfil
+    if PERFILADOR == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("  -> pyinstrument no está instalado; se ejecuta sin perfil.")
+            return None
+        perfil = Profiler()
+        perfil.start()
+        return perfil
+    return None
+
+
+def _guardar_perfil(perfil, informe, nombre):
+    if perfil is None:
+        return None
+    carpeta = os.path.join(CARPETA_INFORMES, f"perfiles_{informe['id']}")
+    os.makedirs(carpeta, exist_ok=True)
+    if PERFILADOR == 'cprofile':
+        perfil.disable()
+        path = os.path.join(carpeta, f"{nombre}.prof")
+        perfil.dump_stats(path)
+    else:
+        perfil.stop()
+        path = os.path.join(carpeta, f"{nombre}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(perfil.output_html())
+    return path
+
+
+@contextmanager
+def etapa(nombre):
+    # Mide una etapa y la añade al informe activo. ru_maxrss es el pico de todo
+    # el proceso desde que arrancó: lo que se guarda al cerrar la etapa es el
+    # pico acumulado hasta ese momento, no la memoria propia de la etapa (y con
+    # etapas en paralelo, tampoco exclusivo). tracemalloc sí se reinicia.
+    informe = _informe.get()
+    medicion = _nuevo_registro()
+    medicion.update({'nombre': nombre, 'estado': None, 'archivos': {},
+                     '_lock': threading.Lock(), '_hilo': threading.get_ident(), '_cpu_otros_hilos': 0.0})
+    token = _medicion.set(medicion)
+    perfil = _iniciar_perfil() if informe is not None else None
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    inicio, inicio_cpu, inicio_hijos = time.perf_counter(), time.thread_time(), cpu_hijos()
+    try:
+        yield medicion
+        if medicion['estado'] is None:
+            medicion['estado'] = 'ejecutada'
+    except BaseException:
+        medicion['estado'] = 'error'
+        raise
+    finally:
+        medicion['segundos'] = time.perf_counter() - inicio
+        medicion['cpu_segundos'] = (time.thread_time() - inicio_cpu + medicion['_cpu_otros_hilos']
+                                    + cpu_hijos() - inicio_hijos)
+        medicion['pico_rss_proceso_mb'] = pico_rss_mb()
+        medicion['pico_tracemalloc_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20 \
+            if tracemalloc.is_tracing() else None
+        _medicion.reset(token)
+        if informe is not None:
+            medicion['perfil'] = _guardar_perfil(perfil, informe, nombre)
+            with informe['_lock']:
+                informe['etapas'].append(medicion)
+
+
+def iniciar_informe():
+    # Abre el informe de una ejecución; las etapas que se midan después (en
+    # este contexto o en copias suyas) se añaden a él
+    ahora = datetime.now()
+    informe = {
+        # Microsegundos y pid: dos ejecuciones en el mismo segundo no se pisan
+        'id': f"{ahora.strftime('%Y%m%d_%H%M%S_%f')}_{os.getpid()}",
+        'inicio': ahora.isoformat(timespec='seconds'),
+        'etapas': [],
+        '_lock': threading.Lock(),
+        '_t0': time.perf_counter(),
+    }
+    if TRACEMALLOC and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _informe.set(informe)
+    return informe
+
+
+def _sin_privados(valor):
+    if isinstance(valor, dict):
+        return {k: _sin_privados(v) for k, v in valor.items() if not k.startswith('_')}
+    if isinstance(valor, list):
+        return [_sin_privados(v) for v in valor]
+    return valor
+
+
+def _mb(n_bytes):
+    return f"{n_bytes / 2 ** 20:.2f}"
+
+
+def imprimir_resumen(informe):
+    columnas = [('ETAPA', 22), ('ESTADO', 10), ('REAL s', 8), ('CPU s', 8), ('PICO PROC. MB', 13),
+                ('FILAS LEÍDAS', 13), ('FILAS ESCR.', 12), ('DESC. MB', 9), ('EMIT. MB', 9)]
+    print("\n" + " ".join(titulo.rjust(ancho) if i > 1 else titulo.ljust(ancho)
+                          for i, (titulo, ancho) in enumerate(columnas)))
+    for m in informe['etapas']:
+        # Pico acumulado del proceso al terminar la etapa (ver etapa())
+        pico = f"{m['pico_rss_proceso_mb']:.0f}" if m.get('pico_rss_proceso_mb') is not None else "n/d"
+        valores = [m['nombre'], m['estado'], f"{m['segundos']:.2f}", f"{m['cpu_segundos']:.2f}", pico,
+                   f"{m['filas_leidas']:,}", f"{m['filas_escritas']:,}", _mb(m['bytes_descargados']),
+                   _mb(m['bytes_emitidos'])]
+        print(" ".join(v.rjust(ancho) if i > 1 else v.ljust(ancho)
+                       for i, (v, (_, ancho)) in enumerate(zip(valores, columnas))))
+
+    archivos = [(m['nombre'], nombre, r) for m in informe['etapas'] for nombre, r in m['archivos'].items()
+                if r['segundos'] > 0]
+    if archivos:
+        print("\nArchivos más lentos:")
+        for etapa_, nombre, r in sorted(archivos, key=lambda a: -a[2]['segundos'])[:MAX_ARCHIVOS_RESUMEN]:
+            print(f"  {etapa_} / {nombre}: {r['segundos']:.2f}s (cpu {r['cpu_segundos']:.2f}s)")
+    total = f"\nTotal: {informe['segundos']:.2f}s"
+    if informe.get('pico_rss_mb') is not None:
+        total += f", pico de memoria {informe['pico_rss_mb']:.0f} MB"
+    print(total)
+
+
+def terminar_informe(informe, correcto=True):
+    # Cierra el informe, lo guarda en CARPETA_INFORMES y muestra el resumen
+    informe['segundos'] = time.perf_counter() - informe['_t0']
+    informe['correcto'] = correcto
+    informe['pico_rss_mb'] = pico_rss_mb()
+    if tracemalloc.is_tracing():
+        informe['pico_tracemalloc_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    for contador in CONTADORES:
+        informe[contador] = sum(m[contador] for m in informe['etapas'])
+
+    os.makedirs(CARPETA_INFORMES, exist_ok=True)
+    path = os.path.join(CARPETA_INFORMES, f"informe_{informe['id']}.json")
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(_sin_privados(informe), f, indent=2)
+    os.replace(path + '.tmp', path)
+
+    imprimir_resumen(informe)
+    print(f"Informe de la ejecución: {path}")
+    return path
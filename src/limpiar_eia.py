@@ -1,9 +1,189 @@
 import pandas as pd
 import os
+import config
+import almacen
+import instrumentacion
 
 # CONFIGURACIÓN
-INPUT_FILE = "datos/raw_manual/Average_retail_price_of_electricity_monthly.csv"
-OUTPUT_FILE = "datos/processed/eia_limpio.csv"
+INPUT_FILE = config.carpeta('raw_manual', "Average_retail_price_of_electricity_monthly.csv")
+OUTPUT_TABLE = config.carpeta('processed', "eia_limpio")  # Tabla del almacén (formato en almacen.py)
+EXPORTAR_CSV = False  # Copia adicional en eia_limpio.csv
+
+# Series a extraer: columna de salida -> nombre (o parte del nombre) de la serie
+# en la exportación de la EIA, o una tupla de nombres que se prueban en orden.
+# Con la exportación completa del navegador de precios se puede elegir
+# cualquier sector/estado, p.ej.
+#   'elec_cost_kwh_tx': 'texas : industrial'
+# Si un nombre coincide con varias series es un error (no se elige una al azar).
+# Por defecto: el agregado de EE. UU. en la exportación completa y, si no está,
+# la descarga de una sola serie de datos/raw_manual.
+SERIES_EIA = {
+    'elec_cost_kwh': ('united states : industrial', 'industrial cents per kilowatthour'),
+}
+
+# Lectura por trozos (memoria acotada con exportaciones de cualquier tamaño)
+CHUNK_FILAS = 50_000
+MAX_LINEAS_CABECERA = 50
+SEPARADORES = [';', ',', '\t']
+ETIQUETAS_MES = ('month', 'mes', 'date', 'fecha')
+ETIQUETAS_SERIE = ('description', 'units', 'source key', 'descripcion', 'descripción')
+
+# Formatos de la columna 'Month', en orden de prueba
+FORMATOS_FECHA = [
+    '%b-%y',  # Ej: jul-25
+    '%b %Y',  # Ej: Apr 2025
+    '%B %Y',  # Ej: April 2025
+    '%Y-%m',  # Ej: 2025-04
+]
+# Abreviaturas en castellano que no coinciden con las inglesas (Excel en español)
+MESES_ES = {'ene': 'jan', 'abr': 'apr', 'ago': 'aug', 'sept': 'sep', 'dic': 'dec'}
+
+
+def parsear_fechas(columna):
+    # Cada formato se aplica a toda la columna de una vez (sin excepciones por
+    # fila) y solo sobre lo que aún no se ha reconocido. Se trabaja sobre los
+    # valores únicos: en las descargas completas cada mes se repite miles de veces.
+    codigos, unicos = pd.factorize(columna)
+    texto = pd.Series(unicos).astype(str).str.strip().str.lower()
+    partes = texto.str.extract(r'^([a-z]+)\.?(.*)$')
+    con_mes = partes[0].notna()
+    texto[con_mes] = partes.loc[con_mes, 0].replace(MESES_ES) + partes.loc[con_mes, 1]
+
+    fechas = pd.Series(pd.NaT, index=texto.index, dtype='datetime64[ns]')
+    for formato in FORMATOS_FECHA:
+        pendientes = fechas.isna()
+        if not pendientes.any():
+            break
+        fechas[pendientes] = pd.to_datetime(texto[pendientes], format=formato, errors='coerce')
+
+    sin_formato = unicos[fechas.isna().to_numpy()]
+    if len(sin_formato):
+        n_filas = int(fechas.isna().to_numpy()[codigos[codigos >= 0]].sum())
+        print(f"  -> {n_filas} filas sin formato de fecha reconocido (ej: {list(sin_formato[:5])})")
+
+    resultado = fechas.to_numpy()[codigos]
+    resultado[codigos < 0] = None
+    return pd.Series(resultado, index=columna.index)
+
+
+def detectar_cabecera(path):
+    # Salta las líneas de título/metadatos: la cabecera es la primera línea cuyo
+    # primer campo es una etiqueta conocida. De paso detecta el separador y el
+    # formato de la exportación:
+    #   'columnas' -> Month;serie_1;serie_2...   (una fila por mes)
+    #   'filas'    -> description;units;source key;Jan 2001;...  (una fila por serie)
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for n_linea, linea in enumerate(f):
+            if n_linea >= MAX_LINEAS_CABECERA:
+                break
+            for sep in SEPARADORES:
+                campos = [c.strip().strip('"') for c in linea.rstrip('\r\n').split(sep)]
+                if len(campos) < 2:
+                    continue
+                primero = campos[0].lower()
+                if primero in ETIQUETAS_MES:
+                    return n_linea, sep, 'columnas', campos
+                if primero in ETIQUETAS_SERIE:
+                    return n_linea, sep, 'filas', campos
+    return None
+
+
+def buscar_serie(nombres, patron):
+    # Coincidencia por nombre sin distinguir mayúsculas; una coincidencia exacta
+    # gana a las parciales
+    patron = patron.lower()
+    exactas = [n for n in nombres if str(n).strip().lower() == patron]
+    if exactas:
+        return exactas
+    return [n for n in nombres if patron in str(n).lower()]
+
+
+class SerieAmbigua(ValueError):
+    pass
+
+
+def patrones(salida):
+    patron = SERIES_EIA[salida]
+    return (patron,) if isinstance(patron, str) else tuple(patron)
+
+
+def elegir_serie(nombres, salida):
+    # La serie de 'salida': el primer patrón que coincide con alguna. Varias
+    # coincidencias con el mismo patrón -> SerieAmbigua. None si no hay ninguna.
+    for patron in patrones(salida):
+        candidatas = buscar_serie(nombres, patron)
+        if len(candidatas) > 1:
+            raise SerieAmbigua(f"'{patron}' ({salida}) coincide con varias series {candidatas[:5]}; "
+                               f"usa un nombre más concreto en SERIES_EIA.")
+        if candidatas:
+            return candidatas[0]
+    print(f"  -> No hay ninguna serie que coincida con {patrones(salida)}.")
+    return None
+
+
+def a_numero(valores):
+    # Admite coma decimal (exportaciones de Excel en castellano)
+    if not pd.api.types.is_numeric_dtype(valores):
+        valores = valores.astype(str).str.replace(',', '.', regex=False)
+    return pd.to_numeric(valores, errors='coerce')
+
+
+def a_dolares(precios):
+    # Ajuste de unidades: La EIA suele dar datos en CENTAVOS.
+    # Si el precio es > 1 (ej. 8.21), asumimos centavos y convertimos a dólares.
+    return precios.where(~(precios > 1), precios / 100)
+
+
+def leer_por_columnas(path, n_cabecera, sep, cabecera):
+    # Una fila por mes: solo se leen la columna de fechas y las series elegidas
+    col_mes = cabecera[0]
+    seleccion = {}
+    for salida in SERIES_EIA:
+        columna = elegir_serie(cabecera[1:], salida)
+        if columna is not None:
+            seleccion[columna] = salida
+    if not seleccion:
+        return
+
+    lector = pd.read_csv(path, skiprows=n_cabecera, header=0, sep=sep, dtype=str,
+                         usecols=[col_mes] + list(seleccion), chunksize=CHUNK_FILAS,
+                         encoding='utf-8', encoding_errors='replace')
+    for chunk in lector:
+        instrumentacion.contar('filas_leidas', len(chunk), archivo=path)
+        trozo = pd.DataFrame({'date': parsear_fechas(chunk[col_mes])})
+        for columna, salida in seleccion.items():
+            trozo[salida] = a_dolares(a_numero(chunk[columna]))
+        yield trozo
+
+
+def leer_por_filas(path, n_cabecera, sep, cabecera):
+    # Una fila por serie: de cada trozo solo se guardan las filas cuyo nombre
+    # coincide con algún patrón; la elección final (exacta > parcial) se hace
+    # al terminar, cuando ya se han visto todos los nombres.
+    col_nombre = cabecera[0]
+    meses = [c for c in cabecera[1:] if c.lower() not in ETIQUETAS_SERIE]
+    fechas_meses = parsear_fechas(pd.Series(meses))
+    encontradas = {salida: {} for salida in SERIES_EIA}
+
+    lector = pd.read_csv(path, skiprows=n_cabecera, header=0, sep=sep, dtype=str,
+                         chunksize=CHUNK_FILAS, encoding='utf-8', encoding_errors='replace')
+    for chunk in lector:
+        instrumentacion.contar('filas_leidas', len(chunk), archivo=path)
+        chunk.columns = [str(c).strip().strip('"') for c in chunk.columns]
+        nombres = chunk[col_nombre].astype(str).str.strip()
+        for salida in SERIES_EIA:
+            for patron in patrones(salida):
+                for nombre in buscar_serie(nombres.unique(), patron):
+                    if nombre not in encontradas[salida]:
+                        fila = chunk.loc[(nombres == nombre).to_numpy(), meses].iloc[0]
+                        encontradas[salida][nombre] = a_dolares(a_numero(fila.reset_index(drop=True)))
+
+    for salida in SERIES_EIA:
+        nombre = elegir_serie(list(encontradas[salida]), salida)
+        if nombre is None:
+            continue
+        valores = encontradas[salida][nombre]
+        yield pd.DataFrame({'date': fechas_meses.to_numpy(), salida: valores.to_numpy()})
 
 
 def main():
@@ -13,56 +193,44 @@ def main():
         print(f"No encuentro el archivo: {INPUT_FILE}")
         return
 
-    # 1. Leer el archivo con la configuración EXACTA
-    try:
-        # skiprows=4: Salta las líneas de título/metadatos
-        # sep=';': El separador de columnas que me has confirmado
-        # decimal='.': El separador decimal que me has confirmado
-        df = pd.read_csv(INPUT_FILE, skiprows=4, header=0, names=['Month', 'Price'], sep=';', decimal='.')
-
-        print("  -> Archivo leído correctamente. Primeras filas:")
-        print(df.head(2))
+    # 1. Detectar cabecera, separador y formato de la exportación
+    deteccion = detectar_cabecera(INPUT_FILE)
+    if deteccion is None:
+        print(f"Error crítico: no se reconoce la cabecera de {INPUT_FILE}")
+        return
+    n_cabecera, sep, formato, cabecera = deteccion
+    print(f"  -> Cabecera en la línea {n_cabecera + 1}, separador {sep!r}, una fila por "
+          f"{'mes' if formato == 'columnas' else 'serie'}.")
 
+    # 2. Lectura por trozos: en memoria solo queda lo ya filtrado y convertido
+    # (meses x series elegidas), nunca el archivo completo
+    lector = leer_por_columnas if formato == 'columnas' else leer_por_filas
+    try:
+        trozos = []
+        for trozo in lector(INPUT_FILE, n_cabecera, sep, cabecera):
+            # Limpieza de filas vacías y fechas no reconocidas
+            trozo = trozo.dropna(subset=['date'])
+            trozo = trozo.dropna(how='all', subset=[c for c in trozo.columns if c != 'date'])
+            if not trozo.empty:
+                trozos.append(trozo)
+    except SerieAmbigua:
+        raise  # Error de configuración: detiene el pipeline
     except Exception as e:
         print(f"Error crítico leyendo CSV: {e}")
         return
 
-    # 2. Limpieza de filas vacías
-    df = df.dropna(how='all')
-    # Filtramos filas donde 'Month' sea demasiado corto (basura)
-    df = df[df['Month'].astype(str).str.len() > 3]
-
-    # 3. Normalización de Fechas (Manejo de formatos mixtos)
-    def parse_mixed_dates(date_str):
-        date_str = str(date_str).strip()
-        try:
-            return pd.to_datetime(date_str, format='%b-%y')  # Ej: jul-25
-        except:
-            pass
-        try:
-            return pd.to_datetime(date_str, format='%b %Y')  # Ej: Apr 2025
-        except:
-            return pd.NaT
-
-    df['date'] = df['Month'].apply(parse_mixed_dates)
-
-    # 4. Limpieza de Precio
-    # Aseguramos que sea numérico (aunque con decimal='.' ya debería serlo)
-    df['Price'] = pd.to_numeric(df['Price'], errors='coerce')
-
-    # Ajuste de unidades: La EIA suele dar datos en CENTAVOS.
-    # Si el precio es > 1 (ej. 8.21), asumimos centavos y convertimos a dólares.
-    mask_cents = df['Price'] > 1
-    df.loc[mask_cents, 'Price'] = df.loc[mask_cents, 'Price'] / 100
+    if not trozos:
+        print("No se ha encontrado ningún dato de las series pedidas.")
+        return
 
-    # 5. Guardar archivo limpio (formato estándar comas para el siguiente paso)
-    df_final = df[['date', 'Price']].dropna().sort_values('date')
-    df_final.columns = ['date', 'elec_cost_kwh']
+    # 3. Unir series (una columna por serie) y guardar en el almacén 'processed'
+    df_final = pd.concat(trozos).groupby('date', sort=True).first()
+    df_final = df_final[[c for c in SERIES_EIA if c in df_final.columns]]
 
-    df_final.to_csv(OUTPUT_FILE, index=False)
-    print(f"Archivo limpio generado: {OUTPUT_FILE}")
+    rutas = almacen.guardar_tabla(df_final, OUTPUT_TABLE, exportar_csv=EXPORTAR_CSV)
+    print(f"Archivo limpio generado: {', '.join(rutas)}")
     print(df_final.head())
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
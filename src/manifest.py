@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import glob
+import config
+
+# --- CONFIGURACIÓN ---
+# Registro de la última ejecución correcta de cada etapa del pipeline:
+# hash del contenido de sus entradas y salidas.
+MANIFEST_FILE = config.ruta(".manifest.json")
+CHUNK_BYTES = 1024 * 1024
+
+
+def expandir_rutas(rutas):
+    # Una ruta declarada puede ser un archivo, una carpeta (todos sus archivos)
+    # o un prefijo 'ruta.*' (p.ej. una tabla guardada con distintas extensiones).
+    # Se ignoran archivos ocultos (temporales, estado HTTP...).
+    archivos = set()
+    for ruta in rutas:
+        candidatos = [ruta] + glob.glob(glob.escape(ruta) + '.*')
+        for candidato in candidatos:
+            if os.path.isfile(candidato):
+                archivos.add(candidato)
+            elif os.path.isdir(candidato):
+                for raiz, carpetas, nombres in os.walk(candidato):
+                    carpetas[:] = [c for c in carpetas if not c.startswith('.')]
+                    archivos.update(os.path.join(raiz, n) for n in nombres if not n.startswith('.'))
+    return sorted(archivos)
+
+
+def hash_archivo(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_rutas(rutas):
+    # Claves relativas a la raíz del proyecto: el manifest no depende del
+    # directorio desde el que se ejecute main.py
+    return {os.path.relpath(path, config.RAIZ).replace(os.sep, '/'): hash_archivo(path)
+            for path in expandir_rutas(rutas)}
+
+
+def cargar():
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    try:
+        with open(MANIFEST_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"Manifest '{MANIFEST_FILE}' ilegible, se reconstruirá.")
+        return {}
+
+
+def guardar(manifest):
+    carpeta = os.path.dirname(MANIFEST_FILE)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    tmp_path = MANIFEST_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+
+def etapa_al_dia(manifest, nombre, entradas, salidas):
+    # La etapa se puede omitir si sus entradas no han cambiado desde la última
+    # ejecución correcta y sus salidas siguen intactas en disco.
+    registro = manifest.get(nombre)
+    if not registro:
+        return False
+    salidas_actuales = hash_rutas(salidas)
+    if not salidas_actuales or registro.get('salidas') != salidas_actuales:
+        return False
+    return registro.get('entradas') == hash_rutas(entradas)
+
+
+def registrar_etapa(manifest, nombre, entradas, salidas):
+    # Solo se registra si la etapa ha producido todas sus salidas
+    if any(not expandir_rutas([salida]) for salida in salidas):
+        print(f"  -> '{nombre}' no generó todas sus salidas; no se registra en el manifest.")
+        return False
+    manifest[nombre] = {'entradas': hash_rutas(entradas), 'salidas': hash_rutas(salidas)}
+    return True
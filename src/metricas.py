@@ -0,0 +1,220 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import config
+import almacen
+
+# --- CONFIGURACIÓN ---
+# Caché en disco compartida entre procesos (dashboard, análisis por lotes).
+# None = solo caché en memoria.
+CARPETA_CACHE = config.carpeta('processed', ".cache_metricas")
+MAX_CACHE_MEMORIA = 64  # Resultados guardados en memoria (LRU)
+# Tamaño máximo de la caché en disco: al superarlo se borran los resultados
+# usados hace más tiempo (LRU por fecha de modificación; leer uno lo renueva)
+MAX_CACHE_DISCO_MB = 512
+
+# --- REGISTRO DE MÉTRICAS DERIVADAS ---
+# nombre -> entradas (columnas del dataset u otras métricas) y fórmula vectorizada
+# que recibe esas entradas como arrays NumPy, en el mismo orden.
+METRICAS = {
+    # --- Energía ---
+    'network_power_gw': {
+        'descripcion': "Potencia eléctrica de la red",
+        'unidad': 'GW',
+        'entradas': ['hashrate', 'efficiency_j_th'],
+        'formula': lambda hashrate, eficiencia: hashrate * eficiencia / 1e9,  # TH/s * J/TH = W
+    },
+    'network_energy_kwh_dia': {
+        'descripcion': "Energía consumida por la red en un día",
+        'unidad': 'kWh/día',
+        'entradas': ['network_power_gw'],
+        'formula': lambda potencia_gw: potencia_gw * 1e6 * 24,
+    },
+    'energy_per_tx_kwh': {
+        'descripcion': "Energía por transacción",
+        'unidad': 'kWh/tx',
+        'entradas': ['network_energy_kwh_dia', 'transacciones_dia'],
+        'formula': lambda energia, txs: energia / np.where(txs > 0, txs, np.nan),
+    },
+
+    # --- Seguridad ---
+    'attack_hourly_cost_usd': {
+        'descripcion': "Coste eléctrico por hora de un ataque del 51%",
+        'unidad': 'USD/h',
+        'entradas': ['hashrate', 'efficiency_j_th', 'elec_cost_kwh'],
+        'formula': lambda hashrate, eficiencia, precio: (hashrate * eficiencia / 1000) * precio,
+    },
+    'security_budget_per_tx_usd': {
+        'descripcion': "Presupuesto de seguridad por transacción",
+        'unidad': 'USD/tx',
+        'entradas': ['miners_revenue_usd', 'transacciones_dia'],
+        'formula': lambda ingresos, txs: ingresos / np.where(txs > 0, txs, np.nan),
+    },
+
+    # --- Economía minera ---
+    'hashprice_usd_th_dia': {
+        'descripcion': "Hashprice: ingresos diarios por TH/s",
+        'unidad': 'USD/(TH/s)/día',
+        'entradas': ['miners_revenue_usd', 'hashrate'],
+        'formula': lambda ingresos, hashrate: ingresos / np.where(hashrate > 0, hashrate, np.nan),
+    },
+    'fees_share_revenue': {
+        'descripcion': "Peso de las comisiones en los ingresos mineros",
+        'unidad': '%',
+        'entradas': ['fees_total_btc', 'precio_btc', 'miners_revenue_usd'],
+        'formula': lambda fees, precio, ingresos: 100 * fees * precio / np.where(ingresos > 0, ingresos, np.nan),
+    },
+}
+
+_cache = OrderedDict()
+_lock_cache = threading.Lock()  # El servidor calcula métricas desde varios hilos
+
+
+def resolver(nombres):
+    # Orden de cálculo (dependencias primero) de las métricas pedidas y de las
+    # métricas intermedias que necesitan; nada más.
+    orden = []
+    visitando = set()
+
+    def visitar(nombre):
+        if nombre in orden:
+            return
+        if nombre in visitando:
+            raise ValueError(f"Dependencia circular en la métrica '{nombre}'.")
+        visitando.add(nombre)
+        for entrada in METRICAS[nombre]['entradas']:
+            if entrada in METRICAS:
+                visitar(entrada)
+        visitando.discard(nombre)
+        orden.append(nombre)
+
+    for nombre in nombres:
+        if nombre not in METRICAS:
+            raise KeyError(f"Métrica desconocida: '{nombre}'.")
+        visitar(nombre)
+    return orden
+
+
+def columnas_necesarias(nombres):
+    # Columnas del dataset que hay que cargar para calcular estas métricas
+    columnas = []
+    for nombre in resolver(nombres):
+        for entrada in METRICAS[nombre]['entradas']:
+            if entrada not in METRICAS and entrada not in columnas:
+                columnas.append(entrada)
+    return columnas
+
+
+def _hash_array(valores):
+    return hashlib.blake2b(np.ascontiguousarray(valores).view(np.uint8), digest_size=16).hexdigest()
+
+
+def _version_formula(formula):
+    # Cambiar la fórmula invalida la caché
+    codigo = formula.__code__
+    return hashlib.blake2b(codigo.co_code + repr(codigo.co_consts).encode(), digest_size=8).hexdigest()
+
+
+def _archivo_cache(nombre, clave):
+    return f"{nombre}.{clave}.npy"
+
+
+def _leer_cache(nombre, clave):
+    with _lock_cache:
+        if clave in _cache:
+            _cache.move_to_end(clave)
+            return _cache[clave]
+    if CARPETA_CACHE:
+        path = os.path.join(CARPETA_CACHE, _archivo_cache(nombre, clave))
+        if os.path.exists(path):
+            try:
+                valores = np.load(path)
+                os.utime(path)  # Usado ahora: el último en borrarse
+            except (OSError, ValueError):
+                return None
+            _guardar_cache(nombre, clave, valores, disco=False)
+            return valores
+    return None
+
+
+def _guardar_cache(nombre, clave, valores, disco=True):
+    with _lock_cache:
+        _cache[clave] = valores
+        _cache.move_to_end(clave)
+        while len(_cache) > MAX_CACHE_MEMORIA:
+            _cache.popitem(last=False)
+    if disco and CARPETA_CACHE:
+        os.makedirs(CARPETA_CACHE, exist_ok=True)
+        tmp_path = os.path.join(CARPETA_CACHE, f".{clave}.{os.getpid()}.{threading.get_ident()}.tmp.npy")
+        np.save(tmp_path, valores)
+        os.replace(tmp_path, os.path.join(CARPETA_CACHE, _archivo_cache(nombre, clave)))
+        _podar_cache()
+
+
+def _podar_cache(max_bytes=None):
+    # Borra los resultados menos usados hasta que la carpeta quepa en
+    # MAX_CACHE_DISCO_MB. Se comparte entre procesos (dashboard, análisis por
+    # lotes, benchmarks): cada uno conserva lo que usa mientras quepa.
+    max_bytes = MAX_CACHE_DISCO_MB * 1024 * 1024 if max_bytes is None else max_bytes
+    archivos = []
+    for entrada in os.scandir(CARPETA_CACHE):
+        if entrada.name.startswith('.') or not entrada.name.endswith('.npy'):
+            continue  # Temporales de otro proceso que está escribiendo
+        try:
+            info = entrada.stat()
+        except OSError:
+            continue
+        archivos.append((info.st_mtime, info.st_size, entrada.path))
+    total = sum(tamano for _, tamano, _ in archivos)
+    for _, tamano, path in sorted(archivos):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= tamano
+
+
+def calcular(df, nombres, usar_cache=True):
+    # Devuelve un DataFrame (mismo índice que df) con las métricas pedidas.
+    # Cada resultado se guarda con una clave que depende del hash de sus
+    # columnas de entrada (y del índice), así que solo se recalcula lo que cambia.
+    orden = resolver(nombres)
+    hash_indice = _hash_array(df.index.to_numpy(dtype='datetime64[ns]'))
+    valores = {}
+    claves = {}
+
+    for nombre in orden:
+        spec = METRICAS[nombre]
+        partes = [nombre, _version_formula(spec['formula']), hash_indice]
+        for entrada in spec['entradas']:
+            if entrada in METRICAS:
+                partes.append(claves[entrada])
+            else:
+                if entrada not in df.columns:
+                    raise KeyError(f"La métrica '{nombre}' necesita la columna '{entrada}'.")
+                partes.append(_hash_array(df[entrada].to_numpy(dtype='float64')))
+        clave = hashlib.blake2b('|'.join(partes).encode(), digest_size=16).hexdigest()
+        claves[nombre] = clave
+
+        resultado = _leer_cache(nombre, clave) if usar_cache else None
+        if resultado is None:
+            argumentos = [valores[e] if e in METRICAS else df[e].to_numpy(dtype='float64')
+                          for e in spec['entradas']]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                resultado = np.asarray(spec['formula'](*argumentos), dtype='float64')
+            if usar_cache:
+                _guardar_cache(nombre, clave, resultado)
+        valores[nombre] = resultado
+
+    return pd.DataFrame({nombre: valores[nombre] for nombre in nombres}, index=df.index)
+
+
+def calcular_desde_tabla(ruta_tabla, nombres, usar_cache=True):
+    # Para análisis por lotes: carga solo las columnas necesarias del almacén
+    df = almacen.cargar_tabla(ruta_tabla, columnas=columnas_necesarias(nombres))
+    return calcular(df.sort_index(), nombres, usar_cache=usar_cache)
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import instrumentacion
+import manifest
+
+# --- CONFIGURACIÓN ---
+# Etapas independientes que pueden ejecutarse a la vez
+MAX_ETAPAS_PARALELAS = 4
+
+# Cada etapa es un diccionario:
+#   'nombre':      identificador único (también clave del manifest)
+#   'descripcion': texto para la consola
+#   'funcion':     callable sin argumentos
+#   'entradas':    rutas que lee (archivos, carpetas o prefijos de tabla)
+#   'salidas':     rutas que escribe
+#   'siempre':     (opcional) no consultar el manifest, p.ej. descargas de red
+#   'depende_de':  (opcional) dependencias explícitas además de las deducidas
+
+
+class ErrorEtapa(Exception):
+    def __init__(self, etapa, causa):
+        super().__init__(f"La etapa '{etapa}' ha fallado: {type(causa).__name__}: {causa}")
+        self.etapa = etapa
+        self.causa = causa
+
+
+def _solapan(salida, entrada):
+    # Misma semántica que manifest.expandir_rutas: 'ruta' cubre 'ruta',
+    # 'ruta/...' y 'ruta.*'
+    a, b = os.path.normpath(salida), os.path.normpath(entrada)
+    if a == b:
+        return True
+    return any(x.startswith(y + sep) for x, y in ((a, b), (b, a)) for sep in (os.sep, '.'))
+
+
+def construir_grafo(etapas):
+    # B depende de A si alguna entrada de B es una salida de A
+    nombres = [etapa['nombre'] for etapa in etapas]
+    if len(set(nombres)) != len(nombres):
+        raise ValueError("Hay etapas con el mismo nombre.")
+
+    dependencias = {}
+    for etapa in etapas:
+        deps = set(etapa.get('depende_de', []))
+        for otra in etapas:
+            if otra is etapa:
+                continue
+            if any(_solapan(s, e) for s in otra['salidas'] for e in etapa['entradas']):
+                deps.add(otra['nombre'])
+        desconocidas = deps - set(nombres)
+        if desconocidas:
+            raise ValueError(f"'{etapa['nombre']}' depende de etapas inexistentes: {sorted(desconocidas)}")
+        dependencias[etapa['nombre']] = deps
+
+    # Detección de ciclos (Kahn)
+    restantes = {nombre: set(deps) for nombre, deps in dependencias.items()}
+    while restantes:
+        listas = [nombre for nombre, deps in restantes.items() if not deps]
+        if not listas:
+            raise ValueError(f"Ciclo de dependencias entre etapas: {sorted(restantes)}")
+        for nombre in listas:
+            del restantes[nombre]
+        for deps in restantes.values():
+            deps.difference_update(listas)
+
+    return dependencias
+
+
+def _ejecutar_etapa(etapa, registro, force, lock):
+    nombre = etapa['nombre']
+    with instrumentacion.etapa(nombre) as medicion:
+        if not force and not etapa.get('siempre'):
+            if manifest.etapa_al_dia(registro, nombre, etapa['entradas'], etapa['salidas']):
+                print(f"  -> [{nombre}] Entradas sin cambios desde la última ejecución, se omite.")
+                medicion['estado'] = 'omitida'
+                return 'omitida'
+
+        etapa['funcion']()
+
+    if not etapa.get('siempre'):
+        with lock:
+            if manifest.registrar_etapa(registro, nombre, etapa['entradas'], etapa['salidas']):
+                manifest.guardar(registro)
+    return 'ejecutada'
+
+
+def ejecutar(etapas, force=False, max_workers=MAX_ETAPAS_PARALELAS):
+    # Lanza cada etapa en cuanto terminan todas sus dependencias. Si una falla,
+    # no se lanza ninguna más y se propaga ErrorEtapa con su nombre.
+    dependencias = construir_grafo(etapas)
+    por_nombre = {etapa['nombre']: etapa for etapa in etapas}
+    # Con force se ejecutan todas, pero el registro parte del manifest: las
+    # etapas que no se ejecutan ahora (un subcomando) conservan su entrada
+    registro = manifest.cargar()
+    lock = threading.Lock()
+
+    resultados = {}
+    lanzadas = set()
+    futuros = {}
+    inicios = {}
+
+    # El pool se cierra a mano: con 'with', un fallo esperaría a que terminasen
+    # las etapas que siguen en marcha antes de propagarse
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        def lanzar_listas():
+            for nombre, deps in dependencias.items():
+                if nombre not in lanzadas and deps <= resultados.keys():
+                    lanzadas.add(nombre)
+                    etapa = por_nombre[nombre]
+                    print(f"\n[{len(lanzadas)}/{len(etapas)}] EJECUTANDO: {etapa.get('descripcion', nombre)}...")
+                    inicios[nombre] = time.perf_counter()
+                    # Cada etapa corre en una copia del contexto (informe de instrumentación)
+                    tarea = instrumentacion.en_contexto(_ejecutar_etapa)
+                    futuros[pool.submit(tarea, etapa, registro, force, lock)] = nombre
+
+        lanzar_listas()
+        while futuros:
+            hechos, _ = wait(futuros, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                nombre = futuros.pop(futuro)
+                try:
+                    resultados[nombre] = futuro.result()
+                except Exception as e:
+                    print(f"\n  ERROR en la etapa '{nombre}': {e}")
+                    raise ErrorEtapa(nombre, e) from e
+                print(f"  -> [{nombre}] {resultados[nombre]} en {time.perf_counter() - inicios[nombre]:.1f}s")
+            lanzar_listas()
+    except BaseException:
+        # No se espera a las etapas en marcha (terminan en segundo plano)
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+    return resultados
@@ -0,0 +1,213 @@
+import pandas as pd
+import numpy as np
+from pandas.tseries.frequencies import to_offset
+import json
+import os
+import shutil
+import config
+import almacen
+
+# Pirámides de agregación del dataset maestro: una tabla por nivel (hora, día,
+# semana, mes, año) con la media, el mínimo, el máximo y el último valor de
+# cada columna en cada periodo. Solo se construyen los niveles más gruesos que
+# la rejilla del maestro; quien pinta o sirve un rango largo lee el nivel que
+# cabe en su presupuesto de puntos en vez de recorrer la resolución completa.
+
+# --- CONFIGURACIÓN ---
+CARPETA = config.carpeta('processed', "piramide")  # Una tabla del almacén por nivel + niveles.json
+FILE_ESTADO = os.path.join(CARPETA, "niveles.json")
+
+# nivel -> (periodo de pandas, duración mínima del periodo), de más fino a más grueso
+NIVELES = {
+    'hora': ('h', pd.Timedelta(hours=1)),
+    'dia': ('D', pd.Timedelta(days=1)),
+    'semana': ('W', pd.Timedelta(days=7)),
+    'mes': ('M', pd.Timedelta(days=28)),
+    'anio': ('Y', pd.Timedelta(days=365)),
+}
+# Cada nivel se agrega desde el nivel más fino cuyos periodos caben enteros en
+# los suyos; si ese nivel no se construye (rejilla más gruesa), desde el maestro.
+# Así el maestro solo lo recorren los primeros niveles y el resto sale de
+# tablas pequeñas.
+DERIVA_DE = {
+    'dia': 'hora',
+    'semana': 'dia',
+    'mes': 'dia',
+    'anio': 'mes',
+}
+# 'n' = valores no nulos del periodo; hace falta para combinar medias al
+# derivar un nivel de otro
+ESTADISTICOS = ('mean', 'min', 'max', 'last', 'n')
+SEPARADOR = '__'  # Columna '<serie>__<estadístico>'
+
+
+def nombre_columna(columna, estadistico):
+    return f"{columna}{SEPARADOR}{estadistico}"
+
+
+def ruta_nivel(nivel):
+    return os.path.join(CARPETA, nivel)
+
+
+def paso_rejilla(resolucion):
+    # Desplazamiento desde una fecha fija: vale también para 'D' (no es un Tick en pandas 3)
+    origen = pd.Timestamp('2000-01-01')
+    return origen + to_offset(resolucion) - origen
+
+
+def niveles_para(resolucion):
+    # Niveles cuyos periodos son más largos que el paso de la rejilla
+    paso = paso_rejilla(resolucion)
+    return [nivel for nivel, (_, duracion) in NIVELES.items() if duracion > paso]
+
+
+# --- AGREGACIÓN ---
+def _reducir(ids, media, n, minimo, maximo, ultimo):
+    # Una pasada vectorizada: las filas llegan ordenadas, así que cada periodo
+    # es un tramo contiguo y basta reduceat sobre sus inicios (todas las
+    # columnas a la vez). Devuelve (inicios de tramo, estadísticos por tramo).
+    inicios = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+    n_total = np.add.reduceat(n, inicios, axis=0)
+    suma = np.add.reduceat(np.where(n > 0, media * n, 0.0), inicios, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media_total = np.where(n_total > 0, suma / n_total, np.nan)
+
+    # Último valor no nulo: la mayor posición válida de cada tramo
+    posiciones = np.where(~np.isnan(ultimo), np.arange(len(ids))[:, None], -1)
+    ultima = np.maximum.reduceat(posiciones, inicios, axis=0)
+    ultimo_total = np.where(ultima >= 0, np.take_along_axis(ultimo, np.maximum(ultima, 0), axis=0), np.nan)
+
+    # fmin/fmax ignoran los NaN (y dan NaN si el tramo no tiene datos)
+    return inicios, {
+        'mean': media_total,
+        'min': np.fmin.reduceat(minimo, inicios, axis=0),
+        'max': np.fmax.reduceat(maximo, inicios, axis=0),
+        'last': ultimo_total,
+        'n': n_total,
+    }
+
+
+def agregar(fuente, nivel, columnas, desde_maestro):
+    # fuente: el maestro (desde_maestro=True) o la tabla de un nivel más fino
+    if fuente.empty:
+        return pd.DataFrame({nombre_columna(c, e): pd.Series(dtype='float64') for c in columnas
+                             for e in ESTADISTICOS}, index=pd.DatetimeIndex([], name=almacen.INDICE))
+    periodos = fuente.index.to_period(NIVELES[nivel][0])
+    if desde_maestro:
+        valores = fuente[columnas].to_numpy(dtype='float64')
+        n = (~np.isnan(valores)).astype('float64')
+        entradas = (valores, n, valores, valores, valores)
+    else:
+        entradas = tuple(fuente[[nombre_columna(c, e) for c in columnas]].to_numpy(dtype='float64')
+                         for e in ('mean', 'n', 'min', 'max', 'last'))
+    inicios, estadisticos = _reducir(periodos.asi8, *entradas)
+
+    datos = {}
+    for j, col in enumerate(columnas):
+        for estadistico in ESTADISTICOS:
+            datos[nombre_columna(col, estadistico)] = estadisticos[estadistico][:, j]
+    indice = pd.DatetimeIndex(periodos[inicios].start_time, name=almacen.INDICE)
+    return pd.DataFrame(datos, index=indice)
+
+
+# --- CONSTRUCCIÓN / ACTUALIZACIÓN ---
+def cargar_estado():
+    if not os.path.exists(FILE_ESTADO):
+        return None
+    with open(FILE_ESTADO, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def actualizar(df, resolucion, tabla_base, desde=None):
+    # Construye (desde=None) o actualiza las pirámides a partir del maestro ya
+    # fusionado. En incremental solo cambian las filas desde 'desde': de cada
+    # nivel se reagregan los periodos desde el que contiene 'desde' y se
+    # conservan los anteriores.
+    columnas = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+    niveles = niveles_para(resolucion)
+    estado = cargar_estado()
+    if desde is not None and (estado is None or estado['resolucion'] != resolucion
+                              or estado['columnas'] != columnas or estado['niveles'] != niveles):
+        desde = None
+
+    tablas = {}
+    for nivel in niveles:
+        padre = DERIVA_DE.get(nivel)
+        desde_maestro = padre not in tablas
+        fuente = df if desde_maestro else tablas[padre]
+        previa = None
+        if desde is not None and almacen.existe_tabla(ruta_nivel(nivel)):
+            corte = pd.Period(desde, NIVELES[nivel][0]).start_time
+            previa = almacen.cargar_tabla(ruta_nivel(nivel))
+            previa = previa.loc[previa.index < corte].copy()
+            fuente = fuente.loc[corte:]
+        tabla = agregar(fuente, nivel, columnas, desde_maestro)
+        if previa is not None:
+            tabla = pd.concat([previa, tabla])
+        tablas[nivel] = tabla
+        almacen.guardar_tabla(tabla, ruta_nivel(nivel))
+
+    # Niveles que ya no corresponden a la rejilla actual
+    for nivel in NIVELES:
+        if nivel not in niveles:
+            for formato in almacen.EXTENSIONES:
+                path = almacen.ruta_formato(ruta_nivel(nivel), formato)
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                elif os.path.exists(path):
+                    os.remove(path)
+
+    estado = {'resolucion': resolucion, 'tabla_base': tabla_base, 'columnas': columnas, 'niveles': niveles,
+              'filas': {nivel: len(tabla) for nivel, tabla in tablas.items()}}
+    os.makedirs(CARPETA, exist_ok=True)
+    with open(FILE_ESTADO + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2)
+    os.replace(FILE_ESTADO + '.tmp', FILE_ESTADO)
+
+    modo = f"desde {pd.Timestamp(desde).date()}" if desde is not None else "completas"
+    print(f"  -> Pirámides {modo}: " + ", ".join(f"{n} ({len(t)} filas)" for n, t in tablas.items()))
+    return niveles
+
+
+# --- LECTURA ---
+def puntos_en_rango(nivel, inicio, fin, resolucion):
+    # Puntos que tendría [inicio, fin] en un nivel (None = el maestro)
+    if nivel is None:
+        return int((pd.Timestamp(fin) - pd.Timestamp(inicio)) / paso_rejilla(resolucion)) + 1
+    periodo = NIVELES[nivel][0]
+    return pd.Period(fin, periodo).ordinal - pd.Period(inicio, periodo).ordinal + 1
+
+
+def elegir_nivel(inicio, fin, max_puntos):
+    # El nivel más fino (el maestro si cabe) con como mucho max_puntos puntos
+    # en [inicio, fin]; si ninguno cabe, el más grueso. None = el maestro.
+    estado = cargar_estado()
+    if estado is None:
+        return None
+    candidatos = [None] + estado['niveles']
+    for nivel in candidatos:
+        if puntos_en_rango(nivel, inicio, fin, estado['resolucion']) <= max_puntos:
+            return nivel
+    return candidatos[-1]
+
+
+def cargar_nivel(nivel, columnas=None, estadistico='mean', inicio=None, fin=None):
+    # Tabla de un nivel con las columnas originales (un estadístico) recortada
+    # a [inicio, fin]. nivel=None lee el maestro.
+    if nivel is None:
+        estado = cargar_estado()
+        if estado is None:
+            raise FileNotFoundError(f"No hay pirámides en '{CARPETA}'.")
+        df = almacen.cargar_tabla(estado['tabla_base'], columnas)
+    else:
+        if columnas is None:
+            columnas = cargar_estado()['columnas']
+        df = almacen.cargar_tabla(ruta_nivel(nivel), [nombre_columna(c, estadistico) for c in columnas])
+        df.columns = columnas
+    return df.loc[inicio:fin]
+
+
+def cargar_rango(columnas, inicio, fin, max_puntos, estadistico='mean'):
+    # Atajo para los consumidores: (nivel elegido, datos del rango)
+    nivel = elegir_nivel(inicio, fin, max_puntos)
+    return nivel, cargar_nivel(nivel, columnas, estadistico, inicio, fin)
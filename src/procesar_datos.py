@@ -1,45 +1,146 @@
 import pandas as pd
+import numpy as np
+from pandas.tseries.frequencies import to_offset
 import os
+import io
+import sys
+import json
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import config
+import almacen
+import manifest
+import series_crudas
+import piramides
+import flota
+import estadisticas
+import instrumentacion
 
 # --- CONFIGURACIÓN DE RUTAS ---
-# Rutas relativas desde la raíz
-FOLDER_API = "datos/raw_api"
-FILE_EFFICIENCY = "datos/raw_manual/efficiency_manual.csv"
-FILE_EIA_CLEAN = "datos/processed/eia_limpio.csv"
+# Rutas relativas desde la raíz (carpetas configurables en config.py)
+FOLDER_API = config.carpeta('raw_api')
+FILE_EFFICIENCY = config.carpeta('raw_manual', "efficiency_manual.csv")
+FILE_EIA_CLEAN = config.carpeta('processed', "eia_limpio")  # Tabla del almacén (ver almacen.py)
 
-# CAMBIO: Nombre final ajustado
-OUTPUT_FILE = "datos/processed/dataset_final_btc.csv"
+# CAMBIO: Nombre final ajustado. Se guarda en formato columnar (almacen.FORMATO);
+# la copia CSV es opcional.
+OUTPUT_TABLE = config.carpeta('processed', "dataset_final_btc")
+EXPORTAR_CSV = False
 
+# Fusión incremental: estado de la última fusión (firmas de los crudos, hashes
+# de los manuales y primer dato válido de cada columna)
+ESTADO_FUSION = config.carpeta('processed', ".estado_fusion.json")
 
-def load_blockchain_files():
+# Eficiencia de la red (efficiency_j_th):
+#   'flota'    -> mezcla de cohortes de hardware en servicio ponderada por hashrate (ver flota.py)
+#   'frontera' -> interpolación lineal de efficiency_manual.csv (el ASIC más nuevo)
+MODELO_EFICIENCIA = 'flota'
+
+# --- INGESTA ---
+RESOLUCION = 'D'  # Rejilla común de todas las series (alias de pandas: 'D', 'h', '15min'...)
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'  # Formato de los CSV de Blockchain.com
+MAX_PROCESOS = os.cpu_count() or 1
+UMBRAL_PARALELO_BYTES = 8 * 1024 * 1024  # A partir de aquí se parsea en paralelo
+
+# Motor de parseo más rápido disponible (pyarrow es opcional)
+try:
+    import pyarrow  # noqa: F401
+    MOTOR_CSV = 'pyarrow'
+except ImportError:
+    MOTOR_CSV = 'c'
+
+
+def leer_serie(path, col_name, desde=None):
+    # Parseo tipado: valores float64 y formato de fecha fijo (sin inferencia).
+    # Devuelve arrays NumPy (timestamps en ns, valores), baratos de enviar
+    # entre procesos. Con 'desde' solo se lee la cola del archivo a partir de
+    # ese timestamp.
+    fuente = path
+    if desde is not None:
+        with open(path, 'rb') as f:
+            f.seek(series_crudas.offset_desde(path, desde.strftime(FORMATO_FECHA)))
+            fuente = io.BytesIO(f.read())
+        if not fuente.getbuffer().nbytes:
+            return np.empty(0, dtype='int64'), np.empty(0)
+    df = pd.read_csv(fuente, names=['date', col_name], header=None,
+                     dtype={col_name: 'float64'}, engine=MOTOR_CSV)
+    fechas = df['date']
+    # El motor pyarrow ya reconoce los timestamps; el motor C devuelve texto
+    if not pd.api.types.is_datetime64_any_dtype(fechas):
+        fechas = pd.to_datetime(fechas, format=FORMATO_FECHA)
+    marcas = fechas.to_numpy(dtype='datetime64[ns]')
+    return marcas.view('int64'), df[col_name].to_numpy(dtype='float64')
+
+
+def alinear_series(series, resolucion=RESOLUCION, desde=None):
+    # Agrega todas las series sobre una única rejilla común en una sola pasada:
+    # cada muestra cae en su intervalo (media por intervalo, como resample().mean())
+    # y se escribe directamente en su columna de una matriz preasignada.
+    paso = to_offset(resolucion).nanos
+    nombres = list(series)
+    if desde is not None:
+        inicio = desde.value // paso
+    else:
+        inicio = min(marcas.min() // paso for marcas, _ in series.values())
+    fin = max(marcas.max() // paso for marcas, _ in series.values())
+    n = int(fin - inicio + 1)
+
+    matriz = np.full((n, len(nombres)), np.nan)
+    for j, nombre in enumerate(nombres):
+        marcas, valores = series[nombre]
+        validos = ~np.isnan(valores)
+        idx = marcas[validos] // paso - inicio
+        suma = np.bincount(idx, weights=valores[validos], minlength=n)
+        cuenta = np.bincount(idx, minlength=n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            matriz[:, j] = suma / cuenta
+
+    index = pd.DatetimeIndex(((inicio + np.arange(n)) * paso).astype('datetime64[ns]'), name='date')
+    return pd.DataFrame(matriz, index=index, columns=nombres)
+
+
+def load_blockchain_files(desde=None):
     print("--- 1. Cargando datos de Blockchain.com ---")
     if not os.path.exists(FOLDER_API):
         print(f"La carpeta '{FOLDER_API}' no existe.")
         return None
 
-    dfs = []
-    csv_files = [f for f in os.listdir(FOLDER_API) if f.endswith('.csv')]
+    csv_files = sorted(f for f in os.listdir(FOLDER_API) if f.endswith('.csv'))
 
     if not csv_files:
         print(f"No hay CSVs en {FOLDER_API}.")
         return None
 
-    for file_name in csv_files:
-        path = os.path.join(FOLDER_API, file_name)
-        col_name = file_name.replace('.csv', '')
+    rutas = {file_name.replace('.csv', ''): os.path.join(FOLDER_API, file_name) for file_name in csv_files}
+
+    # Con pocos datos arrancar procesos cuesta más de lo que se gana
+    total_bytes = sum(os.path.getsize(path) for path in rutas.values())
+    if total_bytes >= UMBRAL_PARALELO_BYTES and len(rutas) > 1:
+        # 'spawn' y no 'fork': la fusión corre en un hilo del planificador de
+        # etapas, con otros hilos (descargas) en marcha, y hacer fork de un
+        # proceso con varios hilos puede heredar locks tomados y bloquearse
+        with ProcessPoolExecutor(max_workers=min(MAX_PROCESOS, len(rutas)),
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            futuros = {col_name: pool.submit(leer_serie, path, col_name, desde) for col_name, path in rutas.items()}
+    else:
+        futuros = None
+
+    series = {}
+    for col_name, path in rutas.items():
         try:
-            df = pd.read_csv(path, names=['date', col_name], header=None)
-            df['date'] = pd.to_datetime(df['date'])
-            df.set_index('date', inplace=True)
-            df = df.resample('D').mean()
-            dfs.append(df)
+            # En paralelo el tiempo de cada archivo transcurre en otro proceso: solo se cuentan filas
+            with instrumentacion.archivo(path) if not futuros else contextlib.nullcontext():
+                series[col_name] = futuros[col_name].result() if futuros else leer_serie(path, col_name, desde)
+            instrumentacion.contar('filas_leidas', len(series[col_name][0]), archivo=path)
         except Exception as e:
-            print(f"Error leyendo {file_name}: {e}")
+            print(f"Error leyendo {col_name}.csv: {e}")
 
-    if not dfs: return None
+    series = {col_name: datos for col_name, datos in series.items() if len(datos[0])}
+    if not series: return None
 
-    print(f"  -> Fusionando {len(dfs)} archivos de API...")
-    return pd.concat(dfs, axis=1)
+    print(f"  -> Alineando {len(series)} archivos de API sobre una rejilla '{RESOLUCION}'...")
+    return alinear_series(series, resolucion=RESOLUCION, desde=desde)
 
 
 def load_manual_data():
@@ -51,6 +152,7 @@ def load_manual_data():
     if os.path.exists(FILE_EFFICIENCY):
         try:
             df_eff = pd.read_csv(FILE_EFFICIENCY)
+            instrumentacion.contar('filas_leidas', len(df_eff), archivo=FILE_EFFICIENCY)
             df_eff['date'] = pd.to_datetime(df_eff['date'])
             df_eff.set_index('date', inplace=True)
             df_eff = df_eff.resample('D').interpolate(method='linear')
@@ -61,11 +163,9 @@ def load_manual_data():
         print(f"No existe {FILE_EFFICIENCY} (usando defaults).")
 
     # Electricidad
-    if os.path.exists(FILE_EIA_CLEAN):
+    if almacen.existe_tabla(FILE_EIA_CLEAN):
         try:
-            df_elec = pd.read_csv(FILE_EIA_CLEAN)
-            df_elec['date'] = pd.to_datetime(df_elec['date'])
-            df_elec.set_index('date', inplace=True)
+            df_elec = almacen.cargar_tabla(FILE_EIA_CLEAN)
             df_elec = df_elec.resample('D').ffill()
             print("Electricidad cargada.")
         except Exception as e:
@@ -76,34 +176,199 @@ def load_manual_data():
     return df_eff, df_elec
 
 
-# --- FUNCIÓN PRINCIPAL ---
-def main():
-    print("--- 3. Procesando y fusionando datos ---")
+def unir(df, df_eff, df_elec):
+    if df_eff is not None: df = df.join(df_eff, how='left')
+    if df_elec is not None: df = df.join(df_elec, how='left')
+    return df
+
+
+def rellenar(df, arrastre=None):
+    # 'arrastre' es la última fila ya procesada: se antepone para que el ffill
+    # continúe exactamente donde lo dejó la fusión anterior.
+    if arrastre is not None:
+        df = pd.concat([arrastre.to_frame().T, df.reindex(columns=arrastre.index)])
+    df = df.ffill().bfill()
+    if arrastre is not None:
+        df = df.iloc[1:]
+
+    if 'efficiency_j_th' not in df: df['efficiency_j_th'] = 15.0
+    if 'elec_cost_kwh' not in df: df['elec_cost_kwh'] = 0.05
+    return df
+
+
+def aplicar_modelo_eficiencia(df):
+    # Sustituye la eficiencia interpolada por la del parque por cohortes. El
+    # modelo es causal: recalcularlo entero no cambia las filas anteriores.
+    if MODELO_EFICIENCIA != 'flota':
+        return df
+    cohortes = flota.leer_cohortes(FILE_EFFICIENCY)
+    if cohortes is None or 'hashrate' not in df:
+        print("  -> Sin cohortes de hardware o sin hashrate: se mantiene la eficiencia interpolada.")
+        return df
+    diario = df['hashrate'].resample('D').mean()
+    df['efficiency_j_th'] = flota.eficiencia_red(diario, cohortes).reindex(df.index, method='ffill')
+    print(f"  -> Eficiencia del parque por cohortes ({len(cohortes[0])} lanzamientos de hardware).")
+    return df
+
+
+def firma_modelo():
+    # Cambiar el modelo de eficiencia (o flota.py) obliga a una fusión completa
+    return [MODELO_EFICIENCIA, manifest.hash_archivo(flota.__file__)]
+
+
+def firma_crudos():
+    firmas = {}
+    for file_name in sorted(os.listdir(FOLDER_API)):
+        if file_name.endswith('.csv'):
+            stat = os.stat(os.path.join(FOLDER_API, file_name))
+            firmas[file_name] = [stat.st_size, stat.st_mtime_ns]
+    return firmas
+
+
+def cargar_estado():
+    if not os.path.exists(ESTADO_FUSION):
+        return None
+    try:
+        with open(ESTADO_FUSION, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
+
+def guardar_estado(primer_valido):
+    estado = {
+        'resolucion': RESOLUCION,
+        'crudos': firma_crudos(),
+        'manuales': manifest.hash_rutas([FILE_EFFICIENCY, FILE_EIA_CLEAN]),
+        'modelo_eficiencia': firma_modelo(),
+        'primer_valido': {col: fecha.isoformat() for col, fecha in primer_valido.items()},
+    }
+    with open(ESTADO_FUSION + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2, sort_keys=True)
+    os.replace(ESTADO_FUSION + '.tmp', ESTADO_FUSION)
+
+
+def inicio_incremental():
+    # Devuelve (desde, motivo). desde=None obliga a una reconstrucción completa;
+    # motivo='sin cambios' indica que el dataset ya está al día.
+    estado = cargar_estado()
+    if estado is None or not almacen.existe_tabla(OUTPUT_TABLE):
+        return None, "no hay fusión previa"
+    if estado.get('resolucion') != RESOLUCION:
+        return None, "ha cambiado la resolución"
+    if estado.get('manuales') != manifest.hash_rutas([FILE_EFFICIENCY, FILE_EIA_CLEAN]):
+        return None, "han cambiado los datos manuales"
+    if estado.get('modelo_eficiencia') != firma_modelo():
+        return None, "ha cambiado el modelo de eficiencia"
+
+    firmas = firma_crudos()
+    if set(firmas) != set(estado.get('crudos', {})):
+        return None, "ha cambiado el conjunto de series"
+
+    # Cada crudo modificado debe estar en el registro de cambios de la descarga
+    cambios = series_crudas.leer_cambios(FOLDER_API)
+    marcas = []
+    for file_name, firma in firmas.items():
+        if firma == estado['crudos'][file_name]:
+            continue
+        marca = cambios.get(file_name.replace('.csv', ''))
+        if marca is None or marca == series_crudas.TODO:
+            return None, f"'{file_name}' se ha reescrito entero"
+        marcas.append(marca)
+    if not marcas:
+        return None, "sin cambios"
+
+    desde = pd.Timestamp(min(marcas)).floor(RESOLUCION)
+    # Antes del primer dato válido de una columna el valor viene del bfill, que
+    # depende del futuro: ahí no se puede arrastrar la fila anterior.
+    if any(pd.Timestamp(fecha) >= desde for fecha in estado['primer_valido'].values()):
+        return None, "la ventana alcanza el relleno inicial de alguna serie"
+    return desde, None
+
+
+def fusion_completa():
     # 1. API
     df = load_blockchain_files()
     if df is None:
-        print("Saltando proceso por falta de datos API.")
-        return
+        return None, None
 
     # 2. Manuales
     df_eff, df_elec = load_manual_data()
 
     # 3. Join
-    if df_eff is not None: df = df.join(df_eff, how='left')
-    if df_elec is not None: df = df.join(df_elec, how='left')
+    df = unir(df, df_eff, df_elec)
+    primer_valido = {col: df[col].first_valid_index() for col in df.columns}
+    primer_valido = {col: fecha for col, fecha in primer_valido.items() if fecha is not None}
 
     # 4. Limpieza
-    df = df.ffill().bfill()
+    return rellenar(df), primer_valido
 
-    if 'efficiency_j_th' not in df: df['efficiency_j_th'] = 15.0
-    if 'elec_cost_kwh' not in df: df['elec_cost_kwh'] = 0.05
+
+def fusion_incremental(desde, maestro=None):
+    # Solo se leen los crudos desde 'desde' y se recalculan joins y rellenos en
+    # esa cola; la parte anterior del dataset maestro se reutiliza tal cual.
+    # 'maestro' = el dataset ya en memoria (demonio); si no, se lee del almacén.
+    if maestro is None:
+        maestro = almacen.cargar_tabla(OUTPUT_TABLE)
+    anterior = maestro.loc[:desde - to_offset(RESOLUCION)]
+    if anterior.empty or anterior.index[-1] != desde - to_offset(RESOLUCION):
+        return None
+
+    ventana = load_blockchain_files(desde=desde)
+    if ventana is None:
+        return None
+    df_eff, df_elec = load_manual_data()
+    ventana = rellenar(unir(ventana, df_eff, df_elec), arrastre=anterior.iloc[-1])
+
+    print(f"  -> Recalculadas {len(ventana)} filas desde {desde.date()} (se conservan {len(anterior)}).")
+    return pd.concat([anterior, ventana])
+
+
+# --- FUNCIÓN PRINCIPAL ---
+def main(incremental=True, maestro=None):
+    # Devuelve el dataset maestro resultante (None si no ha cambiado)
+    print("--- 3. Procesando y fusionando datos ---")
+
+    desde, motivo = inicio_incremental() if incremental else (None, "modo completo")
+    if desde is None and motivo == "sin cambios":
+        print("  -> Los datos crudos no han cambiado desde la última fusión.")
+        # Fusión anterior a las estadísticas móviles: se calculan sobre el maestro guardado
+        if not (almacen.existe_tabla(estadisticas.OUTPUT_ESTADISTICAS)
+                and almacen.existe_tabla(estadisticas.OUTPUT_CORRELACIONES)):
+            estadisticas.actualizar(maestro if maestro is not None else almacen.cargar_tabla(OUTPUT_TABLE), RESOLUCION)
+        return None
+
+    df = None
+    primer_valido = None
+    if desde is not None:
+        print(f"--- Fusión incremental desde {desde.date()} ---")
+        df = fusion_incremental(desde, maestro)
+        primer_valido = cargar_estado()['primer_valido']
+        primer_valido = {col: pd.Timestamp(fecha) for col, fecha in primer_valido.items()}
+    else:
+        print(f"--- Fusión completa ({motivo}) ---")
+
+    if df is None:
+        desde = None
+        df, primer_valido = fusion_completa()
+    if df is None:
+        print("Saltando proceso por falta de datos API.")
+        return None
+
+    df = aplicar_modelo_eficiencia(df)
 
     # 5. Guardar
-    df.to_csv(OUTPUT_FILE)
-    print(f"Dataset maestro guardado en: {OUTPUT_FILE}")
+    rutas = almacen.guardar_tabla(df, OUTPUT_TABLE, exportar_csv=EXPORTAR_CSV)
+    # Pirámides de agregación (semana/mes/año...): se reagrega solo desde 'desde'
+    piramides.actualizar(df, RESOLUCION, OUTPUT_TABLE, desde=desde)
+    # Medias, volatilidades, z-scores y correlaciones móviles (tablas aparte)
+    estadisticas.actualizar(df, RESOLUCION)
+    guardar_estado(primer_valido)
+    series_crudas.limpiar_cambios(FOLDER_API)
+    print(f"Dataset maestro guardado en: {', '.join(rutas)}")
     print("procesar_datos.py finalizado.")
+    return df
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(incremental='--completa' not in sys.argv)
@@ -0,0 +1,95 @@
+import json
+import os
+
+# Utilidades compartidas sobre los CSV crudos de Blockchain.com
+# ('YYYY-MM-DD HH:MM:SS,valor', ordenados por fecha). Sin dependencias pesadas:
+# las usan tanto la descarga como el procesado.
+
+BLOQUE_BYTES = 64 * 1024
+# Registro de cambios pendientes de procesar: nombre -> primer timestamp
+# modificado por la descarga ('*' = archivo reescrito entero)
+CAMBIOS_FILE = '.cambios.json'
+TODO = '*'
+
+
+def ultima_marca(file_path):
+    # Solo leemos el final del archivo: el último timestamp guardado marca
+    # el inicio de la ventana que hay que pedir.
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        lineas = f.read().splitlines()
+    for linea in reversed(lineas):
+        marca = linea.split(b',', 1)[0].strip()
+        if marca:
+            return marca.decode('ascii')
+    return None
+
+
+def offset_desde(file_path, marca):
+    # Offset (en bytes) de la primera línea con timestamp >= marca. Los CSV
+    # están ordenados, así que recorremos el archivo por bloques desde el final.
+    # Los timestamps 'YYYY-MM-DD HH:MM:SS' se comparan bien como texto.
+    marca = marca.encode('ascii')
+    with open(file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        fin = pos = f.tell()
+        resto = b''
+        while pos > 0:
+            leer = min(BLOQUE_BYTES, pos)
+            pos -= leer
+            f.seek(pos)
+            bloque = f.read(leer) + resto
+            # Descartamos la primera línea del bloque (puede estar cortada)
+            inicio = 0 if pos == 0 else bloque.find(b'\n') + 1
+            if pos > 0 and inicio == 0:
+                resto = bloque
+                continue
+            resto = bloque[:inicio]
+
+            lineas = []
+            offset = pos + inicio
+            for linea in bloque[inicio:].split(b'\n'):
+                lineas.append((offset, linea))
+                offset += len(linea) + 1
+            for offset, linea in reversed(lineas):
+                actual = linea.split(b',', 1)[0].strip()
+                if actual and actual < marca:
+                    return min(offset + len(linea) + 1, fin)
+    return 0
+
+
+def leer_cambios(folder):
+    path = os.path.join(folder, CAMBIOS_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def registrar_cambios(folder, cambios):
+    # Acumula con lo pendiente: para cada serie se queda el timestamp más antiguo
+    if not cambios:
+        return
+    pendientes = leer_cambios(folder)
+    for nombre, marca in cambios.items():
+        previa = pendientes.get(nombre)
+        if previa is None or TODO in (previa, marca):
+            pendientes[nombre] = TODO if TODO in (previa, marca) else marca
+        else:
+            pendientes[nombre] = min(previa, marca)
+    path = os.path.join(folder, CAMBIOS_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(pendientes, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def limpiar_cambios(folder):
+    path = os.path.join(folder, CAMBIOS_FILE)
+    if os.path.exists(path):
+        os.remove(path)
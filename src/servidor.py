@@ -0,0 +1,289 @@
+import pandas as pd
+import os
+import sys
+import json
+import gzip
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+import almacen
+import metricas
+import piramides
+import generar_web
+
+# Servidor local del dashboard: sirve index.html y assets/ y, además, una API
+# de consultas por rango sobre el dataset procesado. Al hacer zoom la página
+# pide solo la ventana visible, a la resolución (maestro o nivel de la
+# pirámide) que cabe en su presupuesto de puntos:
+#   GET /api/series?metric=precio_btc,hashrate&from=2020-01-01&to=2021-01-01
+#                   [&resolution=auto|completa|semana|mes...][&points=N][&stat=mean|min|max|last]
+# La respuesta usa el formato compacto de la página ({t, series}, ver
+# generar_web.codificar_eje), con ETag (304 si no ha cambiado) y gzip.
+
+# --- CONFIGURACIÓN ---
+HOST = "127.0.0.1"  # Solo local; para exponerlo en la red, --host 0.0.0.0
+PUERTO = 8000
+RUTA_API = "/api/series"
+PUNTOS_DEFECTO = 2000  # Presupuesto de puntos si la petición no indica 'points'
+MAX_PUNTOS = 100_000
+MAX_CACHE_RESPUESTAS = 256  # Respuestas ya codificadas en memoria (LRU)
+GZIP_MINIMO = 1024  # Las respuestas más pequeñas se envían sin comprimir
+NIVEL_GZIP = 6
+# Rutas estáticas que se sirven (el resto del repositorio no se expone)
+ESTATICOS = ('/', '/index.html', '/assets/')
+
+_cache = OrderedDict()
+_tablas = {}  # (ruta o métrica, versión) -> Future con el DataFrame o la serie
+_lock = threading.Lock()  # Solo protege _cache y _tablas; leer y calcular va fuera
+
+
+class ErrorPeticion(Exception):
+    pass
+
+
+# --- DATOS ---
+def version_datos():
+    # Cambia cada vez que el pipeline reescribe el maestro o las pirámides
+    # (las tablas se sustituyen de forma atómica: cambia su mtime)
+    rutas = [piramides.FILE_ESTADO]
+    for tabla in [generar_web.INPUT_TABLE] + generar_web.TABLAS_ADICIONALES:
+        formato = almacen.formato_guardado(tabla)
+        if formato is not None:
+            rutas.append(almacen.ruta_formato(tabla, formato))
+    return tuple(os.stat(path).st_mtime_ns if os.path.exists(path) else 0 for path in rutas)
+
+
+def _una_vez(clave, cargar):
+    # Carga (clave, versión) una sola vez aunque la pidan varios hilos a la
+    # vez: el primero la carga fuera del lock y el resto espera su Future. Las
+    # peticiones que necesitan otras tablas no esperan.
+    version = clave[1]
+    with _lock:
+        futuro = _tablas.get(clave)
+        propio = futuro is None
+        if propio:
+            for vieja in [k for k in _tablas if k[1] != version]:
+                del _tablas[vieja]
+            futuro = _tablas[clave] = Future()
+    if propio:
+        try:
+            futuro.set_result(cargar())
+        except BaseException as e:
+            # No se guarda el fallo: la siguiente petición lo vuelve a intentar
+            with _lock:
+                if _tablas.get(clave) is futuro:
+                    del _tablas[clave]
+            futuro.set_exception(e)
+    return futuro.result()
+
+
+def _tabla(ruta, version):
+    # Maestro y niveles completos, leídos una vez por versión de los datos
+    return _una_vez((ruta, version), lambda: almacen.cargar_tabla(ruta).sort_index())
+
+
+def _adicionales(version):
+    # Tablas calculadas aparte del maestro (bandas de escenarios, estadísticas
+    # móviles): solo las que existen
+    return [_tabla(tabla, version) for tabla in generar_web.TABLAS_ADICIONALES if almacen.existe_tabla(tabla)]
+
+
+def metricas_disponibles(version):
+    maestro = _tabla(generar_web.INPUT_TABLE, version)
+    return (list(maestro.columns) + [m for m in metricas.METRICAS if m not in maestro.columns]
+            + [c for tabla in _adicionales(version) for c in tabla.columns])
+
+
+def _serie_completa(metrica, version):
+    # Columna del maestro, de una tabla adicional o métrica derivada
+    # (calculada una vez por versión)
+    maestro = _tabla(generar_web.INPUT_TABLE, version)
+    if metrica in maestro.columns:
+        return maestro[metrica]
+    for tabla in _adicionales(version):
+        if metrica in tabla.columns:
+            return tabla[metrica]
+    return _una_vez(('metrica:' + metrica, version), lambda: metricas.calcular(maestro, [metrica])[metrica])
+
+
+def _fecha(texto, nombre):
+    try:
+        fecha = pd.Timestamp(texto)
+    except (ValueError, TypeError):
+        raise ErrorPeticion(f"Fecha no válida en '{nombre}': {texto}")
+    # La página envía ISO en UTC; el dataset no tiene zona horaria
+    return fecha.tz_convert(None) if fecha.tzinfo is not None else fecha
+
+
+def consultar(nombres, desde=None, hasta=None, resolucion='auto', puntos=PUNTOS_DEFECTO, estadistico='mean'):
+    # Datos de la ventana [desde, hasta] en el formato de la página. 'resolucion'
+    # = 'auto' (el nivel más fino que cabe en 'puntos'), 'completa' (el
+    # maestro) o un nivel de la pirámide.
+    version = version_datos()
+    maestro = _tabla(generar_web.INPUT_TABLE, version)
+    disponibles = metricas_disponibles(version)
+    desconocidas = [m for m in nombres if m not in disponibles]
+    if not nombres or desconocidas:
+        raise ErrorPeticion(f"Métricas desconocidas: {desconocidas or '(ninguna)'}. "
+                            f"Disponibles: {', '.join(disponibles)}")
+    if estadistico not in piramides.ESTADISTICOS or estadistico == 'n':
+        raise ErrorPeticion(f"Estadístico no válido: {estadistico}")
+    desde = maestro.index[0] if desde is None else desde
+    hasta = maestro.index[-1] if hasta is None else hasta
+
+    estado = piramides.cargar_estado()
+    niveles = estado['niveles'] if estado else []
+    if resolucion == 'auto':
+        nivel = piramides.elegir_nivel(desde, hasta, puntos) if estado else None
+    elif resolucion == 'completa':
+        nivel = None
+    elif resolucion in niveles:
+        nivel = resolucion
+    else:
+        raise ErrorPeticion(f"Resolución no válida: {resolucion} (auto, completa, {', '.join(niveles)})")
+
+    columnas = {}
+    if nivel is None:
+        for m in nombres:
+            columnas[m] = _serie_completa(m, version).loc[desde:hasta]
+    else:
+        # Desde el inicio del periodo que contiene 'desde' (periodo entero)
+        inicio = pd.Period(desde, piramides.NIVELES[nivel][0]).start_time
+        tabla = _tabla(piramides.ruta_nivel(nivel), version)
+        for m in nombres:
+            if m in estado['columnas']:
+                columnas[m] = tabla[piramides.nombre_columna(m, estadistico)].loc[inicio:hasta]
+            else:
+                # Métrica derivada: se agrega al vuelo solo la ventana pedida
+                ventana = _serie_completa(m, version).loc[inicio:hasta].to_frame()
+                agregada = piramides.agregar(ventana, nivel, [m], desde_maestro=True)
+                columnas[m] = agregada[piramides.nombre_columna(m, estadistico)]
+    df = pd.DataFrame(columnas)
+
+    return {
+        't': generar_web.codificar_eje(df.index),
+        'series': {m: generar_web.codificar_columna(df[m].to_numpy(dtype='float64'), m) for m in nombres},
+        'resolucion': nivel or 'completa',
+        'estadistico': estadistico,
+    }
+
+
+def respuesta(consulta):
+    # (etag, cuerpo, cuerpo gzip) de una consulta, con caché LRU de respuestas
+    clave = (version_datos(),) + consulta
+    with _lock:
+        if clave in _cache:
+            _cache.move_to_end(clave)
+            return _cache[clave]
+    cuerpo = json.dumps(consultar(*consulta), separators=(',', ':')).encode('utf-8')
+    etag = '"' + hashlib.blake2b(cuerpo, digest_size=12).hexdigest() + '"'
+    comprimido = gzip.compress(cuerpo, compresslevel=NIVEL_GZIP, mtime=0) if len(cuerpo) >= GZIP_MINIMO else None
+    with _lock:
+        _cache[clave] = (etag, cuerpo, comprimido)
+        while len(_cache) > MAX_CACHE_RESPUESTAS:
+            _cache.popitem(last=False)
+    return etag, cuerpo, comprimido
+
+
+def leer_consulta(query):
+    parametros = {k: v[-1] for k, v in parse_qs(query).items()}
+    nombres = tuple(m for m in parametros.get('metric', '').split(',') if m)
+    desde = _fecha(parametros['from'], 'from') if parametros.get('from') else None
+    hasta = _fecha(parametros['to'], 'to') if parametros.get('to') else None
+    if desde is not None and hasta is not None and desde > hasta:
+        raise ErrorPeticion("'from' es posterior a 'to'")
+    try:
+        puntos = int(parametros.get('points', PUNTOS_DEFECTO))
+    except ValueError:
+        raise ErrorPeticion(f"'points' no es un entero: {parametros['points']}")
+    puntos = min(max(puntos, 1), MAX_PUNTOS)
+    return nombres, desde, hasta, parametros.get('resolution', 'auto'), puntos, parametros.get('stat', 'mean')
+
+
+# --- HTTP ---
+class Manejador(SimpleHTTPRequestHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=os.path.dirname(generar_web.OUTPUT_FILE), **kwargs)
+
+    def estatico(self, ruta):
+        return any(ruta == e or (e.endswith('/') and e != '/' and ruta.startswith(e)) for e in ESTATICOS)
+
+    def do_GET(self):
+        partes = urlsplit(self.path)
+        if partes.path == RUTA_API:
+            return self.responder_api(partes.query)
+        if self.estatico(partes.path):
+            return super().do_GET()
+        self.enviar_error(404, f"No existe: {partes.path}")
+
+    def do_HEAD(self):
+        if self.estatico(urlsplit(self.path).path):
+            return super().do_HEAD()
+        self.enviar_error(404, "No existe")
+
+    def enviar_error(self, codigo, mensaje):
+        cuerpo = json.dumps({'error': mensaje}).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def responder_api(self, query):
+        try:
+            etag, cuerpo, comprimido = respuesta(leer_consulta(query))
+        except ErrorPeticion as e:
+            return self.enviar_error(400, str(e))
+        except FileNotFoundError as e:
+            return self.enviar_error(503, f"Datos no disponibles (ejecuta el pipeline): {e}")
+
+        # If-None-Match puede traer varias etiquetas, débiles (W/) o '*'
+        etiquetas = [e.strip() for e in self.headers.get('If-None-Match', '').split(',')]
+        etiquetas = [e[2:] if e.startswith('W/') else e for e in etiquetas]
+        if etag in etiquetas or '*' in etiquetas:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        usar_gzip = comprimido is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')  # Siempre se revalida con el ETag
+        self.send_header('Vary', 'Accept-Encoding')
+        if usar_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        datos = comprimido if usar_gzip else cuerpo
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+def crear_servidor(host=HOST, puerto=PUERTO):
+    # puerto=0 elige uno libre (ver servidor.server_address)
+    return ThreadingHTTPServer((host, puerto), Manejador)
+
+
+def main(host=HOST, puerto=PUERTO):
+    servidor = crear_servidor(host, puerto)
+    host, puerto = servidor.server_address[:2]
+    print(f"Dashboard en http://{host}:{puerto}/ (API: {RUTA_API}). Ctrl+C para parar.")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServidor detenido.")
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local del dashboard con API de series por rango")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--puerto', type=int, default=PUERTO)
+    args = parser.parse_args()
+    sys.exit(main(args.host, args.puerto))
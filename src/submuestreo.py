@@ -0,0 +1,77 @@
+import numpy as np
+
+# Reducción de puntos para las trazas del dashboard. Todas las funciones
+# devuelven índices (ordenados) de los puntos a conservar, así el llamador
+# puede aplicarlos a cualquier eje x o columna.
+
+METODOS = ('lttb', 'minmax')
+
+
+def lttb(x, y, n_puntos):
+    # Largest-Triangle-Three-Buckets: en cada cubo se elige el punto que forma
+    # el triángulo de mayor área con el punto elegido en el cubo anterior y la
+    # media del siguiente. Conserva la forma visual (y los picos) de la serie.
+    n = len(x)
+    if n_puntos >= n or n_puntos < 3:
+        return np.arange(n)
+
+    bordes = np.linspace(1, n - 1, n_puntos - 1).astype(np.int64)
+    # Media de cada cubo (para el cubo "siguiente"), con sumas acumuladas
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+
+    indices = np.empty(n_puntos, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(n_puntos - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        sig_inicio, sig_fin = fin, (bordes[i + 2] if i + 2 < len(bordes) else n)
+        cuenta = sig_fin - sig_inicio
+        media_x = (cx[sig_fin] - cx[sig_inicio]) / cuenta
+        media_y = (cy[sig_fin] - cy[sig_inicio]) / cuenta
+
+        xs, ys = x[inicio:fin], y[inicio:fin]
+        areas = np.abs((x[a] - media_x) * (ys - y[a]) - (x[a] - xs) * (media_y - y[a]))
+        a = inicio + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+
+def minmax(y, n_puntos):
+    # Mínimo y máximo de cada cubo (n_puntos / 2 cubos): ningún pico se pierde
+    n = len(y)
+    if n_puntos >= n or n_puntos < 4:
+        return np.arange(n)
+    n_cubos = n_puntos // 2
+    bordes = np.linspace(0, n, n_cubos + 1).astype(np.int64)
+    largo = np.diff(bordes)
+    # Matriz cubos x ancho máximo rellenada con NaN para reducir sin bucles
+    ancho = int(largo.max())
+    pos = bordes[:-1, None] + np.arange(ancho)[None, :]
+    validos = pos < bordes[1:, None]
+    valores = np.where(validos, y[np.minimum(pos, n - 1)], np.nan)
+    i_min = bordes[:-1] + np.nanargmin(valores, axis=1)
+    i_max = bordes[:-1] + np.nanargmax(valores, axis=1)
+    return np.unique(np.concatenate(([0, n - 1], i_min, i_max)))
+
+
+def reducir(x, y, n_puntos, metodo='lttb', escala_log=False):
+    # x: array numérico (p.ej. fechas en ns), y: valores (puede tener NaN).
+    # Con escala_log la forma se evalúa sobre log10(y), como se verá en el eje.
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    if escala_log:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y = np.where(y > 0, np.log10(y), np.nan)
+
+    validos = np.flatnonzero(~np.isnan(y))
+    if metodo is None or len(validos) <= n_puntos:
+        return validos
+    if metodo == 'lttb':
+        elegidos = lttb(x[validos], y[validos], n_puntos)
+    elif metodo == 'minmax':
+        elegidos = minmax(y[validos], n_puntos)
+    else:
+        raise ValueError(f"Método de submuestreo desconocido: {metodo} (usa {METODOS})")
+    return validos[elegidos]
@@ -0,0 +1,227 @@
+// Runtime del dashboard: decodifica los datos compactos que escribe
+// generar_web.py (eje de fechas compartido + columnas en base64) y pinta las
+// figuras de cada pestaña con Plotly la primera vez que se muestra; si los
+// datos están en un fragmento aparte, lo descarga entonces (una sola vez).
+// Con zoom pide a la API del servidor local (servidor.py) la ventana visible a
+// la resolución adecuada; sin servidor, usa una sola vez los datos a
+// resolución completa (incrustados en la página o descargados de assets/) y
+// sustituye cada traza por el tramo visible.
+var Dashboard = (function() {
+    var TIPOS = {f4: Float32Array, f8: Float64Array, u2: Uint16Array, u4: Uint32Array};
+
+    function base64(texto, tipo) {
+        var bin = atob(texto);
+        var bytes = new Uint8Array(bin.length);
+        for (var i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+        return new TIPOS[tipo](bytes.buffer);
+    }
+
+    // Eje de fechas (ms desde epoch): regular (inicio + paso) o por deltas
+    function eje(t) {
+        if (t.x) return base64(t.x, 'f8');
+        var x = new Float64Array(t.n);
+        if (t.deltas) {
+            var d = base64(t.deltas, 'u4');
+            x[0] = t.inicio;
+            for (var i = 1; i < t.n; i++) x[i] = x[i - 1] + d[i - 1];
+        } else {
+            for (var j = 0; j < t.n; j++) x[j] = t.inicio + j * t.paso;
+        }
+        return x;
+    }
+
+    // Decodifica un bloque de datos {t, series}; cada serie se decodifica una vez
+    function Datos(bloque) {
+        this.bloque = bloque;
+        this.x = eje(bloque.t);
+        this.cache = {};
+    }
+    Datos.prototype.serie = function(nombre) {
+        if (!this.cache[nombre]) {
+            var s = this.bloque.series[nombre];
+            var y = base64(s.y, s.tipo);
+            var x = this.x;
+            if (s.i) {
+                // Índices sobre el eje compartido, codificados como deltas
+                var d = base64(s.i, s.tipo_i);
+                x = new Float64Array(d.length);
+                var k = 0;
+                for (var i = 0; i < d.length; i++) { k += d[i]; x[i] = this.x[k]; }
+            }
+            this.cache[nombre] = {x: x, y: y};
+        }
+        return this.cache[nombre];
+    };
+
+    // JSON precomprimido: si el navegador sabe descomprimir gzip se pide el .gz
+    // (sirve con cualquier servidor estático); si no, o si falla, el .json
+    function obtenerJSON(url) {
+        function plano() {
+            return fetch(url).then(function(r) {
+                if (!r.ok) throw new Error(url + ': ' + r.status);
+                return r.json();
+            });
+        }
+        if (!window.DecompressionStream) return plano();
+        return fetch(url + '.gz').then(function(r) {
+            if (!r.ok) throw new Error(url + '.gz: ' + r.status);
+            return new Response(r.body.pipeThrough(new DecompressionStream('gzip'))).json();
+        }).catch(plano);
+    }
+
+    function buscar(t, v) {
+        var lo = 0, hi = t.length;
+        while (lo < hi) { var m = (lo + hi) >> 1; if (t[m] < v) lo = m + 1; else hi = m; }
+        return lo;
+    }
+
+    function fecha(v) {
+        return typeof v === 'string' ? Date.parse(v.replace(' ', 'T') + (v.length <= 10 ? '' : 'Z')) : v;
+    }
+
+    function trazas(spec, datos) {
+        return spec.data.map(function(traza) {
+            var s = datos.serie(traza.meta);
+            return Object.assign({}, traza, {x: s.x, y: s.y});
+        });
+    }
+
+    // Datos completos compartidos por todas las figuras, decodificados una vez
+    // por página: del bloque incrustado (modo 'inline', funciona también con
+    // file://) o descargados de assets/
+    var peticionCompletos = null;
+    function datosCompletos(opciones) {
+        if (!peticionCompletos) {
+            var incrustados = opciones.idCompletos && document.getElementById(opciones.idCompletos);
+            if (incrustados && incrustados.textContent.trim()) {
+                peticionCompletos = Promise.resolve().then(function() {
+                    return new Datos(JSON.parse(incrustados.textContent));
+                });
+            } else if (opciones.urlCompletos) {
+                peticionCompletos = obtenerJSON(opciones.urlCompletos).then(function(bloque) { return new Datos(bloque); });
+            } else {
+                return Promise.reject(new Error('Sin datos a resolución completa'));
+            }
+            peticionCompletos.catch(function() { peticionCompletos = null; });  // Se reintenta en el siguiente zoom
+        }
+        return peticionCompletos;
+    }
+
+    // Aviso visible (una vez por figura) cuando el zoom no puede mostrar el detalle
+    function avisar(gd, error) {
+        console.error(error);
+        if (gd.avisoZoom) return;
+        gd.avisoZoom = document.createElement('div');
+        gd.avisoZoom.className = 'small text-muted px-2';
+        gd.avisoZoom.textContent = location.protocol === 'file:'
+            ? 'El zoom muestra los datos reducidos: abierta como archivo, la página no puede cargar ' +
+              'los datos a resolución completa. Sírvela por HTTP (python main.py serve).'
+            : 'No se han podido cargar los datos a resolución completa; el zoom muestra los datos reducidos.';
+        gd.parentNode.insertBefore(gd.avisoZoom, gd.nextSibling);
+    }
+
+    // API de series por rango (servidor.py): solo si la página llega por HTTP.
+    // Si falla una vez (servidor estático sin API) se usan los datos completos.
+    var apiDisponible = /^https?:$/.test(location.protocol);
+    function ventanaApi(opciones, nombres, r0, r1) {
+        var url = opciones.urlApi + '?metric=' + encodeURIComponent(nombres.join(',')) +
+            '&from=' + encodeURIComponent(new Date(fecha(r0)).toISOString()) +
+            '&to=' + encodeURIComponent(new Date(fecha(r1)).toISOString()) +
+            '&points=' + opciones.zoomMaxPuntos;
+        return fetch(url).then(function(r) {
+            if (!r.ok) throw new Error(url + ': ' + r.status);
+            return r.json();
+        }).then(function(bloque) { return new Datos(bloque); });
+    }
+
+    function activarZoom(gd, spec, opciones) {
+        var vista = null;
+        var peticion = 0;  // Solo se aplica la respuesta del último zoom
+        function aplicar(x, y) {
+            if (!vista) vista = {x: gd.data.map(function(tr) { return tr.x; }), y: gd.data.map(function(tr) { return tr.y; })};
+            Plotly.restyle(gd, {x: x, y: y});
+        }
+        function zoomCompletos(r0, r1, n) {
+            datosCompletos(opciones).then(function(completos) {
+                if (n !== peticion) return;
+                var t = completos.x;
+                var i0 = Math.max(0, buscar(t, fecha(r0)) - 1);
+                var i1 = Math.min(t.length, buscar(t, fecha(r1)) + 1);
+                if (i1 - i0 > opciones.zoomMaxPuntos) return;
+                aplicar(gd.data.map(function() { return t.subarray(i0, i1); }),
+                        gd.data.map(function(tr) { return completos.serie(tr.meta).y.subarray(i0, i1); }));
+            }).catch(function(error) { avisar(gd, error); });
+        }
+        gd.on('plotly_relayout', function(ev) {
+            var r0 = null, r1 = null, auto = false;
+            for (var k in ev) {
+                if (/^xaxis\d*\.range\[0\]$/.test(k)) r0 = ev[k];
+                else if (/^xaxis\d*\.range\[1\]$/.test(k)) r1 = ev[k];
+                else if (/^xaxis\d*\.range$/.test(k)) { r0 = ev[k][0]; r1 = ev[k][1]; }
+                else if (/^xaxis\d*\.autorange$/.test(k)) auto = true;
+            }
+            if (auto && vista) { peticion++; Plotly.restyle(gd, vista); vista = null; return; }
+            if (r0 === null || r1 === null) return;
+            var n = ++peticion;
+            if (!opciones.urlApi || !apiDisponible) return zoomCompletos(r0, r1, n);
+            var nombres = gd.data.map(function(tr) { return tr.meta; });
+            ventanaApi(opciones, nombres.filter(function(m, i) { return nombres.indexOf(m) === i; }), r0, r1)
+                .then(function(datos) {
+                    if (n !== peticion) return;
+                    aplicar(gd.data.map(function(tr) { return datos.serie(tr.meta).x; }),
+                            gd.data.map(function(tr) { return datos.serie(tr.meta).y; }));
+                }).catch(function() {
+                    apiDisponible = false;
+                    zoomCompletos(r0, r1, n);
+                });
+        });
+    }
+
+    function pintar(id, spec, datos, opciones) {
+        var gd = document.getElementById(id);
+        return Plotly.newPlot(gd, trazas(spec, datos), spec.layout, spec.config).then(function() {
+            activarZoom(gd, spec, opciones);
+            return gd;
+        });
+    }
+
+    // Contenido de una pestaña: en la página o en un fragmento aparte
+    function contenido(pestana) {
+        if (!pestana.fragmento) return Promise.resolve(pestana);
+        return obtenerJSON(pestana.fragmento);
+    }
+
+    function iniciar(pagina) {
+        var cargadas = {};
+        function mostrar(selector) {
+            var pestana = pagina.pestanas[selector];
+            if (!pestana) return null;
+            if (!cargadas[selector]) {
+                cargadas[selector] = contenido(pestana).then(function(c) {
+                    var datos = new Datos(c.datos);
+                    return Promise.all(Object.keys(c.figuras).map(function(id) {
+                        return pintar(id, c.figuras[id], datos, pagina.opciones);
+                    }));
+                }).catch(function(error) {
+                    delete cargadas[selector];  // Se reintenta al volver a la pestaña
+                    console.error(error);
+                });
+            } else {
+                // Ya pintada: reajustar al ancho actual del panel
+                cargadas[selector].then(function(figuras) {
+                    (figuras || []).forEach(function(gd) { Plotly.Plots.resize(gd); });
+                });
+            }
+            return cargadas[selector];
+        }
+        document.addEventListener('shown.bs.tab', function(ev) {
+            mostrar(ev.target.getAttribute('data-bs-target'));
+        });
+        Object.keys(pagina.pestanas).forEach(function(selector) {
+            var panel = document.querySelector(selector);
+            if (panel && panel.classList.contains('active')) mostrar(selector);
+        });
+    }
+
+    return {Datos: Datos, obtenerJSON: obtenerJSON, pintar: pintar, iniciar: iniciar};
+})();
@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+# Los módulos del pipeline se importan como en main.py (src en el path)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+class ServidorStub:
+    # Servidor HTTP local que imita los charts de Blockchain.com. 'rutas'
+    # asocia cada path a una función (peticion) -> (código, cabeceras, cuerpo)
+    # o a una lista de respuestas que se devuelven en orden (la última se repite).
+    def __init__(self):
+        self.rutas = {}
+        self.peticiones = []
+        stub = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path, _, query = self.path.partition('?')
+                peticion = {'path': path, 'query': query, 'cabeceras': dict(self.headers)}
+                stub.peticiones.append(peticion)
+                respuesta = stub.rutas.get(path, (404, {}, b''))
+                if callable(respuesta):
+                    respuesta = respuesta(peticion)
+                elif isinstance(respuesta, list):
+                    respuesta = respuesta.pop(0) if len(respuesta) > 1 else respuesta[0]
+                codigo, cabeceras, cuerpo = respuesta
+                self.send_response(codigo)
+                for nombre, valor in cabeceras.items():
+                    self.send_header(nombre, valor)
+                if 'Content-Length' not in cabeceras:
+                    self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/charts/"
+
+    def peticiones_a(self, path):
+        return [p for p in self.peticiones if p['path'] == path]
+
+
+@pytest.fixture
+def stub():
+    servidor = ServidorStub()
+    hilo = threading.Thread(target=servidor.httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.httpd.shutdown()
+    servidor.httpd.server_close()
+
+
+@pytest.fixture
+def descarga(stub, tmp_path, monkeypatch):
+    # descargar_blockchain apuntando al stub, con los CSV en tmp_path y sin
+    # esperas de backoff (se registran los intentos)
+    import descargar_blockchain
+    monkeypatch.setattr(descargar_blockchain, 'base_url', stub.url)
+    monkeypatch.setattr(descargar_blockchain, 'output_folder', str(tmp_path))
+    monkeypatch.setattr(descargar_blockchain, 'ESTADO_HTTP', str(tmp_path / '.estado_http.json'))
+    monkeypatch.setattr(descargar_blockchain, 'charts_a_descargar', {'precio_btc': 'market-price'})
+    esperas = []
+    monkeypatch.setattr(descargar_blockchain, 'espera_backoff', lambda intento: esperas.append(intento) or 0)
+    monkeypatch.setattr(descargar_blockchain, 'esperas', esperas, raising=False)
+    return descargar_blockchain
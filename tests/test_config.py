@@ -0,0 +1,26 @@
+import os
+
+import config
+import manifest
+
+
+def test_las_rutas_son_absolutas_y_las_relativas_se_resuelven_en_el_directorio_actual(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'DATOS_DIR', config.DATOS_DIR)
+    for variable in config.VARIABLES.values():
+        monkeypatch.delenv(variable, raising=False)
+    monkeypatch.chdir(tmp_path)
+
+    config.configurar('otros_datos', processed='procesados')
+    monkeypatch.chdir(config.RAIZ)  # Cambiar después de directorio no las mueve
+    assert config.ruta('.manifest.json') == str(tmp_path / 'otros_datos' / '.manifest.json')
+    assert config.carpeta('raw_api') == str(tmp_path / 'otros_datos' / 'raw_api')
+    assert config.carpeta('processed', 'tabla') == str(tmp_path / 'procesados' / 'tabla')
+
+
+def test_el_manifest_no_depende_del_directorio_actual(tmp_path, monkeypatch):
+    fuente = os.path.join(config.RAIZ, 'src', 'config.py')
+    claves = []
+    for directorio in (config.RAIZ, tmp_path):
+        monkeypatch.chdir(directorio)
+        claves.append(list(manifest.hash_rutas([fuente])))
+    assert claves == [['src/config.py'], ['src/config.py']]
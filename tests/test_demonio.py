@@ -0,0 +1,109 @@
+import contextlib
+import os
+import signal
+
+import numpy as np
+import pytest
+
+import demonio
+import descargar_blockchain
+import metricas
+
+
+class Reloj:
+    # Reloj falso: las vueltas y las esperas solo avanzan 't'
+    def __init__(self):
+        self.t = 0.0
+        self.esperas = []
+
+    def __call__(self):
+        return self.t
+
+    def esperar(self, segundos):
+        self.esperas.append(segundos)
+        self.t += segundos
+        return False
+
+
+@pytest.fixture
+def falso(monkeypatch):
+    # Sustituye el trabajo de cada vuelta: cada vuelta dura lo que indique
+    # 'duraciones' (en segundos del reloj falso) y no toca red ni disco
+    reloj = Reloj()
+    reloj.duraciones = []
+    reloj.vueltas = []
+    reloj.memoria = 100
+
+    def vuelta(tipo, estado):
+        reloj.vueltas.append((tipo, reloj.t, estado['maestro']))
+        reloj.t += reloj.duraciones.pop(0) if reloj.duraciones else 0
+
+    def completa(etapas, estado):
+        vuelta('completa', estado)
+        estado['manuales'] = demonio.firma_manuales()
+        estado['maestro'] = None
+
+    def caliente(estado, sesion):
+        vuelta('caliente', estado)
+        estado['maestro'] = 'maestro en memoria'
+        return {'descarga': 1.0, 'fusion': 1.0}
+
+    monkeypatch.setattr(demonio, 'vuelta_completa', completa)
+    monkeypatch.setattr(demonio, 'vuelta_caliente', caliente)
+    monkeypatch.setattr(demonio, 'firma_manuales', lambda: {'manual.csv': (1, 1)})
+    monkeypatch.setattr(demonio, 'memoria_actual_mb', lambda: reloj.memoria)
+    monkeypatch.setattr(descargar_blockchain, 'crear_sesion', contextlib.nullcontext)
+    return reloj
+
+
+def test_las_vueltas_van_a_ritmo_fijo_y_saltan_los_huecos_perdidos(falso):
+    # La 2ª vuelta dura 30 s y la 3ª, 700 s (más que el intervalo)
+    falso.duraciones = [0, 30, 700, 0]
+    vueltas = demonio.ejecutar([], intervalo=600, reloj=falso, esperar=falso.esperar, max_vueltas=4)
+
+    assert vueltas == 4
+    assert [tipo for tipo, _, _ in falso.vueltas] == ['completa', 'caliente', 'caliente', 'caliente']
+    # La 4ª no empieza en 1800 (ya pasado) sino en el siguiente hueco: 2400
+    assert [inicio for _, inicio, _ in falso.vueltas] == [0, 600, 1200, 2400]
+    assert falso.esperas == [600, 570, 500]
+
+
+def test_por_encima_de_max_memoria_se_libera_el_estado(falso, monkeypatch):
+    monkeypatch.setattr(demonio, 'MAX_MEMORIA_MB', 1024)
+    monkeypatch.setattr(metricas, '_cache', metricas.OrderedDict(clave=np.zeros(3)))
+    demonio.ejecutar([], intervalo=600, reloj=falso, esperar=falso.esperar, max_vueltas=3)
+    # Por debajo del límite, el maestro sigue en memoria entre vueltas
+    assert falso.vueltas[2][2] == 'maestro en memoria'
+    assert len(metricas._cache) == 1
+
+    falso.memoria = 2048
+    falso.vueltas.clear()
+    demonio.ejecutar([], intervalo=600, reloj=falso, esperar=falso.esperar, max_vueltas=3)
+    assert [maestro for _, _, maestro in falso.vueltas[1:]] == [None, None]
+    assert len(metricas._cache) == 0
+
+
+def test_sigterm_termina_la_vuelta_en_curso_y_sale(falso, monkeypatch):
+    anterior = signal.getsignal(signal.SIGTERM)
+    caliente = demonio.vuelta_caliente
+    terminadas = []
+
+    def caliente_con_sigterm(estado, sesion):
+        os.kill(os.getpid(), signal.SIGTERM)  # Llega a mitad de la vuelta
+        tiempos = caliente(estado, sesion)
+        terminadas.append(falso.t)
+        return tiempos
+
+    def esperar(segundos):
+        # Como Event.wait: True si ya se ha pedido parar
+        falso.esperar(segundos)
+        return demonio._parar.is_set()
+
+    monkeypatch.setattr(demonio, 'vuelta_caliente', caliente_con_sigterm)
+    vueltas = demonio.ejecutar([], intervalo=600, reloj=falso, esperar=esperar)
+
+    # La vuelta en la que llega la señal termina y no empieza ninguna más
+    assert vueltas == 2
+    assert terminadas == [600]
+    assert len(falso.esperas) == 2
+    assert signal.getsignal(signal.SIGTERM) is anterior
@@ -0,0 +1,139 @@
+import os
+
+import pytest
+
+CSV = b"2024-01-01 00:00:00,100.0\n2024-01-02 00:00:00,101.0\n2024-01-03 00:00:00,102.0\n"
+
+
+def temporales(carpeta):
+    return [n for n in os.listdir(carpeta) if n.endswith('.tmp')]
+
+
+def test_reintenta_con_backoff_los_errores_temporales(descarga, stub, tmp_path):
+    stub.rutas['/charts/market-price'] = [(503, {}, b''), (429, {}, b''), (200, {}, CSV)]
+
+    resultados = descarga.main(incremental=False)
+
+    assert resultados['precio_btc'] == (len(CSV), 'completo', None)
+    assert len(stub.peticiones_a('/charts/market-price')) == 3
+    assert descarga.esperas == [1, 2]
+    assert (tmp_path / 'precio_btc.csv').read_bytes() == CSV
+
+
+def test_no_reintenta_errores_definitivos(descarga, stub):
+    stub.rutas['/charts/market-price'] = (404, {}, b'')
+
+    resultados = descarga.main(incremental=False)
+
+    assert resultados['precio_btc'] == (0, None, "ERROR 404")
+    assert len(stub.peticiones_a('/charts/market-price')) == 1
+    assert descarga.esperas == []
+
+
+def test_fallo_parcial_no_afecta_al_resto(descarga, stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(descarga, 'charts_a_descargar', {'precio_btc': 'market-price', 'hashrate': 'hash-rate'})
+    monkeypatch.setattr(descarga, 'MAX_REINTENTOS', 2)
+    stub.rutas['/charts/market-price'] = (200, {'ETag': '"v1"'}, CSV)
+    stub.rutas['/charts/hash-rate'] = (500, {}, b'')
+
+    resultados = descarga.main(incremental=False)
+
+    assert resultados['precio_btc'][2] is None
+    assert resultados['hashrate'] == (0, None, "ERROR 500")
+    assert len(stub.peticiones_a('/charts/hash-rate')) == 2
+    assert (tmp_path / 'precio_btc.csv').read_bytes() == CSV
+    assert not (tmp_path / 'hashrate.csv').exists()
+    # Solo se guardan las cabeceras HTTP del chart que ha respondido
+    assert set(descarga.cargar_estado_http()) == {'precio_btc'}
+
+
+def test_escritura_atomica_conserva_el_archivo_si_se_corta(descarga, stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(descarga, 'MAX_REINTENTOS', 1)
+    destino = tmp_path / 'precio_btc.csv'
+    destino.write_bytes(b"previo\n")
+    # La respuesta anuncia más bytes de los que envía: la conexión se corta a mitad
+    stub.rutas['/charts/market-price'] = (200, {'Content-Length': str(len(CSV) + 1000)}, CSV)
+
+    resultados = descarga.main(incremental=False)
+
+    assert resultados['precio_btc'][2] is not None
+    assert destino.read_bytes() == b"previo\n"
+    assert temporales(tmp_path) == []
+
+
+def test_escribir_atomico_borra_el_temporal_si_falla(descarga, tmp_path):
+    class RespuestaCortada:
+        def iter_content(self, chunk_size):
+            yield b"2024-01-01 00:00:00,1\n"
+            raise OSError("conexión cortada")
+
+    destino = tmp_path / 'serie.csv'
+    with pytest.raises(OSError):
+        descarga.escribir_atomico(RespuestaCortada(), str(destino))
+
+    assert not destino.exists()
+    assert temporales(tmp_path) == []
+
+
+# --- Descarga incremental (ventana desde el último día + peticiones condicionales) ---
+def cambios(carpeta):
+    import series_crudas
+    return series_crudas.leer_cambios(str(carpeta))
+
+
+def test_peticion_condicional_304(descarga, stub, tmp_path):
+    (tmp_path / 'precio_btc.csv').write_bytes(CSV)
+
+    def responder(peticion):
+        if peticion['cabeceras'].get('If-None-Match') == '"v1"':
+            return 304, {}, b''
+        return 200, {'ETag': '"v1"'}, CSV.splitlines(keepends=True)[-1]
+
+    stub.rutas['/charts/market-price'] = responder
+    assert descarga.main()['precio_btc'] == (len(CSV.splitlines(keepends=True)[-1]), 'sin cambios', None)
+    assert descarga.main()['precio_btc'] == (0, 'sin cambios', None)
+
+    primera, segunda = stub.peticiones_a('/charts/market-price')
+    assert 'start=2024-01-03' in primera['query'] and 'If-None-Match' not in primera['cabeceras']
+    assert segunda['query'] == primera['query'] and segunda['cabeceras']['If-None-Match'] == '"v1"'
+    assert (tmp_path / 'precio_btc.csv').read_bytes() == CSV
+    assert cambios(tmp_path) == {}
+
+
+def test_filas_solapadas_se_sustituyen(descarga, stub, tmp_path):
+    (tmp_path / 'precio_btc.csv').write_bytes(CSV)
+    # El último día guardado era parcial: vuelve corregido junto al día nuevo
+    stub.rutas['/charts/market-price'] = (200, {}, b"2024-01-03 00:00:00,102.5\n2024-01-04 00:00:00,103.0\n")
+
+    assert descarga.main()['precio_btc'][1] == 'actualizado'
+
+    assert (tmp_path / 'precio_btc.csv').read_bytes() == (
+        b"2024-01-01 00:00:00,100.0\n2024-01-02 00:00:00,101.0\n"
+        b"2024-01-03 00:00:00,102.5\n2024-01-04 00:00:00,103.0\n")
+    assert cambios(tmp_path) == {'precio_btc': '2024-01-03 00:00:00'}
+    assert temporales(tmp_path) == []
+
+
+def test_fusionar_delta_sin_salto_de_linea_final(descarga, tmp_path):
+    path = tmp_path / 'serie.csv'
+    path.write_bytes(CSV.rstrip(b'\n'))
+
+    assert descarga.fusionar_delta(str(path), b"2024-01-04 00:00:00,103.0") == '2024-01-04 00:00:00'
+    assert path.read_bytes() == CSV + b"2024-01-04 00:00:00,103.0\n"
+
+
+def test_cambios_se_acumulan_hasta_procesar(descarga, stub, tmp_path):
+    (tmp_path / 'precio_btc.csv').write_bytes(CSV)
+    stub.rutas['/charts/market-price'] = [
+        (200, {}, b"2024-01-03 00:00:00,102.5\n2024-01-04 00:00:00,103.0\n"),
+        (200, {}, b"2024-01-04 00:00:00,103.0\n2024-01-05 00:00:00,104.0\n"),
+    ]
+    descarga.main()
+    descarga.main()
+    # Se conserva el timestamp más antiguo pendiente de procesar
+    assert cambios(tmp_path) == {'precio_btc': '2024-01-03 00:00:00'}
+
+    # Una descarga completa marca el archivo entero como reescrito
+    stub.rutas['/charts/market-price'] = (200, {}, CSV)
+    descarga.main(incremental=False)
+    assert cambios(tmp_path) == {'precio_btc': '*'}
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+import generar_web
+
+SRC = os.path.dirname(generar_web.__file__)
+CODIGO = ("import generar_web as g; p = g.parametros_figuras()['fig-rolling-stats']; "
+          "print(g.huella_figura(g.figura_estadisticas, p, 'v'))")
+
+
+def huella_en_proceso(semilla):
+    entorno = dict(os.environ, PYTHONHASHSEED=str(semilla))
+    salida = subprocess.run([sys.executable, '-c', CODIGO], cwd=SRC, env=entorno, capture_output=True, text=True,
+                            check=True)
+    return salida.stdout.strip()
+
+
+def test_huella_estable_entre_procesos():
+    # La clave de la caché no puede depender del orden de hash de cada proceso
+    assert huella_en_proceso(1) == huella_en_proceso(2)
+
+
+def test_cambiar_un_parametro_invalida_la_figura(monkeypatch):
+    parametros = generar_web.parametros_figuras()['fig-rolling-stats']
+    previa = generar_web.huella_figura(generar_web.figura_estadisticas, parametros, 'v')
+    monkeypatch.setitem(generar_web.ETIQUETAS, 'precio_btc', "Precio BTC")
+    monkeypatch.setattr(generar_web, 'COLORES_SERIES', ['red', 'green', 'blue'])
+
+    for id_div in ('fig-rolling-stats', 'fig-correlations'):
+        parametros = generar_web.parametros_figuras()[id_div]
+        assert 'Precio BTC' in parametros['etiquetas'].values()
+    nueva = generar_web.huella_figura(generar_web.figura_estadisticas,
+                                      generar_web.parametros_figuras()['fig-rolling-stats'], 'v')
+    assert nueva != previa
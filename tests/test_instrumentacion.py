@@ -0,0 +1,17 @@
+import os
+
+import instrumentacion
+
+
+def test_dos_informes_en_el_mismo_segundo_no_se_pisan(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentacion, 'CARPETA_INFORMES', str(tmp_path))
+    rutas = set()
+    for _ in range(3):
+        informe = instrumentacion.iniciar_informe()
+        with instrumentacion.etapa('vacia'):
+            pass
+        rutas.add(instrumentacion.terminar_informe(informe))
+    assert len(rutas) == 3
+    assert all(os.path.exists(ruta) for ruta in rutas)
+    assert str(os.getpid()) in informe['id']
+    assert informe['etapas'][0]['pico_rss_proceso_mb'] is not None
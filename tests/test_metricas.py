@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import metricas
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(metricas, 'CARPETA_CACHE', str(tmp_path))
+    monkeypatch.setattr(metricas, '_cache', type(metricas._cache)())
+    return tmp_path
+
+
+def dataset(hashrate):
+    return pd.DataFrame({'hashrate': hashrate, 'efficiency_j_th': np.ones(len(hashrate))},
+                        index=pd.date_range('2020-01-01', periods=len(hashrate)))
+
+
+def test_datos_distintos_no_se_expulsan_entre_si(cache):
+    # Dos procesos (dashboard y análisis por lotes) con datos distintos
+    dashboard, lotes = dataset(np.arange(10.0)), dataset(np.arange(10.0) * 2)
+    metricas.calcular(dashboard, ['network_power_gw'])
+    metricas.calcular(lotes, ['network_power_gw'])
+    assert len(os.listdir(cache)) == 2
+
+    metricas._cache.clear()
+    for df in (dashboard, lotes):
+        resultado = metricas.calcular(df, ['network_power_gw'])
+        assert np.allclose(resultado['network_power_gw'], df['hashrate'] / 1e9)
+    assert len(os.listdir(cache)) == 2
+
+
+def test_la_carpeta_se_limita_por_tamano_lru(cache, monkeypatch):
+    n = 20_000
+    tamano = len(np.zeros(n).tobytes()) + 128  # Un resultado en disco (datos + cabecera .npy)
+    monkeypatch.setattr(metricas, 'MAX_CACHE_DISCO_MB', 3.5 * tamano / 1024 / 1024)
+
+    datos = [dataset(np.arange(n) + k) for k in range(3)]
+    archivos = []
+    for k, df in enumerate(datos):
+        previos = set(os.listdir(cache))
+        metricas.calcular(df, ['network_power_gw'])
+        nuevo, = set(os.listdir(cache)) - previos
+        os.utime(cache / nuevo, (k, k))  # Antigüedad explícita (sin depender de la resolución del reloj)
+        archivos.append(nuevo)
+
+    metricas._cache.clear()
+    metricas.calcular(datos[0], ['network_power_gw'])  # Leerlo lo renueva
+    metricas.calcular(dataset(np.arange(n) + 99), ['network_power_gw'])
+
+    restantes = set(os.listdir(cache))
+    assert len(restantes) == 3
+    assert archivos[0] in restantes and archivos[1] not in restantes and archivos[2] in restantes
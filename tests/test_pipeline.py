@@ -0,0 +1,49 @@
+import threading
+import time
+
+import pytest
+
+import manifest
+import pipeline
+
+
+@pytest.fixture
+def carpeta(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest, 'MANIFEST_FILE', str(tmp_path / '.manifest.json'))
+    return tmp_path
+
+
+def etapa(nombre, salida, funcion=None, entradas=()):
+    def escribir():
+        salida.write_text(nombre)
+    return {'nombre': nombre, 'funcion': funcion or escribir, 'entradas': list(map(str, entradas)),
+            'salidas': [str(salida)]}
+
+
+def test_force_de_una_etapa_conserva_el_resto_del_manifest(carpeta):
+    a, b = carpeta / 'a.txt', carpeta / 'b.txt'
+    pipeline.ejecutar([etapa('a', a), etapa('b', b, entradas=[a])])
+    assert set(manifest.cargar()) == {'a', 'b'}
+
+    # Como 'python main.py render --force': solo una etapa
+    assert pipeline.ejecutar([etapa('b', b, entradas=[a])], force=True) == {'b': 'ejecutada'}
+    assert set(manifest.cargar()) == {'a', 'b'}
+    assert pipeline.ejecutar([etapa('a', a), etapa('b', b, entradas=[a])]) == {'a': 'omitida', 'b': 'omitida'}
+
+
+def test_un_fallo_no_espera_a_las_etapas_en_marcha(carpeta):
+    liberar = threading.Event()
+
+    def lenta():
+        liberar.wait(10)
+
+    def falla():
+        raise RuntimeError("roto")
+
+    inicio = time.perf_counter()
+    with pytest.raises(pipeline.ErrorEtapa) as error:
+        pipeline.ejecutar([etapa('lenta', carpeta / 'l.txt', lenta), etapa('falla', carpeta / 'f.txt', falla)])
+    liberar.set()
+
+    assert error.value.etapa == 'falla'
+    assert time.perf_counter() - inicio < 5
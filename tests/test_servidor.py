@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+import servidor
+
+
+@pytest.fixture(autouse=True)
+def tablas_vacias(monkeypatch):
+    monkeypatch.setattr(servidor, '_tablas', {})
+
+
+def test_una_carga_lenta_no_bloquea_otras_tablas_y_se_hace_una_vez():
+    liberar = threading.Event()
+    cargas = []
+
+    def cargar_lenta():
+        cargas.append('lenta')
+        liberar.wait(5)
+        return 'A'
+
+    hilos = [threading.Thread(target=servidor._una_vez, args=(('a', 1), cargar_lenta)) for _ in range(3)]
+    for hilo in hilos:
+        hilo.start()
+    # Mientras 'a' se carga, 'b' responde sin esperar
+    assert servidor._una_vez(('b', 1), lambda: 'B') == 'B'
+    liberar.set()
+    for hilo in hilos:
+        hilo.join(5)
+    assert cargas == ['lenta']
+    assert servidor._una_vez(('a', 1), lambda: 'otra') == 'A'
+
+
+def test_un_fallo_de_carga_no_se_guarda():
+    def fallar():
+        raise FileNotFoundError('maestro')
+
+    with pytest.raises(FileNotFoundError):
+        servidor._una_vez(('a', 1), fallar)
+    assert servidor._una_vez(('a', 1), lambda: 'A') == 'A'
+
+
+def test_una_version_nueva_descarta_las_anteriores():
+    servidor._una_vez(('a', 1), lambda: 'A1')
+    assert servidor._una_vez(('a', 2), lambda: 'A2') == 'A2'
+    assert list(servidor._tablas) == [('a', 2)]